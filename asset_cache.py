@@ -0,0 +1,101 @@
+import hashlib
+import os
+import struct
+import pygame
+
+# Images scaled for the screen, cached on disk as raw pixels. Decoding a
+# JPEG and smooth-scaling it takes a good part of a launch; reading back the
+# already-scaled pixels is a single read and a copy.
+#
+# Cache file layout (little-endian):
+#   magic b'CLAS', uint16 version, uint16 reserved
+#   uint32 width, uint32 height, 4 bytes pixel format (b'RGB\0' or b'RGBA')
+#   then the pixels, as from pygame.image.tobytes()
+#
+# Files are named by a hash of the source's absolute path, size and
+# modification time plus the target size, so editing the image or changing
+# the screen size simply misses the cache.
+
+CACHE_DIR = ".asset_cache"
+MAGIC = b'CLAS'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHII4s')
+
+
+def cache_key(path, size, alpha=False):
+    stat = os.stat(path)
+    key = "%s|%d|%d|%dx%d|%s" % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                                  size[0], size[1], "RGBA" if alpha else "RGB")
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def read_cached_image(path):
+    """Return the surface stored in a cache file, or None if it's missing or damaged."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            pixels = f.read()
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, _, width, height, pixel_format = _HEADER.unpack(header)
+    pixel_format = pixel_format.rstrip(b'\0').decode('ascii', 'replace')
+    if magic != MAGIC or version != VERSION or pixel_format not in ("RGB", "RGBA"):
+        return None
+    if len(pixels) != width * height * len(pixel_format):
+        return None
+    return pygame.image.frombytes(pixels, (width, height), pixel_format)
+
+
+def write_cached_image(path, surface, alpha=False):
+    pixel_format = "RGBA" if alpha else "RGB"
+    width, height = surface.get_size()
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, width, height, pixel_format.encode().ljust(4, b'\0')))
+        f.write(pygame.image.tobytes(surface, pixel_format))
+    os.replace(tmp_path, path)
+
+
+class AssetCache:
+    """Scaled, display-format images, loaded on first use.
+
+    image() needs a display mode to be set, since it converts to the
+    display's pixel format. Pass cache_dir=None to skip the disk cache.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._images = {}
+        self.hits = 0  # Images read from the disk cache
+        self.misses = 0  # Images decoded and scaled from the source file
+
+    def image(self, path, size, alpha=False):
+        """The image at path scaled to size and converted for fast blitting."""
+        key = (path, tuple(size), alpha)
+        surface = self._images.get(key)
+        if surface is None:
+            surface = self._load(path, key[1], alpha)
+            surface = surface.convert_alpha() if alpha else surface.convert()
+            self._images[key] = surface
+        return surface
+
+    def _load(self, path, size, alpha):
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, cache_key(path, size, alpha) + ".img")
+            surface = read_cached_image(cache_path)
+            if surface is not None:
+                self.hits += 1
+                return surface
+
+        self.misses += 1
+        surface = pygame.transform.scale(pygame.image.load(path), size)
+        if cache_path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                write_cached_image(cache_path, surface, alpha)
+            except OSError:
+                pass  # A read-only cache only costs the next launch its speed-up
+        return surface
@@ -0,0 +1,285 @@
+import numpy as np
+from climber_config import (HEAD_RADIUS, UPPER_BODY_RADIUS, LOWER_BODY_RADIUS, BODY_DISTANCE,
+                            HAND_RADIUS, HAND_BODY_MAX_DISTANCE, FEET_SIZE, FEET_BODY_MAX_DISTANCE)
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from board_file import wall_height
+from simulation import (DEFAULT_DT, GRAVITY_SPEED, SNAPSHOT, SNAPSHOT_BUTTON_HELD,
+                        SNAPSHOT_GRABBED_SHIFT)
+from ragdoll import SOLVER_TOLERANCE, SOLVER_MAX_ITERATIONS, MASSLESS, PINNED
+
+# Vectorised version of simulation.Simulation. Every climber's points live in
+# contiguous float arrays and each tick is a handful of array operations over
+# the whole population, instead of one Python list per point per climber.
+
+# Limb order used for the limb axis of every array
+LIMB_NAMES = ("left_arm", "right_arm", "left_leg", "right_leg")
+LIMB_RADII = np.array([HAND_RADIUS, HAND_RADIUS,
+                       FEET_SIZE // 2, FEET_SIZE // 2], dtype=np.float64)
+LIMB_MAX_DISTANCES = np.array([HAND_BODY_MAX_DISTANCE, HAND_BODY_MAX_DISTANCE,
+                               FEET_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE], dtype=np.float64)
+# Which body point each limb hangs off: 0 = upper body, 1 = lower body
+LIMB_BODY = np.array([0, 0, 1, 1])
+
+# The constraints Simulation gives its ConstraintSolver, over the points
+# (upper body, lower body, left arm, right arm, left leg, right leg)
+CONSTRAINT_A = np.array([2, 3, 4, 5, 0])
+CONSTRAINT_B = np.array([0, 0, 1, 1, 1])
+CONSTRAINT_MIN = np.array([0, 0, 0, 0, BODY_DISTANCE], dtype=np.float64)
+CONSTRAINT_MAX = np.append(LIMB_MAX_DISTANCES / 2, BODY_DISTANCE)
+# POINT_CONSTRAINTS[p, c] is whether constraint c uses point p
+POINT_CONSTRAINTS = np.zeros((6, len(CONSTRAINT_A)), dtype=bool)
+POINT_CONSTRAINTS[CONSTRAINT_A, np.arange(len(CONSTRAINT_A))] = True
+POINT_CONSTRAINTS[CONSTRAINT_B, np.arange(len(CONSTRAINT_B))] = True
+
+
+def _length(vectors):
+    """Length of each vector along the last axis."""
+    return np.sqrt(vectors[..., 0] ** 2 + vectors[..., 1] ** 2)
+
+
+class BatchSimulation:
+    """Simulate many independent climbers at once.
+
+    points has shape (count, 6, 2): upper body, lower body, then the limbs
+    in LIMB_NAMES order. bodies (count, 2, 2) and limbs (count, 4, 2) are
+    views onto it.
+    """
+
+    def __init__(self, count, board_state=None, dt=DEFAULT_DT):
+        self.count = count
+        self.board_state = board_state
+        self.dt = dt
+        self.gravity_step = GRAVITY_SPEED * dt
+        self.tick_count = 0
+        self.reset()
+
+    def reset(self):
+        """Put every climber back in the starting pose used by Simulation."""
+        start_y = wall_height(self.board_state) - SCREEN_HEIGHT // 2
+        upper = [SCREEN_WIDTH // 2, start_y - BODY_DISTANCE // 2]
+        lower = [SCREEN_WIDTH // 2, start_y + BODY_DISTANCE // 2]
+        start_limbs = [[upper[0] - 50, upper[1] - 50],
+                       [upper[0] + 50, upper[1] - 50],
+                       [lower[0] - 50, lower[1] + 50],
+                       [lower[0] + 50, lower[1] + 50]]
+
+        self.points = np.empty((self.count, 6, 2), dtype=np.float64)
+        self.bodies = self.points[:, :2]
+        self.limbs = self.points[:, 2:]
+        self.bodies[:] = [upper, lower]
+        self.limbs[:] = start_limbs
+        self.limb_gravity_on = np.zeros((self.count, 4), dtype=bool)
+        self.lower_body_gravity_on = np.zeros(self.count, dtype=bool)
+        self.grabbed = np.full(self.count, -1, dtype=np.int64)  # Limb held by the mouse, -1 for none
+        self.button_held = np.zeros(self.count, dtype=bool)
+
+        # Constraint solver state, per climber as in ragdoll.ConstraintSolver
+        constraint_count = len(CONSTRAINT_A)
+        self.inverse_masses = np.empty((self.count, 6), dtype=np.float64)
+        self.inverse_masses[:] = [1.0, 1.0] + [MASSLESS] * 4
+        self.solver_order = np.tile(np.arange(constraint_count), (self.count, 1))
+        self.solver_leading = np.zeros((self.count, constraint_count), dtype=bool)
+        self.solver_iterations = np.zeros(self.count, dtype=np.int64)
+
+    def load_snapshot(self, data, rows=None):
+        """Put climbers (all, or those selected by rows) in the state of a Simulation snapshot.
+
+        Lets search tools branch many climbers from one mid-route pose.
+        """
+        if rows is None:
+            rows = slice(None)
+        values = SNAPSHOT.unpack_from(data)
+        self.points[rows] = np.array(values[2:14], dtype=np.float64).reshape(6, 2)
+        gravity = values[14]
+        self.limb_gravity_on[rows] = [bool(gravity & (1 << bit)) for bit in range(4)]
+        self.lower_body_gravity_on[rows] = bool(gravity & (1 << 4))
+        flags = values[15]
+        self.button_held[rows] = bool(flags & SNAPSHOT_BUTTON_HELD)
+        self.grabbed[rows] = (flags >> SNAPSHOT_GRABBED_SHIFT) - 1
+        self.solver_order[rows] = values[16:21]
+        leading = values[21]
+        self.solver_leading[rows] = [bool(leading & (1 << bit)) for bit in range(len(CONSTRAINT_A))]
+
+    @property
+    def upper_body_pos(self):
+        return self.bodies[:, 0]
+
+    @property
+    def lower_body_pos(self):
+        return self.bodies[:, 1]
+
+    @property
+    def head_pos(self):
+        head = self.bodies[:, 0].copy()
+        head[:, 1] -= UPPER_BODY_RADIUS + HEAD_RADIUS
+        return head
+
+    def right_click(self, mouse_pos, mask=None):
+        """Toggle gravity on whatever is under each climber's cursor.
+
+        mouse_pos is a (2,) or (count, 2) array; mask limits the click to a
+        subset of climbers.
+        """
+        mouse_pos = np.broadcast_to(np.asarray(mouse_pos, dtype=np.float64),
+                                    (self.count, 2))
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+
+        limb_dist = _length(self.limbs - mouse_pos[:, None, :])
+        self.limb_gravity_on ^= (limb_dist < LIMB_RADII) & mask[:, None]
+
+        body_dist = _length(self.bodies[:, 1] - mouse_pos)
+        self.lower_body_gravity_on ^= (body_dist < LOWER_BODY_RADIUS) & mask
+
+    def _drag(self, mouse_pos, mouse_pressed):
+        limbs = self.limbs
+        rows = np.arange(self.count)
+        # Distance from every climber's mouse to each of its limbs
+        mouse_dist = _length(limbs - mouse_pos[:, None, :])
+        # overlap[:, j]: the mouse is too close to some other limb for limb j to go there
+        overlap = np.zeros((self.count, 4), dtype=bool)
+        for j in range(4):
+            for k in range(4):
+                if k != j:
+                    overlap[:, j] |= mouse_dist[:, k] < LIMB_RADII[j] + LIMB_RADII[k]
+
+        # Pick the limb once when the button goes down: the first one under
+        # the mouse that could move there
+        pressed_now = mouse_pressed & ~self.button_held
+        if pressed_now.any():
+            grabbable = (mouse_dist < LIMB_RADII) & ~overlap
+            first = np.where(grabbable.any(axis=1), grabbable.argmax(axis=1), -1)
+            self.grabbed[pressed_now] = first[pressed_now]
+        self.grabbed[~mouse_pressed] = -1
+        self.button_held[:] = mouse_pressed
+
+        held = self.grabbed >= 0
+        limb = np.where(held, self.grabbed, 0)
+        active = held & ~overlap[rows, limb]
+        if not active.any():
+            return
+        limbs[active, limb[active]] = mouse_pos[active]
+        # Grabbed limbs are pinned for the solve, so the body follows them
+        self.inverse_masses[active, 2 + limb[active]] = PINNED
+
+    def _apply_gravity(self):
+        limb_y = self.limbs[:, :, 1]
+        desired_y = self.bodies[:, LIMB_BODY, 1] + LIMB_MAX_DISTANCES / 2
+        falling = self.limb_gravity_on & (limb_y < desired_y)
+        limb_y[falling] = np.minimum(limb_y + self.gravity_step, desired_y)[falling]
+
+        lower_y = self.bodies[:, 1, 1]
+        desired_y = self.bodies[:, 0, 1] + BODY_DISTANCE
+        falling = self.lower_body_gravity_on & (lower_y < desired_y)
+        lower_y[falling] = np.minimum(lower_y + self.gravity_step, desired_y)[falling]
+
+    def _solve(self, tolerance=SOLVER_TOLERANCE, max_iterations=SOLVER_MAX_ITERATIONS):
+        """ragdoll.ConstraintSolver.solve for every climber at once.
+
+        Each climber keeps its own sweep order and stops iterating on its own
+        convergence test, exactly as the single-climber solver would.
+        """
+        points = self.points
+        masses = self.inverse_masses
+        order = self.solver_order
+        rows = np.arange(self.count)
+        disturbed_others = np.zeros_like(self.solver_leading)
+        dirty = np.ones_like(self.solver_leading)
+        running = np.ones(self.count, dtype=bool)
+        self.solver_iterations[:] = 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for _ in range(max_iterations):
+                live = rows[running]  # Climbers that haven't converged yet
+                self.solver_iterations[live] += 1
+                max_violation = np.zeros(len(live))
+                for k in range(order.shape[1]):
+                    index = order[live, k]
+                    check = dirty[live, index]
+                    dirty[live, index] = False
+                    a = CONSTRAINT_A[index]
+                    b = CONSTRAINT_B[index]
+                    min_length = CONSTRAINT_MIN[index]
+                    max_length = CONSTRAINT_MAX[index]
+                    diff = points[live, b] - points[live, a]
+                    dist = np.sqrt(diff[:, 0] * diff[:, 0] + diff[:, 1] * diff[:, 1])
+                    over = dist > max_length
+                    fix = check & (over | (dist < min_length)) & (dist != 0)
+                    if not fix.any():
+                        continue
+
+                    # Only the climbers whose constraint is violated from here on
+                    at, a, b, index = live[fix], a[fix], b[fix], index[fix]
+                    diff, dist = diff[fix], dist[fix]
+                    violation = np.where(over[fix], dist - max_length[fix], dist - min_length[fix])
+
+                    mass_a = masses[at, a]
+                    mass_b = masses[at, b]
+                    same = mass_a == mass_b
+                    share_a = np.select([same, mass_a == MASSLESS, mass_b == MASSLESS],
+                                        [np.where(mass_a != 0, 0.5, 0.0), 1.0, 0.0],
+                                        mass_a / (mass_a + mass_b))
+                    share_b = np.select([same, mass_a == MASSLESS, mass_b == MASSLESS],
+                                        [np.where(mass_a != 0, 0.5, 0.0), 0.0, 1.0],
+                                        mass_b / (mass_a + mass_b))
+
+                    factor = violation / dist
+                    correction = diff * factor[:, None]
+                    points[at, a] += correction * share_a[:, None]
+                    points[at, b] -= correction * share_b[:, None]
+
+                    size = np.abs(violation)
+                    max_violation[fix] = np.maximum(max_violation[fix], size)
+                    # Constraints sharing a moved point have to be checked again
+                    disturbed = ((POINT_CONSTRAINTS[a] & (share_a != 0)[:, None]) |
+                                 (POINT_CONSTRAINTS[b] & (share_b != 0)[:, None]))
+                    disturbed[np.arange(len(at)), index] = False
+                    dirty[at] |= disturbed
+                    disturbed_others[at, index] |= disturbed.any(axis=1)
+                running[live] = (max_violation >= tolerance) & dirty[live].any(axis=1)
+                if not running.any():
+                    break
+
+        # Warm start: constraints that disturbed others this time go first next time
+        self.solver_leading[:] = disturbed_others
+        first = np.argsort(~np.take_along_axis(disturbed_others, order, axis=1), axis=1, kind='stable')
+        self.solver_order = np.take_along_axis(order, first, axis=1)
+
+    def tick(self, mouse_pos=None, mouse_pressed=None):
+        """Advance every climber by one tick of dt seconds.
+
+        mouse_pos is a (2,) or (count, 2) array and mouse_pressed a bool or a
+        (count,) bool array; leaving either out means no dragging this tick.
+        """
+        self.inverse_masses[:, 2:] = MASSLESS
+        if mouse_pos is not None and mouse_pressed is not None:
+            mouse_pressed = np.broadcast_to(np.asarray(mouse_pressed, dtype=bool),
+                                            (self.count,))
+        else:
+            mouse_pressed = np.zeros(self.count, dtype=bool)
+        if mouse_pressed.any():
+            mouse_pos = np.broadcast_to(np.asarray(mouse_pos, dtype=np.float64),
+                                        (self.count, 2))
+            self._drag(mouse_pos, mouse_pressed)
+        else:
+            # Every button is up, so nothing is grabbed
+            self.grabbed[:] = -1
+            self.button_held[:] = False
+
+        self._apply_gravity()
+        self._solve()
+        self.tick_count += 1
+
+    def step(self, n=1, inputs=None):
+        """Advance every climber by n ticks.
+
+        inputs is an optional iterable of (mouse_pos, mouse_pressed) pairs,
+        one per tick, in the same shapes tick() accepts.
+        """
+        if inputs is None:
+            for _ in range(n):
+                self.tick()
+            return
+        inputs = iter(inputs)
+        for _ in range(n):
+            self.tick(*next(inputs, ()))
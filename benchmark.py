@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Runs without a window, so it works on build machines
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import ragdoll
+import board_file
+import main as game
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from climber_config import BODY_DISTANCE, HAND_BODY_MAX_DISTANCE
+from frame_scheduler import percentile
+from hold_index import HoldIndex
+from simulation import Simulation
+from snapshot_ring import SnapshotRing
+
+# Performance benchmarks for the physics kernels, the simulation tick, board
+# loading and frame drawing.
+#
+#   python benchmark.py                  run everything and compare to the baseline
+#   python benchmark.py --save-baseline  run everything and store the results
+#   python benchmark.py -k load          only benchmarks with "load" in the name
+#
+# Each benchmark is timed over ROUNDS rounds of however many calls fill
+# ROUND_TIME seconds. Results are per call: ops/sec from the median round,
+# plus p50/p95/p99 in microseconds. A benchmark whose ops/sec falls more
+# than the tolerance below the stored baseline counts as a regression and
+# makes the run exit with status 1. Baselines are machine-specific, so store
+# one on the machine that runs the comparison.
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.25  # Fraction of baseline ops/sec a result may drop by
+ROUNDS = 30
+ROUND_TIME = 0.02  # Seconds each round should take at least
+BOARD_SIZES = (100, 1000, 10000)  # Holds of each kind in the board loading benchmarks
+BACKGROUND_IMAGE = "board.jpg"
+TALL_WALL_SCREENS = 50  # Height of the scrolling benchmark's wall, in screens
+TALL_WALL_HOLDS = 50000  # Holds of each kind on it
+
+
+def measure(func, rounds=ROUNDS, round_time=ROUND_TIME):
+    """Time func() and return ops/sec and per-call percentiles."""
+    # Find how many calls fill a round, so timer resolution doesn't matter
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= round_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - start) / number)
+
+    median = percentile(per_call, 50)
+    return {
+        "ops_per_sec": 1 / median if median else float("inf"),
+        "p50_us": median * 1e6,
+        "p95_us": percentile(per_call, 95) * 1e6,
+        "p99_us": percentile(per_call, 99) * 1e6,
+        "calls_per_round": number,
+    }
+
+
+# Benchmarks. Each setup function returns the callable to time.
+
+def bench_calculate_distance():
+    a, b = [100.0, 200.0], [130.0, 160.0]
+    return lambda: ragdoll.calculate_distance(a, b)
+
+
+def bench_move_body_smoothly():
+    limb, body = [100.0, 100.0], [100.0, 300.0]
+
+    def run():
+        body[0], body[1] = 100.0, 300.0
+        ragdoll.move_body_smoothly(limb, body, HAND_BODY_MAX_DISTANCE)
+    return run
+
+
+def bench_drag_and_constrain_smoothly():
+    limb, body = [100.0, 100.0], [100.0, 300.0]
+
+    def run():
+        limb[0], limb[1] = 100.0, 100.0
+        ragdoll.drag_and_constrain_smoothly(limb, body, HAND_BODY_MAX_DISTANCE)
+    return run
+
+
+def bench_maintain_body_connection():
+    upper, lower = [300.0, 400.0], [310.0, 400.0 + BODY_DISTANCE * 1.5]
+    return lambda: ragdoll.maintain_body_connection(upper, lower, BODY_DISTANCE)
+
+
+def bench_check_snapping():
+    hold_index = HoldIndex.from_board_state(_random_board(1000, random.Random(1)))
+    limb = [SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2]
+    return lambda: ragdoll.check_snapping(limb, 20, None, hold_index)
+
+
+def _dragging_sim():
+    """A simulation and an input generator that drags the left arm back and forth."""
+    sim = Simulation(game.load_board_state())
+    offsets = [(3, -2), (-3, 2)]
+    state = {"i": 0}
+
+    def tick():
+        dx, dy = offsets[state["i"] % 2]
+        state["i"] += 1
+        pos = sim.left_arm.pos
+        sim.tick((pos[0] + dx, pos[1] + dy), True)
+    return sim, tick
+
+
+def bench_sim_tick_drag():
+    return _dragging_sim()[1]
+
+
+def bench_sim_tick_idle():
+    sim = Simulation(game.load_board_state())
+    return sim.tick
+
+
+def bench_sim_tick_gravity():
+    sim = Simulation(game.load_board_state())
+
+    def run():
+        # Keep everything falling by resetting once it has landed
+        if not sim.gravity_active():
+            sim.reset()
+            for limb in sim.all_limbs:
+                limb.gravity_on = True
+            sim.lower_body_gravity_on = True
+            sim.lower_body_pos[1] -= 100
+        sim.tick()
+    return run
+
+
+def bench_sim_snapshot():
+    sim, tick = _dragging_sim()
+    tick()
+    ring = SnapshotRing(600)
+    return lambda: ring.push(sim)
+
+
+def bench_sim_restore():
+    sim, tick = _dragging_sim()
+    tick()
+    snapshot = sim.snapshot()
+    return lambda: sim.restore(snapshot)
+
+
+def _random_board(holds, rng):
+    return {
+        "num_rows": 8,
+        "circles": [[rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT)] for _ in range(holds)],
+        "squares": [[rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT)] for _ in range(holds)],
+    }
+
+
+def _board_loader(holds, extension):
+    def setup(workdir):
+        path = os.path.join(workdir, "board_%d%s" % (holds, extension))
+        if not os.path.exists(path):
+            board_file.save_board_state(path, _random_board(holds, random.Random(holds)))
+
+        def run():
+            board_state = board_file.load_board_state(path)
+            if isinstance(board_state, board_file.BoardFile):
+                board_state.close()
+        return run
+    return setup
+
+
+def _frame_drawer(background_path):
+    def setup(workdir):
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        sim, tick = _dragging_sim()
+        board_layer = game.build_board_layer(sim, game.load_background_image(background_path))
+
+        def run():
+            tick()
+            screen.blit(board_layer, (0, 0))
+            game.draw_climber(screen, sim)
+            pygame.display.flip()
+        return run
+    return setup
+
+
+def bench_frame_scroll():
+    """Scroll a layer up and down a wall TALL_WALL_SCREENS screens high."""
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    rng = random.Random(2)
+    wall_height = SCREEN_HEIGHT * TALL_WALL_SCREENS
+    sim = Simulation({
+        "num_rows": 8 * TALL_WALL_SCREENS,
+        "wall_height": wall_height,
+        "circles": [[rng.randrange(SCREEN_WIDTH), rng.randrange(wall_height)] for _ in range(TALL_WALL_HOLDS)],
+        "squares": [[rng.randrange(SCREEN_WIDTH), rng.randrange(wall_height)] for _ in range(TALL_WALL_HOLDS)],
+    })
+    row_index = game.build_row_index(sim)
+    state = {"top": wall_height // 2, "step": -25}
+    layer = game.build_board_layer(sim, None, row_index, state["top"])
+
+    def run():
+        if not 0 <= state["top"] + state["step"] <= wall_height - SCREEN_HEIGHT:
+            state["step"] = -state["step"]
+        state["top"] += state["step"]
+        game.scroll_board_layer(layer, sim, row_index, None, state["top"], state["step"])
+    return run
+
+
+def _no_workdir(setup):
+    return lambda workdir: setup()
+
+
+BENCHMARKS = {
+    "ragdoll.calculate_distance": _no_workdir(bench_calculate_distance),
+    "ragdoll.move_body_smoothly": _no_workdir(bench_move_body_smoothly),
+    "ragdoll.drag_and_constrain_smoothly": _no_workdir(bench_drag_and_constrain_smoothly),
+    "ragdoll.maintain_body_connection": _no_workdir(bench_maintain_body_connection),
+    "ragdoll.check_snapping": _no_workdir(bench_check_snapping),
+    "sim.tick_drag": _no_workdir(bench_sim_tick_drag),
+    "sim.tick_idle": _no_workdir(bench_sim_tick_idle),
+    "sim.tick_gravity": _no_workdir(bench_sim_tick_gravity),
+    "sim.snapshot": _no_workdir(bench_sim_snapshot),
+    "sim.restore": _no_workdir(bench_sim_restore),
+    "frame.draw": _frame_drawer(None),
+    "frame.draw_background": _frame_drawer(BACKGROUND_IMAGE),
+    "frame.scroll": _no_workdir(bench_frame_scroll),
+}
+for _holds in BOARD_SIZES:
+    BENCHMARKS["load.json_%d" % _holds] = _board_loader(_holds, ".json")
+    BENCHMARKS["load.board_%d" % _holds] = _board_loader(_holds, board_file.BINARY_EXTENSION)
+
+
+def run_benchmarks(names=None, rounds=ROUNDS, round_time=ROUND_TIME, report=None):
+    """Run the named benchmarks (all by default) and return {name: result}."""
+    pygame.init()
+    workdir = tempfile.mkdtemp(prefix="climbing-bench-")
+    results = {}
+    try:
+        for name in BENCHMARKS if names is None else names:
+            results[name] = measure(BENCHMARKS[name](workdir), rounds, round_time)
+            if report:
+                report(name, results[name])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        pygame.quit()
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return (name, baseline ops/sec, ops/sec) for every regressed benchmark."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["ops_per_sec"]
+        if result["ops_per_sec"] < expected * (1 - tolerance):
+            regressions.append((name, expected, result["ops_per_sec"]))
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump({
+            "python": sys.version.split()[0],
+            "pygame": pygame.version.ver,
+            "results": results,
+        }, f, indent=1, sort_keys=True)
+
+
+def _print_result(name, result):
+    print("%-36s %12.0f ops/s   p50 %9.2f  p95 %9.2f  p99 %9.2f us" %
+          (name, result["ops_per_sec"], result["p50_us"], result["p95_us"], result["p99_us"]))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the climbing game benchmarks.")
+    parser.add_argument("-k", dest="filter", default="",
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed drop in ops/sec before failing (default %(default)s)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if not names:
+        print("No benchmarks match %r" % args.filter)
+        sys.exit(2)
+    results = run_benchmarks(names, args.rounds, report=_print_result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if args.save_baseline:
+        # Keep baseline entries for benchmarks that weren't run this time
+        baseline = load_baseline(args.baseline) or {}
+        baseline.update(results)
+        save_baseline(args.baseline, baseline)
+        print("Baseline saved to %s" % args.baseline)
+        sys.exit(0)
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline at %s; run with --save-baseline to create one." % args.baseline)
+        sys.exit(0)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, expected, actual in regressions:
+        print("REGRESSION %s: %.0f ops/s, baseline %.0f ops/s (%.0f%% slower)" %
+              (name, actual, expected, 100 * (1 - actual / expected)))
+    if regressions:
+        sys.exit(1)
+    print("No regressions beyond %.0f%% of the baseline." % (args.tolerance * 100))
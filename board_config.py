@@ -11,3 +11,35 @@ BACKGROUND_IMAGE_PATH = None
 # Shape properties for the board
 CIRCLE_RADIUS = 15  # The radius of the circles in the board
 SQUARE_SIZE = 20    # The size of the squares in the board
+
+# Tall walls
+# A board can set 'wall_height' in pixels to be taller than the screen
+# (otherwise the wall is one screen high); the camera then scrolls to follow
+# the climber's upper body.
+CAMERA_MARGIN = 300  # How near the top or bottom of the screen the upper body gets before scrolling
+CAMERA_SPEED = 1500  # Fastest the camera scrolls, in pixels per second
+
+# Frame pacing
+MAX_FPS = 60                # Frame rate cap for the game and the board editor (0 for uncapped)
+PHYSICS_SUBSTEPS = 2        # Fixed physics ticks per frame at MAX_FPS
+SHOW_FRAME_STATS = False    # Start with the frame-time overlay visible (F3 toggles it)
+FRAME_STATS_FILE = None     # Set to a file path to dump frame timings on exit
+SHOW_STARTUP_TIMES = False  # Print how long each step of launching the game took
+
+# Profiling
+# F4 toggles a Chrome trace of each frame's phases, F5 cProfiles the next
+# PROFILE_FRAMES frames; setting CLIMBING_TRACE to a path traces from launch
+TRACE_FILE = "trace.json"     # Where F4 writes the trace
+PROFILE_FILE = "frames.prof"  # Where F5 writes the profile, for pstats or snakeviz
+PROFILE_FRAMES = 120
+
+# Input
+MOUSE_INTERPOLATION = False  # Give physics ticks between mouse motion events points in between
+
+# Rewind
+REWIND_SECONDS = 10  # How far back holding Backspace can rewind the climb
+
+# Input recording
+# Set to a file path to record every simulation tick's input, for replay with
+# python input_log.py <file>
+RECORD_INPUT_FILE = None
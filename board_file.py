@@ -0,0 +1,258 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from board_config import SCREEN_HEIGHT
+
+# Board files. Besides the board_state.json the editor writes, boards can be
+# stored in a compact binary format that's memory-mapped on load, so a wall
+# with tens of thousands of holds doesn't have to be parsed into nested lists
+# before it can be used.
+#
+# Binary layout (little-endian), version 1:
+#   magic b'CLMB'
+#   uint16 version, uint16 reserved
+#   uint32 num_rows
+#   uint32 circle count, uint32 square count
+#   1 byte circle type code, 1 byte square type code ('q' int64 or 'd' float64)
+#   uint16 reserved
+#   uint32 metadata length, then that many bytes of UTF-8 JSON
+#   zero padding to an 8-byte boundary
+#   circles as count * 2 values (x, y, x, y, ...), then squares the same way
+#
+# Coordinates are stored as int64 when every value in the array is an int and
+# as float64 otherwise, so boards saved by the editor round-trip exactly (an
+# array mixing ints and floats comes back as equal floats). Any keys other
+# than num_rows, circles and squares go in the metadata.
+
+MAGIC = b'CLMB'
+VERSION = 1
+BINARY_EXTENSION = ".board"
+_HEADER = struct.Struct('<4sHHIIIccHI')
+HOLD_KINDS = ('circles', 'squares')
+
+
+def _type_code(positions):
+    for pos in positions:
+        for value in pos:
+            if not isinstance(value, int) or isinstance(value, bool):
+                return 'd'
+    return 'q'
+
+
+class HoldArray:
+    """Read-only sequence of (x, y) tuples backed by a flat buffer of coordinates."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values) // 2
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("hold index out of range")
+        return (self.values[2 * i], self.values[2 * i + 1])
+
+    def __iter__(self):
+        values = self.values
+        for i in range(0, len(values), 2):
+            yield (values[i], values[i + 1])
+
+    def tolist(self):
+        return [[x, y] for x, y in self]
+
+
+class BoardFile:
+    """A memory-mapped binary board.
+
+    Supports the same lookups as a board_state dict (board['circles'] etc.),
+    with circles and squares returned as HoldArray views onto the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self.holds = {}
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError("%s is too short to be a board file" % self.path)
+        (magic, version, _, num_rows, circle_count, square_count,
+         circle_code, square_code, _, metadata_length) = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError("%s is not a board file" % self.path)
+        if version != VERSION:
+            raise ValueError("%s is board format version %d, expected %d" %
+                             (self.path, version, VERSION))
+
+        offset = _HEADER.size
+        self.metadata = json.loads(bytes(self._view[offset:offset + metadata_length]))
+        offset = _aligned(offset + metadata_length)
+
+        self.num_rows = num_rows
+        self.holds = {}
+        self._raw = {}
+        for kind, count, code in (('circles', circle_count, circle_code),
+                                  ('squares', square_count, square_code)):
+            code = code.decode()
+            end = offset + count * 2 * 8
+            if end > len(self._mmap):
+                raise ValueError("%s is truncated" % self.path)
+            self._raw[kind] = (offset, count, code)
+            values = self._view[offset:end].cast(code)
+            if sys.byteorder != 'little':
+                values = _swapped(values, code)
+            self.holds[kind] = HoldArray(values)
+            offset = end
+
+    def __getitem__(self, key):
+        if key == 'num_rows':
+            return self.num_rows
+        if key in self.holds:
+            return self.holds[key]
+        return self.metadata[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key == 'num_rows' or key in self.holds or key in self.metadata
+
+    def as_array(self, kind):
+        """The holds of one kind as a read-only (count, 2) NumPy array, without copying."""
+        import numpy as np
+        offset, count, code = self._raw[kind]
+        dtype = np.dtype('<i8' if code == 'q' else '<f8')
+        return np.frombuffer(self._mmap, dtype=dtype, count=count * 2, offset=offset).reshape(-1, 2)
+
+    def to_board_state(self):
+        """Materialise the board as a board_state dict, as stored in the JSON file."""
+        state = dict(self.metadata)
+        state['num_rows'] = self.num_rows
+        for kind in HOLD_KINDS:
+            state[kind] = self.holds[kind].tolist()
+        return state
+
+    def close(self):
+        """Unmap the file. HoldArrays and arrays taken from it must not be used afterwards."""
+        for holds in self.holds.values():
+            if isinstance(holds.values, memoryview):
+                holds.values.release()
+        self.holds = {}
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _aligned(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _swapped(values, code):
+    from array import array
+    swapped = array(code, values)
+    swapped.byteswap()
+    return swapped
+
+
+def write_board_file(path, board_state):
+    """Write a board_state dict in the binary format."""
+    from array import array
+    metadata = {key: value for key, value in board_state.items()
+                if key != 'num_rows' and key not in HOLD_KINDS}
+    metadata_bytes = json.dumps(metadata).encode()
+    codes = [_type_code(board_state[kind]) for kind in HOLD_KINDS]
+    header = _HEADER.pack(MAGIC, VERSION, 0, board_state['num_rows'],
+                          len(board_state['circles']), len(board_state['squares']),
+                          codes[0].encode(), codes[1].encode(), 0, len(metadata_bytes))
+
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(metadata_bytes)
+        f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
+        for kind, code in zip(HOLD_KINDS, codes):
+            values = array(code, (value for pos in board_state[kind] for value in pos))
+            if sys.byteorder != 'little':
+                values.byteswap()
+            values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def wall_height(board_state):
+    """Height of the wall in pixels: the board's 'wall_height', or one screen."""
+    if not board_state:
+        return SCREEN_HEIGHT
+    return board_state.get('wall_height', SCREEN_HEIGHT)
+
+
+def is_board_file(path):
+    return path.endswith(BINARY_EXTENSION)
+
+
+def load_board_state(path):
+    """Load a board from JSON or the binary format, or return None if it doesn't exist.
+
+    Binary boards come back as a BoardFile rather than a dict.
+    """
+    if not os.path.exists(path):
+        return None
+    if is_board_file(path):
+        return BoardFile(path)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_board_state(path, board_state):
+    """Save a board_state dict as JSON or the binary format, chosen by extension.
+
+    Either way the file is written under a temporary name and renamed into
+    place, so a crash mid-save never leaves a half-written board behind.
+    """
+    if is_board_file(path):
+        write_board_file(path, board_state)
+    else:
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(board_state, f)
+        os.replace(tmp_path, path)
+
+
+def convert(source, destination):
+    """Convert a board between JSON and the binary format."""
+    board_state = load_board_state(source)
+    if board_state is None:
+        raise FileNotFoundError(source)
+    if isinstance(board_state, BoardFile):
+        with board_state:
+            board_state = board_state.to_board_state()
+    save_board_state(destination, board_state)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python board_file.py SOURCE DESTINATION")
+        print("Converts between board_state.json and %s files." % BINARY_EXTENSION)
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
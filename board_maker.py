@@ -1,7 +1,13 @@
+import os
 import pygame
 import sys
-import json
-import os
+from hold_index import HoldIndex
+from board_saver import BoardSaver
+from edit_history import EditHistory
+from frame_scheduler import FrameScheduler
+from profiling import Profiling, scope
+from board_config import SHOW_FRAME_STATS, FRAME_STATS_FILE
+import board_file
 
 # Initialize pygame
 pygame.init()
@@ -34,42 +40,169 @@ BUTTON_HEIGHT = 50
 BUTTON_POS = (SCREEN_WIDTH - BUTTON_WIDTH - 10,
               SCREEN_HEIGHT - BUTTON_HEIGHT - 10)
 
-# File to save/load the board state
+# Anything further than this from the click can't be under the cursor
+HIT_RADIUS = max(CIRCLE_RADIUS, SQUARE_SIZE // 2 * 2 ** 0.5)
+
+# File to save/load the board state (JSON, or a binary .board file)
 STATE_FILE = "board_state.json"
 
+# Autosave
+AUTOSAVE_FILE = "board_state.autosave.json"  # Loaded instead of STATE_FILE when newer
+AUTOSAVE_INTERVAL = 30  # Seconds between autosaves of unsaved changes (0 to turn off)
+AUTOSAVE_EVENT = pygame.USEREVENT + 1
 
-def load_board_state():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r') as f:
-            return json.load(f)
-    return None
 
-
-def save_board_state(circles, squares, num_rows):
-    state = {
-        'num_rows': num_rows,
-        'circles': [circle['pos'] for circle in circles],
-        'squares': [square['pos'] for square in squares],
-    }
-    with open(STATE_FILE, 'w') as f:
-        json.dump(state, f)
+def load_board_state():
+    """Load the board, picking up an autosave newer than the last explicit save."""
+    if os.path.exists(AUTOSAVE_FILE) and (not os.path.exists(STATE_FILE) or
+                                          os.path.getmtime(AUTOSAVE_FILE) > os.path.getmtime(STATE_FILE)):
+        print("Restoring unsaved changes from %s." % AUTOSAVE_FILE)
+        return board_file.load_board_state(AUTOSAVE_FILE)
+    return board_file.load_board_state(STATE_FILE)
+
+
+def build_hold_index(circles, squares):
+    index = HoldIndex()
+    for i, circle in enumerate(circles):
+        index.add(('circles', i), circle['pos'])
+    for i, square in enumerate(squares):
+        index.add(('squares', i), square['pos'])
+    return index
+
+
+def shape_at(hold_index, circles, squares, mouse_pos):
+    """Return the shape under the mouse, preferring squares over circles."""
+    hit_circle = None
+    hit_square = None
+    for kind, i in hold_index.within(mouse_pos, HIT_RADIUS):
+        if kind == 'circles':
+            pos = circles[i]['pos']
+            dist = ((pos[0] - mouse_pos[0]) ** 2 +
+                    (pos[1] - mouse_pos[1]) ** 2) ** 0.5
+            if dist < CIRCLE_RADIUS and (hit_circle is None or i < hit_circle):
+                hit_circle = i
+        else:
+            pos = squares[i]['pos']
+            if (pos[0] - SQUARE_SIZE // 2 <= mouse_pos[0] <= pos[0] + SQUARE_SIZE // 2 and
+                    pos[1] - SQUARE_SIZE // 2 <= mouse_pos[1] <= pos[1] + SQUARE_SIZE // 2):
+                if hit_square is None or i < hit_square:
+                    hit_square = i
+    if hit_square is not None:
+        return ('squares', hit_square), squares[hit_square]
+    if hit_circle is not None:
+        return ('circles', hit_circle), circles[hit_circle]
+    return None, None
+
+
+_fonts = {}
+_text_surfaces = {}
+
+
+def get_font(size):
+    """pygame's default font at the given size, loaded once."""
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont(None, size)
+    return _fonts[size]
+
+
+def render_text(text, size, color):
+    """Rendered text, cached so static labels aren't re-rendered every frame."""
+    key = (text, size, color)
+    if key not in _text_surfaces:
+        _text_surfaces[key] = get_font(size).render(text, True, color)
+    return _text_surfaces[key]
 
 
 def draw_button(screen, text, position, size):
-    pygame.draw.rect(screen, BUTTON_COLOR, (*position, *size))
-    font = pygame.font.SysFont(None, 36)
-    text_surf = font.render(text, True, BUTTON_TEXT_COLOR)
+    button_rect = pygame.draw.rect(screen, BUTTON_COLOR, (*position, *size))
+    text_surf = render_text(text, 36, BUTTON_TEXT_COLOR)
     text_rect = text_surf.get_rect(
         center=(position[0] + size[0] // 2, position[1] + size[1] // 2))
     screen.blit(text_surf, text_rect)
+    return button_rect
+
+
+def draw_hold(surface, kind, pos):
+    """Draw one circle or square hold, returning the area touched."""
+    if kind == 'circles':
+        return pygame.draw.circle(surface, CIRCLE_COLOR, pos, CIRCLE_RADIUS)
+    return pygame.draw.rect(surface, SQUARE_COLOR,
+                            (pos[0] - SQUARE_SIZE // 2, pos[1] - SQUARE_SIZE // 2,
+                             SQUARE_SIZE, SQUARE_SIZE))
+
+
+def hold_rect(kind, pos):
+    """Screen area a hold covers, with a pixel to spare for rounding."""
+    size = CIRCLE_RADIUS * 2 if kind == 'circles' else SQUARE_SIZE
+    rect = pygame.Rect(0, 0, size + 2, size + 2)
+    rect.center = (int(pos[0]), int(pos[1]))
+    return rect
+
+
+def draw_board(surface, circles, squares, num_rows, holds=None):
+    """Draw the background, rows, holds and save button.
+
+    holds limits the holds drawn to those keys; they're still drawn in the
+    same order as a full draw (circles, then squares, by index).
+    """
+    surface.fill(BACKGROUND_COLOR)
+
+    # Draw rows
+    for i in range(1, num_rows):
+        pygame.draw.line(surface, LINE_COLOR, (0, i * ROW_HEIGHT),
+                         (SCREEN_WIDTH, i * ROW_HEIGHT), 2)
+
+    if holds is None:
+        holds = [('circles', i) for i in range(len(circles))]
+        holds += [('squares', i) for i in range(len(squares))]
+    shapes = {'circles': circles, 'squares': squares}
+    for kind, i in sorted(holds):
+        draw_hold(surface, kind, shapes[kind][i]['pos'])
+
+    # Draw save button
+    draw_button(surface, "Save", BUTTON_POS, (BUTTON_WIDTH, BUTTON_HEIGHT))
+
+
+def build_board_layer(circles, squares, num_rows):
+    """Pre-render the whole board, for patching up whatever a drag uncovers."""
+    layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    draw_board(layer, circles, squares, num_rows)
+    return layer
+
+
+def redraw_layer_area(layer, area, circles, squares, hold_index, num_rows, skip=None):
+    """Redraw one area of the board layer from scratch, leaving out the hold keyed skip.
+
+    Only holds the index finds near the area are drawn, so this costs the
+    same however big the board is.
+    """
+    area = pygame.Rect(area)
+    reach = (area.width ** 2 + area.height ** 2) ** 0.5 / 2 + HIT_RADIUS
+    holds = [key for key in hold_index.within(area.center, reach) if key != skip]
+    layer.set_clip(area)
+    draw_board(layer, circles, squares, num_rows, holds)
+    layer.set_clip(None)
+
+
+def move_hold(layer, circles, squares, hold_index, num_rows, key, pos):
+    """Move a hold and patch the board layer to match, returning the area that changed."""
+    shape = (circles if key[0] == 'circles' else squares)[key[1]]
+    area = hold_rect(key[0], shape['pos']).union(hold_rect(key[0], pos))
+    shape['pos'] = list(pos)
+    hold_index.move(key, shape['pos'])
+    redraw_layer_area(layer, area, circles, squares, hold_index, num_rows)
+    return area
 
 
 def main():
     board_state = load_board_state()
+    if isinstance(board_state, board_file.BoardFile):
+        with board_state:
+            board_state = board_state.to_board_state()
 
     if board_state:
-        circles = [{'pos': pos} for pos in board_state['circles']]
-        squares = [{'pos': pos} for pos in board_state['squares']]
+        circles = [{'pos': list(pos)} for pos in board_state['circles']]
+        squares = [{'pos': list(pos)} for pos in board_state['squares']]
         num_rows = board_state.get('num_rows', NUM_ROWS)
     else:
         # Create shapes if no state is saved
@@ -77,67 +210,155 @@ def main():
         squares = [{'pos': [300 + i * 50, 150 + i * 50]} for i in range(10)]
         num_rows = NUM_ROWS
 
+    hold_index = build_hold_index(circles, squares)
+
+    # Saving happens on a background thread; unsaved collects the holds
+    # moved since the saver was last told about them.
+    # Built on the loaded board so wall_height and any other keys are saved too
+    saver = BoardSaver(dict(board_state or {}, num_rows=num_rows,
+                            circles=[circle['pos'] for circle in circles],
+                            squares=[square['pos'] for square in squares]))
+    unsaved = {}
+    history = EditHistory()
+    if AUTOSAVE_INTERVAL:
+        pygame.time.set_timer(AUTOSAVE_EVENT, int(AUTOSAVE_INTERVAL * 1000))
+
+    # Everything but the hold being dragged is kept pre-rendered, and each
+    # frame only patches the areas that changed.
+    board_layer = build_board_layer(circles, squares, num_rows)
+    screen.blit(board_layer, (0, 0))
+    pygame.display.flip()
+
+    dragging_key = None
     dragging_shape = None
+    dragging_rect = None  # Where the dragged hold is on screen
+    drag_start = None  # Where the dragged hold was picked up
+    overlay_rect = None
+    show_stats = SHOW_FRAME_STATS
+    scheduler = FrameScheduler()
+    # F4 traces each frame's phases, F5 profiles the next few frames
+    profiling = Profiling([scheduler])
     running = True
 
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-
-                # Check if the user clicked on a circle
-                for circle in circles:
-                    dist = ((circle['pos'][0] - mouse_pos[0]) ** 2 +
-                            (circle['pos'][1] - mouse_pos[1]) ** 2) ** 0.5
-                    if dist < CIRCLE_RADIUS:
-                        dragging_shape = circle
-                        break
-
-                # Check if the user clicked on a square
-                for square in squares:
-                    if (square['pos'][0] - SQUARE_SIZE // 2 <= mouse_pos[0] <= square['pos'][0] + SQUARE_SIZE // 2 and
-                            square['pos'][1] - SQUARE_SIZE // 2 <= mouse_pos[1] <= square['pos'][1] + SQUARE_SIZE // 2):
-                        dragging_shape = square
-                        break
-
-                # Check if the user clicked the save button
-                if (BUTTON_POS[0] <= mouse_pos[0] <= BUTTON_POS[0] + BUTTON_WIDTH and
-                        BUTTON_POS[1] <= mouse_pos[1] <= BUTTON_POS[1] + BUTTON_HEIGHT):
-                    save_board_state(circles, squares, num_rows)
-                    print("Board state saved.")
-
-            elif event.type == pygame.MOUSEBUTTONUP:
-                dragging_shape = None
-
-            elif event.type == pygame.MOUSEMOTION and dragging_shape:
-                dragging_shape['pos'] = list(event.pos)
+        # Nothing on screen changes without input, so sleep until some
+        # arrives; even a held drag only needs drawing when the mouse moves.
+        events = scheduler.events(idle=True)
+        dirty_rects = []
+
+        with scheduler.phase("input"):
+            drag_moved = False
+            for event in events:
+                if profiling.handle_event(event):
+                    continue
+                if event.type == pygame.QUIT:
+                    running = False
+
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    mouse_pos = event.pos
+
+                    # Check if the user clicked on a circle or square
+                    hit_key, hit_shape = shape_at(
+                        hold_index, circles, squares, mouse_pos)
+                    if hit_shape is not None and dragging_shape is None:
+                        dragging_key, dragging_shape = hit_key, hit_shape
+                        drag_start = list(hit_shape['pos'])
+                        # Take the hold out of the layer; it's drawn on top while dragged
+                        dragging_rect = hold_rect(hit_key[0], hit_shape['pos'])
+                        with scope(profiling.tracer, "board-draw"):
+                            redraw_layer_area(board_layer, dragging_rect, circles, squares,
+                                              hold_index, num_rows, skip=hit_key)
+                        draw_hold(screen, hit_key[0], hit_shape['pos'])
+                        dirty_rects.append(dragging_rect)
+
+                    # Check if the user clicked the save button
+                    if (BUTTON_POS[0] <= mouse_pos[0] <= BUTTON_POS[0] + BUTTON_WIDTH and
+                            BUTTON_POS[1] <= mouse_pos[1] <= BUTTON_POS[1] + BUTTON_HEIGHT):
+                        saver.update(unsaved)
+                        unsaved = {}
+                        saver.save(STATE_FILE)
+                        print("Saving board state.")
+
+                elif event.type == pygame.MOUSEBUTTONUP and dragging_shape:
+                    # Put the hold back into the layer where it was dropped,
+                    # covering where it was last drawn too
+                    area = dragging_rect.union(hold_rect(dragging_key[0], dragging_shape['pos']))
+                    with scope(profiling.tracer, "board-draw"):
+                        redraw_layer_area(board_layer, area, circles, squares, hold_index, num_rows)
+                    screen.blit(board_layer, area, area)
+                    dirty_rects.append(area)
+                    history.record(dragging_key, drag_start, dragging_shape['pos'])
+                    unsaved[dragging_key] = dragging_shape['pos']
+                    dragging_key, dragging_shape, dragging_rect = None, None, None
+                    drag_moved = False
+
+                elif event.type == pygame.MOUSEMOTION and dragging_shape:
+                    dragging_shape['pos'] = list(event.pos)
+                    hold_index.move(dragging_key, event.pos)
+                    drag_moved = True
+
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    show_stats = not show_stats
+
+                elif (event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL and
+                      event.key in (pygame.K_z, pygame.K_y) and dragging_shape is None):
+                    # Ctrl+Z undoes, Ctrl+Y or Ctrl+Shift+Z redoes
+                    if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                        edit = history.redo()
+                    else:
+                        edit = history.undo()
+                    if edit:
+                        key, pos = edit
+                        with scope(profiling.tracer, "board-draw"):
+                            area = move_hold(board_layer, circles, squares, hold_index, num_rows, key, pos)
+                        screen.blit(board_layer, area, area)
+                        dirty_rects.append(area)
+                        unsaved[key] = list(pos)
+
+                elif event.type == AUTOSAVE_EVENT and unsaved:
+                    saver.update(unsaved)
+                    unsaved = {}
+                    saver.save(AUTOSAVE_FILE)
+
+            if saver.error:
+                print("Saving failed: %s" % saver.error)
+                saver.error = None
 
         # Drawing
-        screen.fill(BACKGROUND_COLOR)
-
-        # Draw rows
-        for i in range(1, num_rows):
-            pygame.draw.line(screen, LINE_COLOR, (0, i * ROW_HEIGHT),
-                             (SCREEN_WIDTH, i * ROW_HEIGHT), 2)
-
-        # Draw circles
-        for circle in circles:
-            pygame.draw.circle(screen, CIRCLE_COLOR,
-                               circle['pos'], CIRCLE_RADIUS)
-
-        # Draw squares
-        for square in squares:
-            pygame.draw.rect(screen, SQUARE_COLOR,
-                             (square['pos'][0] - SQUARE_SIZE // 2, square['pos'][1] - SQUARE_SIZE // 2,
-                              SQUARE_SIZE, SQUARE_SIZE))
-
-        # Draw save button
-        draw_button(screen, "Save", BUTTON_POS, (BUTTON_WIDTH, BUTTON_HEIGHT))
-
-        pygame.display.flip()
+        with scheduler.phase("draw"), scope(profiling.tracer, "board-draw"):
+            if overlay_rect:
+                screen.blit(board_layer, overlay_rect, overlay_rect)
+                dirty_rects.append(overlay_rect)
+            if dragging_shape and (drag_moved or (overlay_rect and overlay_rect.colliderect(dragging_rect))):
+                # Uncover where the hold was, then draw it where it is
+                screen.blit(board_layer, dragging_rect, dragging_rect)
+                dirty_rects.append(dragging_rect)
+                dragging_rect = hold_rect(dragging_key[0], dragging_shape['pos'])
+                draw_hold(screen, dragging_key[0], dragging_shape['pos'])
+                dirty_rects.append(dragging_rect)
+
+            overlay_rect = None
+            if show_stats:
+                overlay_rect = scheduler.draw_overlay(screen)
+                dirty_rects.append(overlay_rect)
+
+        with scheduler.phase("flip"):
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+
+        scheduler.end_frame()
+        profiling.end_frame()
+
+    profiling.close()
+    pygame.time.set_timer(AUTOSAVE_EVENT, 0)
+    # Keep anything not yet saved, and let queued saves finish
+    if unsaved:
+        saver.update(unsaved)
+        saver.save(AUTOSAVE_FILE)
+    saver.close()
+
+    if FRAME_STATS_FILE:
+        scheduler.dump(FRAME_STATS_FILE)
 
     pygame.quit()
     sys.exit()
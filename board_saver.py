@@ -0,0 +1,82 @@
+import threading
+import board_file
+
+# Saves boards from a background thread so the editor's frame loop never
+# waits on serialising and writing a large board.
+#
+# The saver keeps its own copy of the board. The editor only hands over the
+# holds that changed since it last did, so its side of a save costs the same
+# however big the board is; the full write happens on the worker, through
+# board_file.save_board_state's write-and-rename.
+
+
+class BoardSaver:
+    """Background writer for one board.
+
+    Call update() with changed holds and save(path) to queue a write of the
+    board as of then. Saves happen in the order they were queued.
+    """
+
+    def __init__(self, board_state):
+        self._state = dict(board_state)  # Keeps wall_height and any other keys
+        for kind in ('circles', 'squares'):
+            self._state[kind] = [list(pos) for pos in board_state[kind]]
+        self._changes = {}  # (kind, i) -> pos, not yet applied to _state
+        self._paths = []  # Queued saves
+        self._busy = False
+        self._closing = False
+        self._condition = threading.Condition()
+        self.saves = 0  # Completed writes
+        self.error = None  # Last exception raised by a write, if any
+        self._thread = threading.Thread(target=self._run, name="board-saver", daemon=True)
+        self._thread.start()
+
+    def update(self, changes):
+        """Record new positions for the holds in changes, a {(kind, i): pos} dict."""
+        with self._condition:
+            for key, pos in changes.items():
+                self._changes[key] = list(pos)
+
+    def save(self, path):
+        """Queue a write of the board, with every update so far, to path."""
+        with self._condition:
+            self._paths.append((path, self._changes))
+            self._changes = {}
+            self._condition.notify_all()
+
+    def pending(self):
+        """Whether any queued save hasn't finished yet."""
+        with self._condition:
+            return bool(self._paths) or self._busy
+
+    def flush(self, timeout=None):
+        """Wait for queued saves to finish. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._paths and not self._busy, timeout)
+
+    def close(self):
+        """Finish any queued saves and stop the worker."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._paths or self._closing)
+                if not self._paths:
+                    return
+                path, changes = self._paths.pop(0)
+                self._busy = True
+            try:
+                for (kind, i), pos in changes.items():
+                    self._state[kind][i] = pos
+                board_file.save_board_state(path, self._state)
+                self.saves += 1
+            except Exception as e:  # Reported through .error, the editor keeps running
+                self.error = e
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
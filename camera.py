@@ -0,0 +1,57 @@
+from board_config import SCREEN_HEIGHT, CAMERA_MARGIN, CAMERA_SPEED
+
+# Vertical camera for walls taller than the screen. Positions in the
+# simulation are wall coordinates; the camera's y is the wall height shown
+# at the top of the screen, so screen y = wall y - camera.y.
+
+
+class Camera:
+    """Scrolls to keep a point (the climber's upper body) CAMERA_MARGIN
+    pixels away from the top and bottom of the screen, without leaving the wall.
+
+    y is always a whole number of pixels, so the board can be scrolled with
+    Surface.scroll() instead of being redrawn.
+    """
+
+    def __init__(self, wall_height, view_height=SCREEN_HEIGHT, margin=CAMERA_MARGIN,
+                 speed=CAMERA_SPEED):
+        self.view_height = view_height
+        self.margin = min(margin, view_height // 2)
+        self.speed = speed
+        self.max_y = max(0, wall_height - view_height)
+        self.y = self.max_y  # Climbs start at the bottom of the wall
+        self.target_y = self.y
+
+    def follow(self, pos):
+        """Aim at pos, if it's too near an edge of the screen."""
+        target = self.target_y
+        if pos[1] - target < self.margin:
+            target = pos[1] - self.margin
+        elif pos[1] - target > self.view_height - self.margin:
+            target = pos[1] - (self.view_height - self.margin)
+        self.target_y = int(round(min(max(target, 0), self.max_y)))
+
+    def update(self, frame_time):
+        """Scroll towards the target for one frame. Returns how far the camera moved."""
+        step = max(1, int(self.speed * frame_time))
+        offset = min(max(self.target_y - self.y, -step), step)
+        self.y += offset
+        return offset
+
+    def jump(self):
+        """Move straight to the target."""
+        offset = self.target_y - self.y
+        self.y = self.target_y
+        return offset
+
+    @property
+    def moving(self):
+        return self.y != self.target_y
+
+    def to_wall(self, pos):
+        """Screen position to wall position."""
+        return (pos[0], pos[1] + self.y)
+
+    def to_screen(self, pos):
+        """Wall position to screen position."""
+        return (pos[0], pos[1] - self.y)
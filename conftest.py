@@ -0,0 +1,5 @@
+import os
+
+# Keep pygame from opening a real window when tests import the game modules
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,42 @@
+from collections import deque
+
+# Undo/redo for the board editor. Every edit is stored as the change it made
+# (which hold, where it was, where it went) rather than as a copy of the
+# board, so history costs the same on a board of any size.
+
+HISTORY_LIMIT = 500  # Edits kept for undo
+
+
+class EditHistory:
+    """Undo and redo stacks of hold moves."""
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+    def record(self, key, old_pos, new_pos):
+        """Remember that the hold key moved from old_pos to new_pos."""
+        old_pos, new_pos = tuple(old_pos), tuple(new_pos)
+        if old_pos == new_pos:
+            return
+        self._undo.append((key, old_pos, new_pos))
+        self._redo.clear()
+
+    def undo(self):
+        """Return (key, pos) to put a hold back where it was, or None if there's nothing to undo."""
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        self._redo.append(edit)
+        return edit[0], edit[1]
+
+    def redo(self):
+        """Return (key, pos) to repeat the last undone edit, or None."""
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._undo.append(edit)
+        return edit[0], edit[2]
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,254 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pygame
+from board_config import SCREEN_HEIGHT, BACKGROUND_IMAGE_PATH, PHYSICS_SUBSTEPS
+from simulation import Simulation
+from camera import Camera
+from input_log import InputLog
+from asset_cache import AssetCache
+import board_file
+import grade_boards
+import main as game
+
+# Renders boards and recorded climbs to PNG files without a window, drawn
+# exactly as main.py draws them, with the work spread over a process pool.
+#
+#   python export_images.py thumbnails boards/ -o thumbs/
+#   python export_images.py replay climb.log --board board_state.json -o frames/
+#
+# A thumbnail is the bottom screen of the wall, where a climb starts, scaled
+# down. Thumbnails newer than their board are left alone, so refreshing a
+# catalogue only renders what changed.
+#
+# A replay plays the input log through the simulation in this process, which
+# takes microseconds a tick, and keeps a snapshot and camera position for
+# every frame. Workers restore those snapshots and do the slow part, drawing
+# and PNG encoding, on contiguous runs of frames so the board layer is
+# scrolled from one frame to the next as in the game.
+
+THUMBNAIL_SIZE = (150, 225)
+FRAMES_PER_TASK = 64  # Frames a worker draws in one go, sharing its board layer between them
+
+_worker = {}  # Per-process drawing state, set up by _init_worker()
+
+
+def _init_worker(board_path=None, background_path=BACKGROUND_IMAGE_PATH):
+    """Get a process ready to draw offscreen: the dummy video driver, a display
+    mode for surfaces to convert to, the background and optionally a board."""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+    _worker["background"] = game.load_background_image(background_path, AssetCache())
+    if board_path is not None:
+        _worker["board_state"] = board_file.load_board_state(board_path)
+
+
+def _pool(processes, board_path, background_path):
+    # Spawned rather than forked, so no worker inherits a parent's SDL state
+    return ProcessPoolExecutor(processes, multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(board_path, background_path))
+
+
+def render_board(board_state, background_image=None):
+    """The bottom screen of a board as the game first shows it, without the climber."""
+    sim = Simulation(board_state)
+    return game.build_board_layer(sim, background_image, top=max(0, sim.wall_height - SCREEN_HEIGHT))
+
+
+def thumbnail_name(board_name):
+    return os.path.splitext(board_name)[0] + ".png"
+
+
+def _export_thumbnail(path, output_dir, size, force):
+    """Write one board's thumbnail. Returns (board name, error or None, whether it was written)."""
+    name = os.path.basename(path)
+    out_path = os.path.join(output_dir, thumbnail_name(name))
+    board_state = None
+    try:
+        if (not force and os.path.exists(out_path)
+                and os.path.getmtime(out_path) >= os.path.getmtime(path)):
+            return name, None, False
+        board_state = board_file.load_board_state(path)
+        if board_state is None:
+            raise FileNotFoundError(path)
+        image = render_board(board_state, _worker.get("background"))
+        pygame.image.save(pygame.transform.smoothscale(image, size), out_path)
+        return name, None, True
+    except Exception as e:  # One bad board shouldn't stop the rest of the catalogue
+        return name, "%s: %s" % (type(e).__name__, e), False
+    finally:
+        if isinstance(board_state, board_file.BoardFile):
+            board_state.close()
+
+
+def export_thumbnails(directory, output_dir, size=THUMBNAIL_SIZE, processes=None, force=False,
+                      background_path=BACKGROUND_IMAGE_PATH, report=None):
+    """Write a thumbnail PNG per board in directory. Returns how many were written.
+
+    report, if given, is called with each (board name, error, written).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(directory, name) for name in grade_boards.list_boards(directory)]
+    size = tuple(size)
+    written = 0
+    if processes == 1:
+        _init_worker(None, background_path)
+        results = (_export_thumbnail(path, output_dir, size, force) for path in paths)
+        for result in results:
+            written += result[2]
+            if report:
+                report(*result)
+        return written
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, min(32, len(paths) // (processes * 4)))
+    with _pool(processes, None, background_path) as pool:
+        count = len(paths)
+        for result in pool.map(_export_thumbnail, paths, [output_dir] * count, [size] * count,
+                               [force] * count, chunksize=chunksize):
+            written += result[2]
+            if report:
+                report(*result)
+    return written
+
+
+def replay_frames(log, board_state=None, ticks_per_frame=PHYSICS_SUBSTEPS):
+    """Play an input log and return a (snapshot, camera y) per frame, starting with the first pose.
+
+    The camera is driven as in the game: it follows the upper body, except
+    while the mouse button is held.
+    """
+    sim = Simulation(board_state, dt=log.dt)
+    camera = Camera(sim.wall_height)
+    camera.follow(sim.upper_body_pos)
+    camera.jump()
+    frame_time = ticks_per_frame * log.dt
+    frames = [(sim.snapshot(), camera.y)]
+    tick = sim.tick
+    for i, (mouse_pos, mouse_pressed, right_clicks) in enumerate(log, 1):
+        tick(mouse_pos, mouse_pressed, right_clicks)
+        if i % ticks_per_frame == 0 or i == log.tick_count:
+            if not mouse_pressed:
+                camera.follow(sim.upper_body_pos)
+            camera.update(frame_time)
+            frames.append((sim.snapshot(), camera.y))
+    return frames
+
+
+def frame_name(number):
+    return "frame_%05d.png" % number
+
+
+def _export_frames(first, frames, output_dir, dt):
+    """Draw a run of consecutive frames, numbered from first, into output_dir."""
+    sim = Simulation(_worker.get("board_state"), dt=dt)
+    background = _worker.get("background")
+    row_index = game.build_row_index(sim)
+    layer = None
+    layer_top = None
+    for number, (snapshot, top) in enumerate(frames, first):
+        sim.restore(snapshot)
+        if layer is None:
+            layer = game.build_board_layer(sim, background, row_index, top)
+        elif top != layer_top:
+            game.scroll_board_layer(layer, sim, row_index, background, top, top - layer_top)
+        layer_top = top
+        frame = layer.copy()
+        game.draw_climber(frame, sim, top)
+        pygame.image.save(frame, os.path.join(output_dir, frame_name(number)))
+    return len(frames)
+
+
+def export_replay(log_path, output_dir, board_path=None, processes=None,
+                  ticks_per_frame=PHYSICS_SUBSTEPS, background_path=BACKGROUND_IMAGE_PATH,
+                  report=None):
+    """Write a recorded climb as numbered PNG frames. Returns how many were written.
+
+    report, if given, is called with the running count after each run of frames.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    log = InputLog.load(log_path)
+    board_state = board_file.load_board_state(board_path) if board_path else None
+    frames = replay_frames(log, board_state, ticks_per_frame)
+    if isinstance(board_state, board_file.BoardFile):
+        board_state.close()
+
+    processes = processes or os.cpu_count() or 1
+    run_length = max(1, min(FRAMES_PER_TASK, math.ceil(len(frames) / processes)))
+    firsts = range(0, len(frames), run_length)
+    runs = [frames[first:first + run_length] for first in firsts]
+    count = len(runs)
+    written = 0
+    if processes == 1:
+        _init_worker(board_path, background_path)
+        results = map(_export_frames, firsts, runs, [output_dir] * count, [log.dt] * count)
+        for written_now in results:
+            written += written_now
+            if report:
+                report(written)
+        return written
+
+    with _pool(processes, board_path, background_path) as pool:
+        for written_now in pool.map(_export_frames, firsts, runs, [output_dir] * count,
+                                    [log.dt] * count):
+            written += written_now
+            if report:
+                report(written)
+    return written
+
+
+def _size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render boards and replays to PNG files, headless.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    thumbnails = commands.add_parser("thumbnails", help="a thumbnail per board in a directory")
+    thumbnails.add_argument("directory", help="directory of board_state .json or %s files" %
+                            board_file.BINARY_EXTENSION)
+    thumbnails.add_argument("--size", type=_size, default=THUMBNAIL_SIZE, metavar="WxH",
+                            help="thumbnail size (default: %dx%d)" % THUMBNAIL_SIZE)
+    thumbnails.add_argument("--force", action="store_true",
+                            help="render every board, even ones with an up-to-date thumbnail")
+
+    replay = commands.add_parser("replay", help="a recorded climb as a PNG per frame")
+    replay.add_argument("log", help="input log recorded with RECORD_INPUT_FILE")
+    replay.add_argument("--board", help="board the climb was recorded on (default: empty wall)")
+    replay.add_argument("--ticks-per-frame", type=int, default=PHYSICS_SUBSTEPS,
+                        help="physics ticks between frames (default: %d, the game's)" % PHYSICS_SUBSTEPS)
+
+    for command in (thumbnails, replay):
+        command.add_argument("-o", "--output", required=True, help="directory to write the PNGs to")
+        command.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+        command.add_argument("--background", default=BACKGROUND_IMAGE_PATH,
+                             help="background image (default: BACKGROUND_IMAGE_PATH)")
+    return parser.parse_args(argv)
+
+
+def _print_thumbnail(name, error, written):
+    if error:
+        print("%-32s error  %s" % (name, error))
+    elif written:
+        print(name)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    if args.command == "thumbnails":
+        written = export_thumbnails(args.directory, args.output, args.size, args.processes,
+                                    args.force, args.background, report=_print_thumbnail)
+        print("Wrote %d thumbnails in %.1fs to %s" % (written, time.perf_counter() - start, args.output))
+    else:
+        written = export_replay(args.log, args.output, args.board, args.processes,
+                                args.ticks_per_frame, args.background)
+        print("Wrote %d frames in %.1fs to %s" % (written, time.perf_counter() - start, args.output))
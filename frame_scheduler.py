@@ -0,0 +1,156 @@
+import json
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+import pygame
+from board_config import MAX_FPS
+
+# Frame pacing and frame-time bookkeeping shared by main.py and board_maker.py.
+
+PHASES = ("input", "physics", "draw", "flip")
+HISTORY_FRAMES = 600  # How many recent frames the percentiles are taken over
+OVERLAY_COLOR = (0, 0, 0)
+OVERLAY_BACKGROUND = (255, 255, 220)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sequence of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class FrameScheduler:
+    """Caps the frame rate, sleeps while idle and times each frame's phases.
+
+    Wrap each part of the frame in `with scheduler.phase(name):` and call
+    end_frame() once the frame is on screen.
+    """
+
+    def __init__(self, max_fps=MAX_FPS, history=HISTORY_FRAMES):
+        self.max_fps = max_fps
+        self.clock = pygame.time.Clock()
+        self.timings = {name: deque(maxlen=history) for name in PHASES + ("frame",)}
+        self.frame_count = 0
+        self.frame_time = 0.0  # Wall-clock length of the last frame, in seconds
+        self._current = {}
+        self._slept = 0.0
+        self._font = None
+        self._frame_start = time.perf_counter()
+        self.tracer = None  # Set to a profiling.Tracer to also record each phase as a trace event
+
+    def events(self, idle):
+        """Return pending events, sleeping until one arrives when idle.
+
+        Time spent asleep is not counted against any phase, nor in
+        frame_time, so the simulation doesn't try to catch up on it.
+        """
+        if idle:
+            start = time.perf_counter()
+            events = [pygame.event.wait()]
+            self._slept += time.perf_counter() - start
+            events.extend(pygame.event.get())
+        else:
+            events = pygame.event.get()
+        self._frame_start = time.perf_counter()
+        return events
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._current[name] = self._current.get(name, 0.0) + end - start
+            if self.tracer is not None:
+                self.tracer.add(name, start, end)
+
+    def end_frame(self):
+        """Record this frame's timings and wait out the rest of the frame budget."""
+        total = 0.0
+        for name in PHASES:
+            elapsed = self._current.get(name, 0.0)
+            self.timings[name].append(elapsed)
+            total += elapsed
+        self.timings["frame"].append(total)
+        if self.tracer is not None:
+            self.tracer.add("frame", self._frame_start, time.perf_counter())
+        self._current = {}
+        self.frame_count += 1
+        self.frame_time = max(0.0, self.clock.tick(self.max_fps) / 1000 - self._slept)
+        self._slept = 0.0
+
+    def summary(self):
+        """Per-phase p50/p95/p99/max in milliseconds over the recent history."""
+        stats = {}
+        for name, values in self.timings.items():
+            stats[name] = {
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": max(values, default=0.0) * 1000,
+            }
+        return stats
+
+    def dump(self, path):
+        """Write the summary and raw per-frame timings (seconds) as JSON."""
+        with open(path, 'w') as f:
+            json.dump({
+                "frames": self.frame_count,
+                "max_fps": self.max_fps,
+                "summary_ms": self.summary(),
+                "timings": {name: list(values) for name, values in self.timings.items()},
+            }, f)
+
+    def draw_overlay(self, screen, position=(5, 5)):
+        """Draw the p50/p95 table onto screen and return the area covered."""
+        if self._font is None:
+            self._font = pygame.font.SysFont(None, 20)
+        stats = self.summary()
+        lines = ["fps %.0f" % self.clock.get_fps()]
+        for name in PHASES + ("frame",):
+            lines.append("%-7s p50 %5.2f  p95 %5.2f ms" %
+                         (name, stats[name]["p50"], stats[name]["p95"]))
+
+        surfaces = [self._font.render(line, True, OVERLAY_COLOR) for line in lines]
+        width = max(surf.get_width() for surf in surfaces) + 6
+        height = sum(surf.get_height() for surf in surfaces) + 6
+        area = pygame.Rect(position, (width, height))
+        screen.fill(OVERLAY_BACKGROUND, area)
+        y = position[1] + 3
+        for surf in surfaces:
+            screen.blit(surf, (position[0] + 3, y))
+            y += surf.get_height()
+        return area
+
+
+class StartupTimer:
+    """Splits the time from launch to the first frame into named steps.
+
+    Call mark(name) as each step finishes; a step lasts from the previous
+    mark (or start) to its own.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.steps = []  # (name, seconds)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.start
+
+    def report(self):
+        """The steps and total as printable lines, in milliseconds."""
+        lines = ["%-16s %8.1f ms" % (name, seconds * 1000) for name, seconds in self.steps]
+        lines.append("%-16s %8.1f ms" % ("first frame", self.total * 1000))
+        return "\n".join(lines)
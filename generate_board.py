@@ -0,0 +1,254 @@
+import argparse
+import math
+import time
+import numpy as np
+from climber_config import HAND_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT, CIRCLE_RADIUS
+import board_file
+
+# Generates boards of any height and hold count, for testing how the game,
+# the editor and the tools scale.
+#
+#   python generate_board.py -o big.json --holds 100000
+#   python generate_board.py -o tall.board --holds 5000 --screens 20 --seed 3
+#
+# Holds are kept at least min_separation apart by dart throwing over a grid
+# of cells small enough to hold one hold each: every round draws a whole
+# batch of candidates with NumPy and rejects, all at once, the ones too
+# close to a placed hold or to an earlier candidate of the same batch.
+#
+# So that a climber can get up the wall, each kind of hold also gets a
+# spine: a chain from the bottom of the wall to the top in which every hold
+# is within reach of the one before (HAND_BODY_MAX_DISTANCE for hand holds,
+# FEET_BODY_MAX_DISTANCE for foot holds). The rest are scattered around it.
+#
+# The wall is always SCREEN_WIDTH wide, as the game has no sideways scrolling.
+
+DEFAULT_DENSITY = 200  # Holds per screen of wall when no height is given
+MIN_SEPARATION = 2 * CIRCLE_RADIUS  # Closest two hold centres may be, in pixels
+EDGE_MARGIN = CIRCLE_RADIUS  # Keeps holds wholly on the wall
+ROWS_PER_SCREEN = 8  # Row spacing of board_maker.py's boards
+MAX_BATCH = 1 << 16  # Candidates drawn per round
+MAX_ROUNDS = 200  # Tries at a spine hold, and rounds of dart throwing, before giving up
+STALLED_ROUNDS = 20  # Rounds in a row that place nothing before a wall counts as full
+SPINE_TRIES = 32  # Positions tried at once for a spine hold that's in the way
+SPINE_MAX_RISE = 0.8  # Highest a spine step climbs, as a share of reach, leaving room to sway
+
+
+class _Grid:
+    """Placed holds, bucketed in cells of side min_separation / sqrt(2).
+
+    No two holds min_separation apart can share a cell, so each cell is one
+    index into points (or -1), and every hold that could be too near a point
+    is in the (2 * span + 1)^2 cells around it.
+    """
+
+    def __init__(self, width, height, min_separation, capacity):
+        self.min_separation_sq = min_separation * min_separation
+        self.cell = min_separation / math.sqrt(2)
+        self.span = math.ceil(min_separation / self.cell)
+        # Padded by span cells on every side so neighbours never need bounds checks
+        self.cells = np.full((int(height / self.cell) + 1 + 2 * self.span,
+                              int(width / self.cell) + 1 + 2 * self.span), -1, dtype=np.int64)
+        # Room for a whole batch of tentatively placed candidates past capacity
+        self.points = np.empty((capacity + MAX_BATCH, 2), dtype=np.int64)
+        self.count = 0
+        offsets = np.arange(-self.span, self.span + 1)
+        self._dy, self._dx = (axis.ravel() for axis in np.meshgrid(offsets, offsets, indexing='ij'))
+
+    def cells_of(self, candidates):
+        return ((candidates[:, 1] / self.cell).astype(np.int64) + self.span,
+                (candidates[:, 0] / self.cell).astype(np.int64) + self.span)
+
+    def _near(self, candidates, cy, cx):
+        """Indices of the holds around each candidate, and whether each is too near."""
+        neighbours = self.cells[cy[:, None] + self._dy, cx[:, None] + self._dx]
+        found = neighbours >= 0
+        offsets = self.points[np.where(found, neighbours, 0)] - candidates[:, None, :]
+        too_near = found & ((offsets * offsets).sum(axis=2) < self.min_separation_sq)
+        return neighbours, too_near
+
+    def clear(self, candidates):
+        """Which candidates are at least min_separation from every placed hold."""
+        cy, cx = self.cells_of(candidates)
+        return ~self._near(candidates, cy, cx)[1].any(axis=1)
+
+    def add(self, candidates, limit):
+        """Place up to limit of the candidates that are clear of the placed holds
+        and of each other, preferring earlier ones. Returns the mask of placed ones."""
+        placed = self.clear(candidates)
+        order = np.flatnonzero(placed)
+        cy, cx = self.cells_of(candidates[order])
+        # Keep the first candidate in each cell, tentatively placed at
+        # indices after the existing holds in candidate order
+        flat = cy * self.cells.shape[1] + cx
+        _, first = np.unique(flat, return_index=True)
+        first.sort()
+        order, cy, cx = order[first], cy[first], cx[first]
+        tentative = self.count + np.arange(len(order))
+        self.cells[cy, cx] = tentative
+        self.points[tentative] = candidates[order]
+        # Give up any candidate with an earlier one too near it. That can
+        # drop both of a pair, but never leaves two too near each other.
+        neighbours, too_near = self._near(candidates[order], cy, cx)
+        keep = ~(too_near & (neighbours >= self.count) & (neighbours < tentative[:, None])).any(axis=1)
+        keep &= np.cumsum(keep) <= limit
+
+        self.cells[cy[~keep], cx[~keep]] = -1
+        kept = np.count_nonzero(keep)
+        self.cells[cy[keep], cx[keep]] = self.count + np.arange(kept)
+        self.points[self.count:self.count + kept] = candidates[order[keep]]
+        self.count += kept
+        placed[:] = False
+        placed[order[keep]] = True
+        return placed
+
+
+def _fold(values, low, high):
+    """Reflect values back and forth into [low, high], which never lengthens a step."""
+    period = 2 * (high - low)
+    values = np.mod(values - low, period)
+    return low + np.where(values > high - low, period - values, values)
+
+
+def _chain(rng, reach, min_separation, bounds):
+    """Positions from the bottom of the wall to the top, each within reach of
+    the one before and at least min_separation above it."""
+    left, top, right, bottom = bounds
+    min_rise = math.ceil(min_separation)
+    max_rise = int(reach * SPINE_MAX_RISE)
+    count = (bottom - top) // min_rise + 1
+    rises = rng.integers(min_rise, max_rise + 1, count)
+    rises[0] = rng.integers(0, max_rise + 1)  # From the bottom to the first hold
+    # Whatever sideways sway keeps each step within reach
+    sways = np.floor(np.sqrt(reach * reach - rises * rises)).astype(np.int64)
+    steps = rng.integers(-sways, sways + 1)
+    steps[0] = rng.integers(left, right + 1)
+    y = bottom - np.cumsum(rises)
+    x = _fold(np.cumsum(steps), left, right)
+    return np.stack([x, y], axis=1)[y >= top]
+
+
+def _spine(grid, rng, reach, min_separation, bounds):
+    """Lay a chain of holds up the wall, each within reach of the last. Returns their positions."""
+    chain = _chain(rng, reach, min_separation, bounds)
+    left, top, right, bottom = bounds
+    min_rise = math.ceil(min_separation)
+    # Holds in a chain are all min_separation apart vertically, so only the
+    # holds already placed can be in the way. Move those that are to
+    # somewhere clear, still within reach of their neighbours and between
+    # them on the wall, so the chain keeps its vertical spacing.
+    for i in np.flatnonzero(~grid.clear(chain)):
+        neighbours = chain[[j for j in (i - 1, i + 1) if 0 <= j < len(chain)]]
+        highest = chain[i + 1, 1] + min_rise if i + 1 < len(chain) else top
+        lowest = chain[i - 1, 1] - min_rise if i > 0 else bottom
+        leftmost = max(left, neighbours[:, 0].max() - int(reach)) if len(neighbours) else left
+        rightmost = min(right, neighbours[:, 0].min() + int(reach)) if len(neighbours) else right
+        for _ in range(MAX_ROUNDS):
+            candidates = np.stack([rng.integers(leftmost, rightmost + 1, SPINE_TRIES),
+                                   rng.integers(highest, lowest + 1, SPINE_TRIES)], axis=1)
+            offsets = candidates[:, None, :] - neighbours[None, :, :]
+            usable = grid.clear(candidates) & ((offsets * offsets).sum(axis=2) <= reach * reach).all(axis=1)
+            if usable.any():
+                chain[i] = candidates[np.argmax(usable)]
+                break
+        else:
+            raise ValueError("no room for a hold within %s px of its neighbours at y=%d" % (reach, chain[i, 1]))
+    grid.add(chain, len(chain))
+    return chain.tolist()
+
+
+def generate_board(holds, wall_height=None, num_rows=None, min_separation=MIN_SEPARATION,
+                   circle_fraction=0.5, reach=True, seed=None):
+    """A board_state dict with holds holds; circle_fraction of those off the spines are circles.
+
+    wall_height defaults to whatever fits the holds at DEFAULT_DENSITY, and
+    num_rows to ROWS_PER_SCREEN rows a screen. With reach, each kind gets a
+    spine of holds within the climber's reach all the way up. Raises
+    ValueError if the wall is too small to fit the holds that far apart.
+    """
+    if wall_height is None:
+        wall_height = max(1, math.ceil(holds / DEFAULT_DENSITY)) * SCREEN_HEIGHT
+    if num_rows is None:
+        num_rows = max(1, round(wall_height / SCREEN_HEIGHT * ROWS_PER_SCREEN))
+    if reach and min(HAND_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE) * SPINE_MAX_RISE < min_separation:
+        raise ValueError("min_separation %s is beyond the climber's reach" % min_separation)
+
+    rng = np.random.default_rng(seed)
+    bounds = (EDGE_MARGIN, EDGE_MARGIN, SCREEN_WIDTH - EDGE_MARGIN, wall_height - EDGE_MARGIN)
+    left, top, right, bottom = bounds
+    # Not even a perfect hexagonal packing would fit them
+    packed = ((right - left + min_separation) * (bottom - top + min_separation) /
+              (min_separation * min_separation * math.sqrt(3) / 2))
+    if holds > packed:
+        raise ValueError("%d holds can't fit %s px apart on a %d px wall" %
+                         (holds, min_separation, wall_height))
+    # Every spine step climbs at least min_separation
+    spine_limit = 2 * (math.ceil(wall_height / min_separation) + 1)
+    grid = _Grid(SCREEN_WIDTH, wall_height, min_separation, holds + spine_limit)
+    circles, squares = [], []
+    if reach:
+        circles = _spine(grid, rng, HAND_BODY_MAX_DISTANCE, min_separation, bounds)
+        squares = _spine(grid, rng, FEET_BODY_MAX_DISTANCE, min_separation, bounds)
+        if grid.count > holds:
+            raise ValueError("the reach spines need %d holds, more than %d" % (grid.count, holds))
+    spine_count = grid.count
+
+    stalled = 0
+    for _ in range(MAX_ROUNDS):
+        remaining = holds - grid.count
+        if not remaining or stalled == STALLED_ROUNDS:
+            break
+        # Always a full batch: on a crowded wall few candidates land in a gap
+        candidates = np.stack([rng.integers(left, right + 1, MAX_BATCH),
+                               rng.integers(top, bottom + 1, MAX_BATCH)], axis=1)
+        stalled = 0 if grid.add(candidates, remaining).any() else stalled + 1
+    if grid.count < holds:
+        raise ValueError("only %d of %d holds fit %s px apart on a %d px wall" %
+                         (grid.count, holds, min_separation, wall_height))
+
+    scattered = grid.points[spine_count:grid.count]
+    is_circle = rng.random(len(scattered)) < circle_fraction
+    board_state = {
+        'num_rows': num_rows,
+        'circles': circles + scattered[is_circle].tolist(),
+        'squares': squares + scattered[~is_circle].tolist(),
+    }
+    if wall_height != SCREEN_HEIGHT:
+        board_state['wall_height'] = wall_height
+    return board_state
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a board with many holds.")
+    parser.add_argument("-o", "--output", required=True,
+                        help="board file to write, .json or %s" % board_file.BINARY_EXTENSION)
+    parser.add_argument("--holds", type=int, required=True, help="total holds, circles and squares")
+    height = parser.add_mutually_exclusive_group()
+    height.add_argument("--wall-height", type=int, help="wall height in pixels")
+    height.add_argument("--screens", type=float, help="wall height in screens")
+    parser.add_argument("--num-rows", type=int, help="rows drawn on the wall (default: %d a screen)" %
+                        ROWS_PER_SCREEN)
+    parser.add_argument("--min-separation", type=float, default=MIN_SEPARATION,
+                        help="closest two holds may be, in pixels (default: %(default)s)")
+    parser.add_argument("--circle-fraction", type=float, default=0.5,
+                        help="share of the holds that are circles (default: %(default)s)")
+    parser.add_argument("--no-reach", action="store_true",
+                        help="scatter every hold, without a spine within the climber's reach")
+    parser.add_argument("--seed", type=int, help="random seed, for a repeatable board")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    wall_height = args.wall_height
+    if args.screens is not None:
+        wall_height = round(args.screens * SCREEN_HEIGHT)
+    start = time.perf_counter()
+    board_state = generate_board(args.holds, wall_height, args.num_rows, args.min_separation,
+                                 args.circle_fraction, not args.no_reach, args.seed)
+    generated = time.perf_counter() - start
+    board_file.save_board_state(args.output, board_state)
+    print("%d circles and %d squares on a %d px wall, generated in %.2fs, saved to %s" %
+          (len(board_state['circles']), len(board_state['squares']),
+           board_file.wall_height(board_state), generated, args.output))
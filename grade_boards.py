@@ -0,0 +1,213 @@
+import argparse
+import bisect
+import csv
+import io
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import board_file
+from route_solver import DEFAULT_BEAM_WIDTH, RouteSolver
+
+# Grades a directory of boards with the route solver (and so the climber
+# limits in climber_config.py), streaming one row of metrics per board.
+#
+#   python grade_boards.py boards/ -o grades.csv
+#   python grade_boards.py boards/ -o grades.jsonl --processes 8
+#
+# Boards are graded over a process pool and written in file name order as
+# soon as every board before them is done. Only a bounded window of boards
+# is in flight or waiting to be written at any time, and each worker loads
+# its own board, so memory doesn't grow with the size of the library.
+#
+# Because rows are written in order, the last row of the output says how far
+# a run got. Running again with the same output picks up after it; a row
+# cut off by an interruption is discarded and that board graded again.
+
+COLUMNS = ("board", "climbable", "moves", "longest_reach", "solve_seconds",
+           "states_explored", "circles", "squares", "error")
+BOARD_EXTENSIONS = (".json", board_file.BINARY_EXTENSION)
+IN_FLIGHT_PER_PROCESS = 4  # Boards queued per worker, so workers never wait on the parent
+
+
+def _longest_move(path):
+    """Longest distance a single hand or foot moves along a route of hold positions."""
+    longest = 0.0
+    for before, after in zip(path, path[1:]):
+        for start, end in ((before[:2], after[:2]), (before[2:], after[2:])):
+            left = [pos for pos in start if pos not in end]
+            taken = [pos for pos in end if pos not in start]
+            if left and taken:
+                longest = max(longest, math.dist(left[0], taken[0]))
+    return longest
+
+
+def grade_board(path, beam_width=DEFAULT_BEAM_WIDTH, cache_dir=None):
+    """Solve the board at path and return its row of metrics as a dict."""
+    row = dict.fromkeys(COLUMNS, "")
+    row["board"] = os.path.basename(path)
+    board_state = None
+    try:
+        board_state = board_file.load_board_state(path)
+        if board_state is None:
+            raise FileNotFoundError(path)
+        row["circles"] = len(board_state['circles'])
+        row["squares"] = len(board_state['squares'])
+        start = time.perf_counter()
+        solver = RouteSolver(board_state, beam_width, cache_dir=cache_dir)
+        route = solver.solve()
+        row["solve_seconds"] = round(time.perf_counter() - start, 6)
+        row["states_explored"] = solver.states_explored
+        row["climbable"] = route is not None
+        if route is not None:
+            positions = [solver.pose_positions(pose) for pose in route]
+            row["moves"] = len(route) - 1
+            row["longest_reach"] = round(_longest_move(positions), 3)
+    except Exception as e:  # One bad board shouldn't stop a night's grading
+        row["error"] = "%s: %s" % (type(e).__name__, e)
+    finally:
+        if isinstance(board_state, board_file.BoardFile):
+            board_state.close()
+    return row
+
+
+def list_boards(directory):
+    """Board file names in the directory, sorted."""
+    return sorted(entry.name for entry in os.scandir(directory)
+                  if entry.is_file() and entry.name.endswith(BOARD_EXTENSIONS))
+
+
+class ResultWriter:
+    """Appends rows to a CSV or JSON-lines file, picked by extension."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = not path.endswith(".csv")
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='')
+        if new and not self.jsonl:
+            self._write_line(",".join(COLUMNS))
+
+    def _write_line(self, line):
+        self._file.write(line + "\n")
+        self._file.flush()  # A row is only counted as done once it's fully on disk
+
+    def write(self, row):
+        if self.jsonl:
+            self._write_line(json.dumps(row))
+        else:
+            out = io.StringIO()
+            csv.writer(out, lineterminator="").writerow(row[column] for column in COLUMNS)
+            self._write_line(out.getvalue())
+
+    def close(self):
+        self._file.close()
+
+
+def last_graded(path):
+    """The board name in the last complete row of an output file, or None.
+
+    A partly written last line is cut off the file.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        # Rows are short, so the last complete one is near the end
+        chunk = min(size, 1 << 16)
+        f.seek(size - chunk)
+        tail = f.read(chunk)
+        end = tail.rfind(b"\n") + 1
+        if end < len(tail):
+            f.truncate(size - chunk + end)
+        lines = tail[:end].splitlines()
+    if not lines:
+        return None
+    last = lines[-1].decode()
+    if path.endswith(".csv"):
+        if last == ",".join(COLUMNS):
+            return None
+        return next(csv.reader([last]))[0]
+    return json.loads(last)["board"]
+
+
+def grade_directory(directory, output, processes=None, beam_width=DEFAULT_BEAM_WIDTH,
+                    cache_dir=None, resume=True, report=None):
+    """Grade every board in directory into output. Returns how many were graded this run."""
+    names = list_boards(directory)
+    if resume:
+        last = last_graded(output)
+        if last is not None:
+            names = names[bisect.bisect_right(names, last):]
+    elif os.path.exists(output):
+        os.remove(output)
+
+    writer = ResultWriter(output)
+    paths = (os.path.join(directory, name) for name in names)
+    try:
+        if processes == 1:
+            for path in paths:
+                row = grade_board(path, beam_width, cache_dir)
+                writer.write(row)
+                if report:
+                    report(row)
+            return len(names)
+
+        processes = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(processes) as pool:
+            window = processes * IN_FLIGHT_PER_PROCESS
+            pending = {}  # Future -> position in names
+            finished = {}  # Position -> row, waiting for the boards before it
+            next_to_write = 0
+            submitted = 0
+            while next_to_write < len(names):
+                # Never more than window boards past the oldest unwritten one
+                while submitted < len(names) and submitted < next_to_write + window:
+                    future = pool.submit(grade_board, next(paths), beam_width, cache_dir)
+                    pending[future] = submitted
+                    submitted += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[pending.pop(future)] = future.result()
+                while next_to_write in finished:
+                    row = finished.pop(next_to_write)
+                    writer.write(row)
+                    if report:
+                        report(row)
+                    next_to_write += 1
+        return len(names)
+    finally:
+        writer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Grade every board in a directory.")
+    parser.add_argument("directory", help="directory of board_state .json or %s files" %
+                        board_file.BINARY_EXTENSION)
+    parser.add_argument("-o", "--output", required=True,
+                        help="results file, CSV if it ends in .csv and JSON lines otherwise")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--beam-width", type=int, default=DEFAULT_BEAM_WIDTH)
+    parser.add_argument("--cache-dir", help="keep reachability graphs here between runs")
+    parser.add_argument("--restart", action="store_true",
+                        help="grade everything again instead of resuming after the last row")
+    return parser.parse_args(argv)
+
+
+def _print_row(row):
+    if row["error"]:
+        print("%-32s error  %s" % (row["board"], row["error"]))
+    elif row["climbable"]:
+        print("%-32s %3d moves, longest reach %6.1f, %.2fs" %
+              (row["board"], row["moves"], row["longest_reach"], row["solve_seconds"]))
+    else:
+        print("%-32s not climbable, %.2fs" % (row["board"], row["solve_seconds"]))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    graded = grade_directory(args.directory, args.output, args.processes, args.beam_width,
+                             args.cache_dir, resume=not args.restart, report=_print_row)
+    print("Graded %d boards in %.1fs into %s" % (graded, time.perf_counter() - start, args.output))
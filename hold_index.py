@@ -0,0 +1,190 @@
+import math
+
+# Spatial indexes over board holds. Each hold is stored under a caller-chosen
+# key (board_state holds use ('circles', i) / ('squares', i)). HoldIndex is a
+# uniform grid, so lookups near a point only visit the few grid cells around
+# it instead of every hold on the wall; RowIndex buckets holds by height, for
+# culling to the visible part of a tall wall.
+
+DEFAULT_CELL_SIZE = 50
+
+
+class HoldIndex:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    @classmethod
+    def from_board_state(cls, board_state, kinds=('circles', 'squares'), cell_size=DEFAULT_CELL_SIZE):
+        """Build an index of the given hold kinds, keyed by (kind, list index)."""
+        index = cls(cell_size)
+        for kind in kinds:
+            for i, pos in enumerate(board_state.get(kind, [])):
+                index.add((kind, i), pos)
+        return index
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def _cell(self, pos):
+        return (int(pos[0] // self.cell_size), int(pos[1] // self.cell_size))
+
+    def pos(self, key):
+        return self.positions[key]
+
+    def add(self, key, pos):
+        """Add a hold, replacing any previous entry with the same key."""
+        if key in self.positions:
+            self.remove(key)
+        self.positions[key] = (pos[0], pos[1])
+        self.cells.setdefault(self._cell(pos), set()).add(key)
+
+    def remove(self, key):
+        pos = self.positions.pop(key)
+        cell = self._cell(pos)
+        bucket = self.cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, key, new_pos):
+        """Update a hold's position, e.g. while it is dragged in the editor."""
+        old_cell = self._cell(self.positions[key])
+        new_cell = self._cell(new_pos)
+        self.positions[key] = (new_pos[0], new_pos[1])
+        if old_cell != new_cell:
+            bucket = self.cells[old_cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(new_cell, set()).add(key)
+
+    def within(self, pos, radius):
+        """Return the keys of all holds within radius of pos."""
+        min_cx, min_cy = self._cell((pos[0] - radius, pos[1] - radius))
+        max_cx, max_cy = self._cell((pos[0] + radius, pos[1] + radius))
+        radius_sq = radius * radius
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    hold = self.positions[key]
+                    if (hold[0] - pos[0]) ** 2 + (hold[1] - pos[1]) ** 2 <= radius_sq:
+                        found.append(key)
+        return found
+
+    def _ring(self, cx, cy, ring):
+        """Yield the cells at Chebyshev distance ring from (cx, cy)."""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    def nearest(self, pos, max_distance=None):
+        """Return the key of the hold closest to pos, or None.
+
+        With max_distance set, holds further away than that are ignored.
+        """
+        if not self.positions:
+            return None
+        cx, cy = self._cell(pos)
+        if max_distance is not None:
+            max_ring = int(math.ceil(max_distance / self.cell_size))
+        else:
+            # Far enough out to cover every occupied cell
+            max_ring = max(max(abs(x - cx), abs(y - cy)) for x, y in self.cells)
+
+        best_key = None
+        best_dist = math.inf
+        for ring in range(max_ring + 1):
+            for cell in self._ring(cx, cy, ring):
+                for key in self.cells.get(cell, ()):
+                    hold = self.positions[key]
+                    dist = math.sqrt((hold[0] - pos[0]) ** 2 + (hold[1] - pos[1]) ** 2)
+                    if dist < best_dist:
+                        best_key, best_dist = key, dist
+            # Anything in the next ring out is at least this far away
+            if best_dist <= ring * self.cell_size:
+                break
+
+        if max_distance is not None and best_dist > max_distance:
+            return None
+        return best_key
+
+
+class RowIndex:
+    """Holds bucketed into horizontal bands of the wall.
+
+    Made for culling: between() visits only the bands overlapping a range
+    of heights, so drawing the visible part of a tall wall costs the same
+    as drawing a short one. Keys and positions are as in HoldIndex.
+    """
+
+    def __init__(self, bucket_height):
+        self.bucket_height = bucket_height
+        self.buckets = {}  # Band number -> {key: pos}
+        self.positions = {}
+
+    @classmethod
+    def from_board_state(cls, board_state, bucket_height, kinds=('circles', 'squares')):
+        index = cls(bucket_height)
+        for kind in kinds:
+            for i, pos in enumerate(board_state.get(kind, [])):
+                index.add((kind, i), pos)
+        return index
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def _band(self, y):
+        return int(y // self.bucket_height)
+
+    def pos(self, key):
+        return self.positions[key]
+
+    def add(self, key, pos):
+        """Add a hold, replacing any previous entry with the same key."""
+        if key in self.positions:
+            self.remove(key)
+        pos = (pos[0], pos[1])
+        self.positions[key] = pos
+        self.buckets.setdefault(self._band(pos[1]), {})[key] = pos
+
+    def remove(self, key):
+        pos = self.positions.pop(key)
+        band = self._band(pos[1])
+        bucket = self.buckets[band]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[band]
+
+    def move(self, key, new_pos):
+        self.add(key, new_pos)
+
+    def between(self, top, bottom):
+        """Return the keys of all holds with top <= y <= bottom."""
+        found = []
+        for band in range(self._band(top), self._band(bottom) + 1):
+            for key, pos in self.buckets.get(band, {}).items():
+                if top <= pos[1] <= bottom:
+                    found.append(key)
+        return found
+
+    def within(self, pos, radius):
+        """Return the keys of all holds within radius of pos."""
+        radius_sq = radius * radius
+        return [key for key in self.between(pos[1] - radius, pos[1] + radius)
+                if (self.positions[key][0] - pos[0]) ** 2 +
+                (self.positions[key][1] - pos[1]) ** 2 <= radius_sq]
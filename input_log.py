@@ -0,0 +1,115 @@
+import struct
+import sys
+import time
+from simulation import Simulation
+import board_file
+
+# Per-tick record of everything that feeds Simulation.tick(), so a session can
+# be replayed headless, as fast as the CPU allows, to exactly the same state.
+#
+# File layout (little-endian):
+#   magic b'CLIN', uint16 version, uint16 reserved, float64 dt, uint32 tick count
+#   then per tick:
+#     uint8 flags (PRESSED, HAS_POS, POS_CHANGED), uint8 right click count
+#     float64 x, y             only when POS_CHANGED is set
+#     float64 x, y per right click
+# Mouse positions are only written when they differ from the previous tick's,
+# which keeps idle stretches down to two bytes a tick.
+
+MAGIC = b'CLIN'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHdI')
+_TICK = struct.Struct('<BB')
+_POINT = struct.Struct('<dd')
+
+PRESSED = 1
+HAS_POS = 2
+POS_CHANGED = 4
+
+
+class InputLog:
+    """Tick inputs in the compact encoding above. Attach to Simulation.input_log to record."""
+
+    def __init__(self, dt, data=b'', tick_count=0):
+        self.dt = dt
+        self.data = bytearray(data)
+        self.tick_count = tick_count
+        self._last_pos = None
+
+    def record(self, mouse_pos, mouse_pressed, right_clicks):
+        flags = PRESSED if mouse_pressed else 0
+        pos = None
+        if mouse_pos is not None:
+            flags |= HAS_POS
+            pos = (float(mouse_pos[0]), float(mouse_pos[1]))
+            if pos != self._last_pos:
+                flags |= POS_CHANGED
+        self.data += _TICK.pack(flags, len(right_clicks))
+        if flags & POS_CHANGED:
+            self.data += _POINT.pack(*pos)
+            self._last_pos = pos
+        for click in right_clicks:
+            self.data += _POINT.pack(float(click[0]), float(click[1]))
+        self.tick_count += 1
+
+    def __iter__(self):
+        """Yield (mouse_pos, mouse_pressed, right_clicks) per tick."""
+        data = self.data
+        offset = 0
+        last_pos = None
+        for _ in range(self.tick_count):
+            flags, click_count = _TICK.unpack_from(data, offset)
+            offset += _TICK.size
+            if flags & POS_CHANGED:
+                last_pos = _POINT.unpack_from(data, offset)
+                offset += _POINT.size
+            right_clicks = []
+            for _ in range(click_count):
+                right_clicks.append(_POINT.unpack_from(data, offset))
+                offset += _POINT.size
+            mouse_pos = last_pos if flags & HAS_POS else None
+            yield mouse_pos, bool(flags & PRESSED), right_clicks
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, self.dt, self.tick_count))
+            f.write(self.data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            data = f.read()
+        if len(header) < _HEADER.size:
+            raise ValueError("%s is too short to be an input log" % path)
+        magic, version, _, dt, tick_count = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("%s is not an input log" % path)
+        if version != VERSION:
+            raise ValueError("%s is input log version %d, expected %d" % (path, version, VERSION))
+        return cls(dt, data, tick_count)
+
+
+def replay(log, board_state=None):
+    """Run a recorded session headless and return the resulting Simulation."""
+    sim = Simulation(board_state, dt=log.dt)
+    tick = sim.tick
+    for mouse_pos, mouse_pressed, right_clicks in log:
+        tick(mouse_pos, mouse_pressed, right_clicks)
+    return sim
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python input_log.py LOG [BOARD]")
+        sys.exit(1)
+    log = InputLog.load(sys.argv[1])
+    board_state = board_file.load_board_state(sys.argv[2]) if len(sys.argv) == 3 else None
+    start = time.perf_counter()
+    sim = replay(log, board_state)
+    elapsed = time.perf_counter() - start
+    print("%d ticks in %.3fs (%.0f ticks/s)" % (sim.tick_count, elapsed,
+                                              sim.tick_count / elapsed if elapsed else 0))
+    print("upper body", sim.upper_body_pos, "lower body", sim.lower_body_pos)
+    for name, limb in zip(("left arm", "right arm", "left leg", "right leg"), sim.all_limbs):
+        print(name, limb.pos, "gravity on" if limb.gravity_on else "")
@@ -6,33 +6,46 @@ from climber_config import HAND_RADIUS, FEET_SIZE
 
 
 class Limb:
-    def __init__(self, name, initial_pos, max_distance, snap_radius, color, string_color, string_thickness):
+    __slots__ = ('name', 'position', 'snapped', 'snapped_shape', '_snapped_pos', 'max_distance',
+                 'snap_radius', 'color', 'string_color', 'string_thickness', 'hold_index')
+
+    def __init__(self, name, initial_pos, max_distance, snap_radius, color, string_color, string_thickness,
+                 hold_index=None):
         self.name = name
-        self.position = initial_pos
+        # Positions are updated in place, so the lists are allocated once here
+        self.position = list(initial_pos)
         self.snapped = False
-        self.snapped_shape = None
+        self.snapped_shape = None  # _snapped_pos while snapped, otherwise None
+        self._snapped_pos = [0, 0]
         self.max_distance = max_distance
         self.snap_radius = snap_radius
         self.color = color
         self.string_color = string_color
         self.string_thickness = string_thickness
+        self.hold_index = hold_index  # Holds this limb can snap to
 
     def move(self, new_pos, body_pos):
         """Move the limb, checking for snapping."""
-        self.position = list(new_pos)
-        body_pos = move_body_smoothly(
-            self.position, body_pos, self.max_distance)
-        self.position, snapped = check_snapping(
-            self.position, self.snap_radius, self.snapped_shape)
+        position = self.position
+        position[0] = new_pos[0]
+        position[1] = new_pos[1]
+        move_body_smoothly(position, body_pos, self.max_distance)
+        snap_pos, snapped = check_snapping(
+            position, self.snap_radius, self.snapped_shape, self.hold_index)
         if snapped:
+            position[0] = snap_pos[0]
+            position[1] = snap_pos[1]
+            self._snapped_pos[0] = position[0]
+            self._snapped_pos[1] = position[1]
             self.snapped = True
-            self.snapped_shape = self.position
+            self.snapped_shape = self._snapped_pos
         return body_pos
 
     def unsnap(self, mouse_pos):
         """Unsnap the limb when it's clicked and dragged."""
-        self.position, self.snapped = unsnap_limb(
-            mouse_pos, self.snapped_shape)
+        self.position[0] = mouse_pos[0]
+        self.position[1] = mouse_pos[1]
+        _, self.snapped = unsnap_limb(mouse_pos, self.snapped_shape)
         if not self.snapped:
             self.snapped_shape = None
 
@@ -47,8 +60,7 @@ class Limb:
     def constrain_position(self, body_pos):
         """Constrain the limb's position if it's not snapped."""
         if not self.snapped:
-            self.position = drag_and_constrain_smoothly(
-                self.position, body_pos, self.max_distance)
+            drag_and_constrain_smoothly(self.position, body_pos, self.max_distance)
 
     def draw(self, screen, body_pos):
         """Draw the limb and its connecting string."""
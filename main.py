@@ -1,291 +1,313 @@
+import time
+LAUNCH_TIME = time.perf_counter()  # Taken before the other imports so they count towards startup
 import pygame
 import sys
-import math
-import json
-import os
 from climber_config import (HEAD_RADIUS, HEAD_COLOR, UPPER_BODY_RADIUS, LOWER_BODY_RADIUS,
-                            BODY_COLOR, BODY_DISTANCE, HAND_RADIUS, HAND_COLOR, HAND_BODY_MAX_DISTANCE,
-                            FEET_SIZE, FEET_COLOR, FEET_BODY_MAX_DISTANCE, BODY_STRING_COLOR, BODY_STRING_THICKNESS,
+                            BODY_COLOR, HAND_COLOR, FEET_COLOR, BODY_STRING_COLOR, BODY_STRING_THICKNESS,
                             ARM_STRING_COLOR, ARM_STRING_THICKNESS, LEG_STRING_COLOR, LEG_STRING_THICKNESS)
-from board_config import SCREEN_WIDTH, SCREEN_HEIGHT, BACKGROUND_COLOR, BACKGROUND_IMAGE_PATH
-
-# Load board state from JSON
+from board_config import (SCREEN_WIDTH, SCREEN_HEIGHT, BACKGROUND_COLOR, BACKGROUND_IMAGE_PATH,
+                          MAX_FPS, PHYSICS_SUBSTEPS, SHOW_FRAME_STATS, FRAME_STATS_FILE,
+                          RECORD_INPUT_FILE, SHOW_STARTUP_TIMES, REWIND_SECONDS,
+                          MOUSE_INTERPOLATION)
+from simulation import Simulation
+from frame_scheduler import FrameScheduler, StartupTimer
+from asset_cache import AssetCache
+from hold_index import RowIndex
+from camera import Camera
+import board_file
+from input_log import InputLog
+from snapshot_ring import SnapshotRing
+from profiling import Profiling, scope
+
+# Load board state from JSON, or from a memory-mapped .board file
 STATE_FILE = "board_state.json"
 
+# Colors and string styles for each limb shape
+LIMB_STYLES = {
+    "circle": (HAND_COLOR, ARM_STRING_COLOR, ARM_STRING_THICKNESS),
+    "square": (FEET_COLOR, LEG_STRING_COLOR, LEG_STRING_THICKNESS),
+}
+HOLD_DRAW_RADIUS = 12  # Furthest a hold's outline reaches from its centre
+
 
 def load_board_state():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r') as f:
-            return json.load(f)
-    return None
-
-# Class to represent a limb
-
-
-class Limb:
-    def __init__(self, start_pos, color, radius, max_distance, string_color, string_thickness, shape="circle"):
-        self.pos = start_pos
-        self.color = color
-        self.radius = radius
-        self.max_distance = max_distance
-        self.string_color = string_color
-        self.string_thickness = string_thickness
-        self.shape = shape
-        self.gravity_on = False
-
-    def draw(self, screen, body_pos):
-        pygame.draw.line(screen, self.string_color, self.pos,
-                         body_pos, self.string_thickness)
-        if self.shape == "circle":
-            pygame.draw.circle(screen, self.color, (int(
-                self.pos[0]), int(self.pos[1])), self.radius)
-        elif self.shape == "square":
-            pygame.draw.rect(screen, self.color, (
-                self.pos[0] - self.radius, self.pos[1] - self.radius, self.radius * 2, self.radius * 2))
-
-    def toggle_gravity(self):
-        self.gravity_on = not self.gravity_on
-
-    def apply_gravity(self, body_pos):
-        if self.gravity_on:
-            # Move the limb downward naturally
-            desired_y = body_pos[1] + (self.max_distance / 2)
-            if self.pos[1] < desired_y:
-                self.pos[1] += 5  # Move the limb downwards in small steps
-                if self.pos[1] > desired_y:
-                    self.pos[1] = desired_y
-
-    def drag(self, mouse_pos, body_pos, other_limbs):
-        if self.is_near(mouse_pos) and not self.overlaps_with_other_limbs(mouse_pos, other_limbs):
-            self.pos = list(mouse_pos)
-            body_pos = self.move_body_smoothly(body_pos)
-        return body_pos
-
-    def is_near(self, mouse_pos):
-        return calculate_distance(self.pos, mouse_pos) < self.radius
-
-    def overlaps_with_other_limbs(self, mouse_pos, other_limbs):
-        for limb in other_limbs:
-            if calculate_distance(mouse_pos, limb.pos) < self.radius + limb.radius:
-                return True
-        return False
-
-    def move_body_smoothly(self, body_pos):
-        limb_to_body_dist = calculate_distance(self.pos, body_pos)
-        if limb_to_body_dist > self.max_distance / 2:
-            diff_x = self.pos[0] - body_pos[0]
-            diff_y = self.pos[1] - body_pos[1]
-            factor = (limb_to_body_dist - self.max_distance / 2) / \
-                limb_to_body_dist
-
-            body_pos[0] += diff_x * factor
-            body_pos[1] += diff_y * factor
-
-        return body_pos
-
-    def constrain(self, body_pos):
-        limb_to_body_dist = calculate_distance(self.pos, body_pos)
-        if limb_to_body_dist > self.max_distance / 2:
-            diff_x = self.pos[0] - body_pos[0]
-            diff_y = self.pos[1] - body_pos[1]
-            factor = (limb_to_body_dist - self.max_distance / 2) / \
-                limb_to_body_dist
-
-            self.pos[0] = body_pos[0] + diff_x * (1 - factor)
-            self.pos[1] = body_pos[1] + diff_y * (1 - factor)
-
-        return self.pos
-
-# Function to calculate the distance between two points
-
-
-def calculate_distance(pos1, pos2):
-    return math.sqrt((pos2[0] - pos1[0]) ** 2 + (pos2[1] - pos1[1]) ** 2)
-
-# Function to keep the upper and lower body circles connected with a fixed distance
-
-
-def maintain_body_connection(upper_body_pos, lower_body_pos, body_distance):
-    current_distance = calculate_distance(upper_body_pos, lower_body_pos)
-    if current_distance != body_distance:
-        diff_x = lower_body_pos[0] - upper_body_pos[0]
-        diff_y = lower_body_pos[1] - upper_body_pos[1]
-        factor = body_distance / current_distance
-
-        midpoint = [
-            (upper_body_pos[0] + lower_body_pos[0]) / 2,
-            (upper_body_pos[1] + lower_body_pos[1]) / 2,
-        ]
-
-        upper_body_pos = [
-            midpoint[0] - diff_x * factor / 2,
-            midpoint[1] - diff_y * factor / 2,
-        ]
-        lower_body_pos = [
-            midpoint[0] + diff_x * factor / 2,
-            midpoint[1] + diff_y * factor / 2,
-        ]
-
-    return upper_body_pos, lower_body_pos
-
-
-# Initialize pygame
-pygame.init()
-
-# Load board state
-board_state = load_board_state()
-
-if board_state:
-    num_rows = board_state['num_rows']
-    circles = board_state['circles']
-    squares = board_state['squares']
-else:
-    # Default settings if no state is saved
-    num_rows = 8
-    circles = []
-    squares = []
-
-# Set up the screen
-ROW_HEIGHT = SCREEN_HEIGHT // num_rows
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Climbing Game")
-
-# Load and fit the background image if provided
-background_image = None
-if BACKGROUND_IMAGE_PATH:
-    background_image = pygame.image.load(BACKGROUND_IMAGE_PATH)
-    background_image = pygame.transform.scale(
-        background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-# Initial positions of the climber
-upper_body_pos = [SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - BODY_DISTANCE // 2]
-lower_body_pos = [SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + BODY_DISTANCE // 2]
-head_pos = [upper_body_pos[0], upper_body_pos[1] -
-            UPPER_BODY_RADIUS - HEAD_RADIUS]
-
-# Lower body gravity toggle
-lower_body_gravity_on = False
-
-# Define initial positions for limbs
-left_arm_pos = [upper_body_pos[0] - 50, upper_body_pos[1] - 50]
-right_arm_pos = [upper_body_pos[0] + 50, upper_body_pos[1] - 50]
-left_leg_pos = [lower_body_pos[0] - 50, lower_body_pos[1] + 50]
-right_leg_pos = [lower_body_pos[0] + 50, lower_body_pos[1] + 50]
-
-# Create Limb instances for each arm and leg
-left_arm = Limb(left_arm_pos, HAND_COLOR, HAND_RADIUS, HAND_BODY_MAX_DISTANCE,
-                ARM_STRING_COLOR, ARM_STRING_THICKNESS, "circle")
-right_arm = Limb(right_arm_pos, HAND_COLOR, HAND_RADIUS,
-                 HAND_BODY_MAX_DISTANCE, ARM_STRING_COLOR, ARM_STRING_THICKNESS, "circle")
-left_leg = Limb(left_leg_pos, FEET_COLOR, FEET_SIZE // 2,
-                FEET_BODY_MAX_DISTANCE, LEG_STRING_COLOR, LEG_STRING_THICKNESS, "square")
-right_leg = Limb(right_leg_pos, FEET_COLOR, FEET_SIZE // 2,
-                 FEET_BODY_MAX_DISTANCE, LEG_STRING_COLOR, LEG_STRING_THICKNESS, "square")
-
-# Store all limbs in a list for easier management
-all_limbs = [left_arm, right_arm, left_leg, right_leg]
-
-# Main loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = pygame.mouse.get_pos()
-            if event.button == 3:  # Right-click toggles gravity
-                for limb in all_limbs:
-                    if limb.is_near(mouse_pos):
-                        limb.toggle_gravity()
-                if calculate_distance(mouse_pos, lower_body_pos) < LOWER_BODY_RADIUS:
-                    lower_body_gravity_on = not lower_body_gravity_on
-
-    # Handle dragging of limbs and body
-    mouse_pressed = pygame.mouse.get_pressed()
-    mouse_pos = pygame.mouse.get_pos()
-
-    if mouse_pressed[0]:  # Left mouse button is pressed
-        upper_body_pos = left_arm.drag(mouse_pos, upper_body_pos, [
-                                       right_arm, left_leg, right_leg])
-        upper_body_pos = right_arm.drag(mouse_pos, upper_body_pos, [
-                                        left_arm, left_leg, right_leg])
-        lower_body_pos = left_leg.drag(mouse_pos, lower_body_pos, [
-                                       left_arm, right_arm, right_leg])
-        lower_body_pos = right_leg.drag(mouse_pos, lower_body_pos, [
-                                        left_arm, right_arm, left_leg])
-
-    # Apply gravity to each limb
-    for limb in all_limbs:
-        if limb.shape == "circle":
-            limb.apply_gravity(upper_body_pos)
-        else:
-            limb.apply_gravity(lower_body_pos)
-
-    # Apply gravity to the lower body if toggled
-    if lower_body_gravity_on:
-        desired_y = upper_body_pos[1] + BODY_DISTANCE
-        if lower_body_pos[1] < desired_y:
-            lower_body_pos[1] += 5
-            if lower_body_pos[1] > desired_y:
-                lower_body_pos[1] = desired_y
-
-    # Constrain limb positions with smooth movement
-    left_arm.constrain(upper_body_pos)
-    right_arm.constrain(upper_body_pos)
-    left_leg.constrain(lower_body_pos)
-    right_leg.constrain(lower_body_pos)
-
-    # Maintain the fixed distance between upper and lower body
-    upper_body_pos, lower_body_pos = maintain_body_connection(
-        upper_body_pos, lower_body_pos, BODY_DISTANCE)
-
-    # Update head position based on upper body movement
-    head_pos = [upper_body_pos[0], upper_body_pos[1] -
-                UPPER_BODY_RADIUS - HEAD_RADIUS]
-
-    # Drawing
+    return board_file.load_board_state(STATE_FILE)
+
+
+def load_background_image(path, assets=None):
+    """The background image scaled to the screen in display format, or None if there isn't one.
+
+    Needs the display mode to be set. Goes through assets (an AssetCache) if given.
+    """
+    if not path:
+        return None
+    if assets is None:
+        assets = AssetCache(cache_dir=None)
+    return assets.image(path, (SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+def draw_limb(screen, limb, body_pos, top=0):
+    """Draw a limb and its string, returning the area touched.
+
+    top is the wall height at the top of the screen, as in draw_climber().
+    """
+    color, string_color, string_thickness = LIMB_STYLES[limb.shape]
+    x, y = limb.pos[0], limb.pos[1] - top
+    string_rect = pygame.draw.line(screen, string_color, (x, y),
+                                   (body_pos[0], body_pos[1] - top), string_thickness)
+    if limb.shape == "circle":
+        limb_rect = pygame.draw.circle(screen, color, (int(x), int(y)), limb.radius)
+    else:
+        limb_rect = pygame.draw.rect(screen, color, (
+            x - limb.radius, y - limb.radius, limb.radius * 2, limb.radius * 2))
+    return string_rect.union(limb_rect)
+
+
+def draw_board_area(layer, sim, row_index, background_image, top, area):
+    """Draw the wall into area of a screen-sized layer whose top edge is at wall height top.
+
+    Only the rows and holds that overlap area are visited.
+    """
+    # pygame rasterises outlines differently when they're cut by a clip
+    # edge, so draw on a scratch surface reaching HOLD_DRAW_RADIUS past area
+    # and copy area out of it. Any area then matches a whole-screen draw.
+    margin = HOLD_DRAW_RADIUS
+    scratch = pygame.Surface((SCREEN_WIDTH, area.height + 2 * margin)).convert()
+    scratch_top = top + area.top - margin
+    scratch_bottom = scratch_top + scratch.get_height()
+
+    # The background image repeats every screen height up the wall
     if background_image:
-        screen.blit(background_image, (0, 0))
+        tile_height = background_image.get_height()
+        for tile in range(scratch_top // tile_height, (scratch_bottom - 1) // tile_height + 1):
+            scratch.blit(background_image, (0, tile * tile_height - scratch_top))
     else:
-        screen.fill(BACKGROUND_COLOR)
+        scratch.fill(BACKGROUND_COLOR)
 
     # Draw rows
-    for i in range(1, num_rows):
-        pygame.draw.line(screen, (200, 200, 200), (0, i *
-                         ROW_HEIGHT), (SCREEN_WIDTH, i * ROW_HEIGHT), 2)
+    row_height = sim.row_height
+    first_row = max(1, scratch_top // row_height)
+    last_row = min(sim.num_rows - 1, scratch_bottom // row_height)
+    for i in range(first_row, last_row + 1):
+        y = i * row_height - scratch_top
+        pygame.draw.line(scratch, (200, 200, 200), (0, y), (SCREEN_WIDTH, y), 2)
+
+    # Draw circles then squares (as outlines), each in board order
+    for key in sorted(row_index.between(scratch_top, scratch_bottom)):
+        x, y = row_index.pos(key)
+        y -= scratch_top
+        if key[0] == 'circles':
+            pygame.draw.circle(scratch, (0, 0, 255), (x, y), 10, 2)
+        else:
+            pygame.draw.rect(scratch, (128, 0, 128), (x - 10, y - 10, 20, 20), 2)
+
+    layer.blit(scratch, area, (area.x, margin, area.width, area.height))
 
-    # Draw circles (as outlines)
-    for pos in circles:
-        pygame.draw.circle(screen, (0, 0, 255), pos, 10, 2)
 
-    # Draw squares (as outlines)
-    for pos in squares:
-        pygame.draw.rect(screen, (128, 0, 128),
-                         (pos[0] - 10, pos[1] - 10, 20, 20), 2)
+def build_row_index(sim):
+    """Bucket the board's holds by row, for drawing only the visible ones."""
+    return RowIndex.from_board_state({'circles': sim.circles, 'squares': sim.squares},
+                                     sim.row_height)
+
+
+def build_board_layer(sim, background_image, row_index=None, top=0):
+    """Pre-render the part of the wall on screen, for a view whose top edge is at wall height top."""
+    layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    if row_index is None:
+        row_index = build_row_index(sim)
+    draw_board_area(layer, sim, row_index, background_image, top, layer.get_rect())
+    return layer
+
+
+def scroll_board_layer(layer, sim, row_index, background_image, top, offset):
+    """Update a board layer for a camera that has just moved offset pixels down to top.
+
+    The part still on screen is shifted rather than redrawn, so only the
+    strip of wall that came into view costs anything.
+    """
+    height = layer.get_height()
+    if abs(offset) >= height:
+        draw_board_area(layer, sim, row_index, background_image, top, layer.get_rect())
+        return
+    layer.scroll(0, -offset)
+    if offset > 0:
+        exposed = pygame.Rect(0, height - offset, layer.get_width(), offset)
+    else:
+        exposed = pygame.Rect(0, 0, layer.get_width(), -offset)
+    draw_board_area(layer, sim, row_index, background_image, top, exposed)
+
+
+def draw_climber(screen, sim, top=0):
+    """Draw the climber and return the bounding rect of what was drawn.
+
+    top is the wall height at the top of the screen (the camera's y).
+    """
+    upper_x, upper_y = sim.upper_body_pos[0], sim.upper_body_pos[1] - top
+    lower_x, lower_y = sim.lower_body_pos[0], sim.lower_body_pos[1] - top
 
     # Draw the line connecting upper and lower body
-    pygame.draw.line(screen, BODY_STRING_COLOR, upper_body_pos,
-                     lower_body_pos, BODY_STRING_THICKNESS)
+    dirty = pygame.draw.line(screen, BODY_STRING_COLOR, (upper_x, upper_y),
+                             (lower_x, lower_y), BODY_STRING_THICKNESS)
 
     # Draw the upper and lower body
-    pygame.draw.circle(screen, BODY_COLOR, (int(
-        upper_body_pos[0]), int(upper_body_pos[1])), UPPER_BODY_RADIUS)
-    pygame.draw.circle(screen, BODY_COLOR, (int(
-        lower_body_pos[0]), int(lower_body_pos[1])), LOWER_BODY_RADIUS)
+    dirty.union_ip(pygame.draw.circle(screen, BODY_COLOR, (int(
+        upper_x), int(upper_y)), UPPER_BODY_RADIUS))
+    dirty.union_ip(pygame.draw.circle(screen, BODY_COLOR, (int(
+        lower_x), int(lower_y)), LOWER_BODY_RADIUS))
 
     # Draw the limbs connecting to the body
-    left_arm.draw(screen, upper_body_pos)
-    right_arm.draw(screen, upper_body_pos)
-    left_leg.draw(screen, lower_body_pos)
-    right_leg.draw(screen, lower_body_pos)
+    for limb in sim.all_limbs:
+        dirty.union_ip(draw_limb(screen, limb, sim.body_pos_for(limb), top))
 
     # Draw the head
-    pygame.draw.circle(screen, HEAD_COLOR, (int(
-        head_pos[0]), int(head_pos[1])), HEAD_RADIUS)
+    head_pos = sim.head_pos
+    dirty.union_ip(pygame.draw.circle(screen, HEAD_COLOR, (int(
+        head_pos[0]), int(head_pos[1] - top)), HEAD_RADIUS))
 
-    # Update the display
-    pygame.display.flip()
+    return dirty
+
+
+def main():
+    startup = StartupTimer(LAUNCH_TIME)
+    startup.mark("imports")
 
-# Quit pygame
-pygame.quit()
-sys.exit()
+    # Initialize only what the game uses; pygame.init() would also open the
+    # audio device, which can take longer than everything else put together
+    pygame.display.init()
+    pygame.font.init()
+    startup.mark("pygame init")
+
+    # Physics ticks are a fixed slice of time, independent of the frame rate
+    sim = Simulation(load_board_state(),
+                     dt=1 / ((MAX_FPS or 60) * PHYSICS_SUBSTEPS))
+    if RECORD_INPUT_FILE:
+        sim.input_log = InputLog(sim.dt)
+    else:
+        # Snapshot every tick so holding Backspace can rewind. Not while
+        # recording, as a replay of the input log can't rewind.
+        sim.snapshots = SnapshotRing.for_seconds(REWIND_SECONDS, sim.dt)
+        sim.snapshots.push(sim)
+    startup.mark("board")
+
+    # Set up the screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Climbing Game")
+    startup.mark("display")
+
+    # Load and fit the background image if provided, from the asset cache
+    background_image = load_background_image(BACKGROUND_IMAGE_PATH, AssetCache())
+    startup.mark("background")
+
+    # The camera follows the upper body up walls taller than the screen
+    camera = Camera(sim.wall_height)
+    camera.follow(sim.upper_body_pos)
+    camera.jump()
+
+    # The board never changes during play, so draw the visible part once and
+    # only patch up the area the climber covered on each frame. Scrolling
+    # shifts the layer and draws just the rows that came into view.
+    row_index = build_row_index(sim)
+    board_layer = build_board_layer(sim, background_image, row_index, camera.y)
+    startup.mark("board layer")
+    screen.blit(board_layer, (0, 0))
+    pygame.display.flip()
+    startup.mark("first flip")
+    if SHOW_STARTUP_TIMES:
+        print(startup.report())
+    climber_rect = None
+    overlay_rect = None
+    show_stats = SHOW_FRAME_STATS
+    scheduler = FrameScheduler()
+    # F4 traces each frame's phases, F5 profiles the next few frames
+    profiling = Profiling([scheduler, sim])
+
+    running = True
+    while running:
+        # Nothing moves unless a limb is being dragged or something is
+        # falling, so sleep until the next event instead of spinning.
+        rewinding = (sim.snapshots is not None and len(sim.snapshots) > 1
+                     and pygame.key.get_pressed()[pygame.K_BACKSPACE])
+        idle = (not pygame.mouse.get_pressed()[0] and not sim.gravity_active()
+                and not camera.moving and not rewinding)
+        events = scheduler.events(idle)
+
+        with scheduler.phase("input"):
+            right_clicks = []
+            # Every position the mouse passed through while dragging this
+            # frame, so the physics ticks follow it rather than jumping
+            motion = []
+            for event in events:
+                if profiling.handle_event(event):
+                    continue
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:  # The grab happens where the button went down
+                        motion = [camera.to_wall(event.pos)]
+                    elif event.button == 3:  # Right-click toggles gravity
+                        right_clicks.append(camera.to_wall(event.pos))
+                elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                    motion.append(camera.to_wall(event.pos))
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    show_stats = not show_stats
+            mouse_pos = camera.to_wall(pygame.mouse.get_pos())
+            mouse_pressed = pygame.mouse.get_pressed()[0]
+
+        # Advance the simulation by however long the last frame took, or
+        # while Backspace is held, run it backwards at the same speed
+        with scheduler.phase("physics"):
+            if rewinding:
+                sim.snapshots.rewind(sim, max(1, round(scheduler.frame_time / sim.dt)))
+            else:
+                sim.advance(scheduler.frame_time, mouse_pos, mouse_pressed,
+                            right_clicks, motion, MOUSE_INTERPOLATION)
+
+        with scheduler.phase("draw"):
+            # The camera holds still while a limb is dragged; following then
+            # would move the wall under the cursor and pull the limb along.
+            if not mouse_pressed:
+                camera.follow(sim.upper_body_pos)
+            scrolled = camera.update(scheduler.frame_time)
+
+            dirty_rects = []
+            with scope(profiling.tracer, "board-draw"):
+                if scrolled:
+                    scroll_board_layer(board_layer, sim, row_index, background_image,
+                                       camera.y, scrolled)
+                    screen.blit(board_layer, (0, 0))
+                    dirty_rects.append(screen.get_rect())
+                else:
+                    # Restore the board under last frame's climber and overlay,
+                    # then redraw them
+                    for rect in (climber_rect, overlay_rect):
+                        if rect:
+                            screen.blit(board_layer, rect, rect)
+                            dirty_rects.append(rect)
+            with scope(profiling.tracer, "climber-draw"):
+                climber_rect = draw_climber(screen, sim, camera.y)
+            dirty_rects.append(climber_rect)
+            overlay_rect = None
+            if show_stats:
+                overlay_rect = scheduler.draw_overlay(screen)
+                dirty_rects.append(overlay_rect)
+
+        # Update only the parts of the display that changed
+        with scheduler.phase("flip"):
+            pygame.display.update(dirty_rects)
+
+        scheduler.end_frame()
+        profiling.end_frame()
+
+    profiling.close()
+    if FRAME_STATS_FILE:
+        scheduler.dump(FRAME_STATS_FILE)
+    if sim.input_log is not None:
+        sim.input_log.save(RECORD_INPUT_FILE)
+
+    # Quit pygame
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
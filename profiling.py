@@ -0,0 +1,163 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+import pygame
+from board_config import TRACE_FILE, PROFILE_FILE, PROFILE_FRAMES
+
+# Built-in profiling for the game and the board editor.
+#
+#   F4   start tracing; press again to write the trace to TRACE_FILE
+#   F5   cProfile the next PROFILE_FRAMES frames into PROFILE_FILE
+#
+# Setting the CLIMBING_TRACE environment variable to a file path traces from
+# launch and writes the trace there on exit. Traces are Chrome trace-event
+# JSON: open them in chrome://tracing or https://ui.perfetto.dev to see every
+# frame's phases (input, physics with its gravity and constraint steps,
+# board-draw, climber-draw, flip) on a timeline, and which one blew the
+# frame budget. Profile dumps load with pstats or snakeviz.
+
+TRACE_ENV = "CLIMBING_TRACE"
+TRACE_MAX_EVENTS = 200000  # Oldest events are dropped beyond this, so tracing can be left on
+TRACE_KEY = pygame.K_F4
+PROFILE_KEY = pygame.K_F5
+
+_NO_SCOPE = nullcontext()
+
+
+class _Scope:
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.tracer.add(self.name, self.start, time.perf_counter())
+
+
+class Tracer:
+    """Records named, timed scopes and writes them as a Chrome trace."""
+
+    def __init__(self, max_events=TRACE_MAX_EVENTS):
+        self.events = []
+        self.max_events = max_events
+        self.dropped = 0
+        self.origin = time.perf_counter()
+
+    def scope(self, name):
+        """Context manager that records its body as one event."""
+        return _Scope(self, name)
+
+    def add(self, name, start, end):
+        """Record an event from perf_counter() times start to end."""
+        events = self.events
+        if len(events) >= self.max_events:
+            # Drop the older half in one go rather than one event per add
+            del events[:self.max_events // 2]
+            self.dropped += self.max_events // 2
+        events.append((name, start, end, threading.get_ident()))
+
+    def to_json(self):
+        pid = os.getpid()
+        origin = self.origin
+        return {
+            "traceEvents": [{
+                "name": name, "cat": "frame", "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6,
+            } for name, start, end, tid in self.events],
+            "displayTimeUnit": "ms",
+            "otherData": {"droppedEvents": self.dropped},
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f)
+
+
+def scope(tracer, name):
+    """tracer.scope(name), or a no-op when tracer is None."""
+    if tracer is None:
+        return _NO_SCOPE
+    return tracer.scope(name)
+
+
+class Profiling:
+    """The F4/F5 switches, shared by main.py and board_maker.py.
+
+    targets are the objects (the FrameScheduler, the Simulation) whose
+    tracer attribute is set while tracing and None otherwise.
+    """
+
+    def __init__(self, targets, trace_file=TRACE_FILE, profile_file=PROFILE_FILE,
+                 profile_frames=PROFILE_FRAMES):
+        self.targets = targets
+        env_path = os.environ.get(TRACE_ENV)
+        self.trace_file = env_path or trace_file
+        self.profile_file = profile_file
+        self.profile_frames = profile_frames
+        self.tracer = None
+        self._profile = None
+        self._frames_left = 0
+        if env_path:
+            self.start_trace()
+
+    def _set_tracer(self, tracer):
+        self.tracer = tracer
+        for target in self.targets:
+            target.tracer = tracer
+
+    def start_trace(self):
+        self._set_tracer(Tracer())
+
+    def stop_trace(self):
+        """Stop tracing and write the trace file."""
+        tracer = self.tracer
+        self._set_tracer(None)
+        tracer.dump(self.trace_file)
+        print("Trace of %d events written to %s" % (len(tracer.events), self.trace_file))
+
+    def start_profile(self):
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._frames_left = self.profile_frames
+
+    def handle_event(self, event):
+        """Act on the profiling hotkeys. Returns whether the event was one."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == TRACE_KEY:
+            if self.tracer is None:
+                self.start_trace()
+            else:
+                self.stop_trace()
+            return True
+        if event.key == PROFILE_KEY:
+            self.start_profile()
+            return True
+        return False
+
+    def end_frame(self):
+        """Count down a running cProfile capture, writing it out after the last frame."""
+        if self._profile is None:
+            return
+        self._frames_left -= 1
+        if self._frames_left <= 0:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_file)
+            self._profile = None
+            print("Profile of %d frames written to %s" % (self.profile_frames, self.profile_file))
+
+    def close(self):
+        """Write out anything still being captured."""
+        if self._profile is not None:
+            self._frames_left = 0
+            self.end_frame()
+        if self.tracer is not None:
+            self.stop_trace()
@@ -2,6 +2,13 @@ import math
 
 # Ragdoll mechanics functions
 
+# Constraint solver settings
+SOLVER_TOLERANCE = 0.01  # Largest constraint violation, in pixels, counted as solved
+SOLVER_MAX_ITERATIONS = 16  # Sweeps over all constraints per solve at most
+# Inverse masses for ConstraintSolver points
+PINNED = 0.0  # Never moved by the solver
+MASSLESS = math.inf  # Takes the whole correction when constrained to a point with mass
+
 def calculate_distance(pos1, pos2):
     """Calculate the distance between two points."""
     return math.sqrt((pos2[0] - pos1[0]) ** 2 + (pos2[1] - pos1[1]) ** 2)
@@ -35,33 +42,38 @@ def drag_and_constrain_smoothly(limb_pos, body_pos, max_distance):
     return limb_pos
 
 def maintain_body_connection(upper_body_pos, lower_body_pos, body_distance):
-    """Keep the upper and lower body circles connected with a fixed distance."""
+    """Keep the upper and lower body circles connected with a fixed distance.
+
+    Both positions are updated in place (and returned for convenience).
+    """
     current_distance = calculate_distance(upper_body_pos, lower_body_pos)
     if current_distance != body_distance:
         diff_x = lower_body_pos[0] - upper_body_pos[0]
         diff_y = lower_body_pos[1] - upper_body_pos[1]
         factor = body_distance / current_distance
 
-        midpoint = [
-            (upper_body_pos[0] + lower_body_pos[0]) / 2,
-            (upper_body_pos[1] + lower_body_pos[1]) / 2,
-        ]
+        midpoint_x = (upper_body_pos[0] + lower_body_pos[0]) / 2
+        midpoint_y = (upper_body_pos[1] + lower_body_pos[1]) / 2
 
-        upper_body_pos = [
-            midpoint[0] - diff_x * factor / 2,
-            midpoint[1] - diff_y * factor / 2,
-        ]
-        lower_body_pos = [
-            midpoint[0] + diff_x * factor / 2,
-            midpoint[1] + diff_y * factor / 2,
-        ]
+        upper_body_pos[0] = midpoint_x - diff_x * factor / 2
+        upper_body_pos[1] = midpoint_y - diff_y * factor / 2
+        lower_body_pos[0] = midpoint_x + diff_x * factor / 2
+        lower_body_pos[1] = midpoint_y + diff_y * factor / 2
 
     return upper_body_pos, lower_body_pos
 
-def check_snapping(limb_pos, snap_radius, last_snapped_shape):
-    """Check if a limb should snap to a shape."""
+def check_snapping(limb_pos, snap_radius, last_snapped_shape, hold_index=None):
+    """Check if a limb should snap to a shape.
+
+    The last snapped shape wins if it's still in range; otherwise the nearest
+    hold in hold_index (a hold_index.HoldIndex) within snap_radius is used.
+    """
     if last_snapped_shape and calculate_distance(limb_pos, last_snapped_shape) <= snap_radius:
         return last_snapped_shape, True
+    if hold_index is not None:
+        key = hold_index.nearest(limb_pos, snap_radius)
+        if key is not None:
+            return hold_index.pos(key), True
     return limb_pos, False
 
 def unsnap_limb(limb_pos, last_snapped_shape):
@@ -69,3 +81,146 @@ def unsnap_limb(limb_pos, last_snapped_shape):
     if last_snapped_shape and calculate_distance(limb_pos, last_snapped_shape) > 0:
         return limb_pos, False
     return limb_pos, True
+
+
+class ConstraintSolver:
+    """Iterative position-based solver for distance constraints between points.
+
+    points is a list of [x, y] lists, which solve() updates in place.
+    inverse_masses has one entry per point and decides how a correction is
+    shared between the two ends of a constraint: PINNED points don't move,
+    MASSLESS points take the whole correction from points with mass, and two
+    finite masses share it in proportion. It can be changed between solves,
+    e.g. to pin a limb that's being dragged.
+
+    Each solve sweeps the constraints in order (Gauss-Seidel). A constraint
+    is only re-checked once a correction elsewhere has moved one of its
+    points, and solving stops when nothing is left to re-check, when the
+    largest violation in a sweep is below tolerance, or after max_iterations
+    sweeps. With warm_start, constraints whose corrections in the previous
+    solve moved points that other constraints use are swept first, so those
+    knock-on corrections happen before the constraints they disturb are
+    checked rather than forcing another sweep.
+    """
+
+    def __init__(self, points, inverse_masses, tolerance=SOLVER_TOLERANCE,
+                 max_iterations=SOLVER_MAX_ITERATIONS, warm_start=True):
+        self.points = points
+        self.inverse_masses = inverse_masses
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.warm_start = warm_start
+        self.constraints = []  # (a, b, min_length, max_length)
+        self.order = []  # Constraint indices in sweep order
+        self.leading = []  # Per constraint, whether the last solve's correction of it disturbed others
+        self.iterations = 0  # Sweeps used by the last solve
+        self.max_violation = 0.0  # Largest violation corrected in the last sweep
+        self._disturbed_others = []  # Like leading, for the solve in progress
+        self._dirty = []  # Per constraint, whether it needs checking this sweep
+        self._point_constraints = [[] for _ in points]  # Constraints using each point
+        # Per constraint, the other constraints using its point a and its point b
+        self._neighbours = []
+
+    def add_distance_constraint(self, a, b, min_length, max_length):
+        """Keep points a and b between min_length and max_length apart."""
+        index = len(self.constraints)
+        self.constraints.append((a, b, min_length, max_length))
+        self.order.append(index)
+        self.leading.append(False)
+        self._disturbed_others.append(False)
+        self._dirty.append(False)
+        self._neighbours.append(([], []))
+        for point, side in ((a, 0), (b, 1)):
+            for other in self._point_constraints[point]:
+                other_a, other_b = self.constraints[other][:2]
+                if other_a == point:
+                    self._neighbours[other][0].append(index)
+                if other_b == point:
+                    self._neighbours[other][1].append(index)
+                self._neighbours[index][side].append(other)
+            self._point_constraints[point].append(index)
+        return index
+
+    def solve(self):
+        """Satisfy the constraints as far as the budget allows. Returns the sweeps used."""
+        points = self.points
+        masses = self.inverse_masses
+        constraints = self.constraints
+        neighbours = self._neighbours
+        disturbed_others = self._disturbed_others
+        dirty = self._dirty
+        # Anything may have moved since the last solve, so check everything once
+        for index in self.order:
+            disturbed_others[index] = False
+            dirty[index] = True
+
+        iterations = 0
+        max_violation = 0.0
+        while iterations < self.max_iterations:
+            iterations += 1
+            max_violation = 0.0
+            for index in self.order:
+                if not dirty[index]:
+                    continue
+                dirty[index] = False
+                a, b, min_length, max_length = constraints[index]
+                pos_a = points[a]
+                pos_b = points[b]
+                diff_x = pos_b[0] - pos_a[0]
+                diff_y = pos_b[1] - pos_a[1]
+                dist = math.sqrt(diff_x * diff_x + diff_y * diff_y)
+                if dist > max_length:
+                    violation = dist - max_length
+                elif dist < min_length:
+                    violation = dist - min_length
+                else:
+                    continue
+                if dist == 0:
+                    continue  # No direction to push coincident points apart along
+
+                mass_a = masses[a]
+                mass_b = masses[b]
+                if mass_a == mass_b:
+                    share_a = share_b = 0.5 if mass_a else 0.0
+                elif mass_a == MASSLESS:
+                    share_a, share_b = 1.0, 0.0
+                elif mass_b == MASSLESS:
+                    share_a, share_b = 0.0, 1.0
+                else:
+                    share_a = mass_a / (mass_a + mass_b)
+                    share_b = mass_b / (mass_a + mass_b)
+
+                factor = violation / dist
+                correction_x = diff_x * factor
+                correction_y = diff_y * factor
+                pos_a[0] += correction_x * share_a
+                pos_a[1] += correction_y * share_a
+                pos_b[0] -= correction_x * share_b
+                pos_b[1] -= correction_y * share_b
+
+                if violation < 0:
+                    violation = -violation
+                if violation > max_violation:
+                    max_violation = violation
+                # Constraints sharing a moved point have to be checked again
+                neighbours_a, neighbours_b = neighbours[index]
+                if share_a and neighbours_a:
+                    disturbed_others[index] = True
+                    for other in neighbours_a:
+                        dirty[other] = True
+                if share_b and neighbours_b:
+                    disturbed_others[index] = True
+                    for other in neighbours_b:
+                        dirty[other] = True
+            if max_violation < self.tolerance or not any(dirty):
+                break
+
+        if disturbed_others != self.leading:
+            self.leading[:] = disturbed_others
+            if self.warm_start:
+                order = self.order
+                self.order = ([index for index in order if disturbed_others[index]] +
+                              [index for index in order if not disturbed_others[index]])
+        self.iterations = iterations
+        self.max_violation = max_violation
+        return iterations
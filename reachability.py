@@ -0,0 +1,300 @@
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from climber_config import BODY_DISTANCE, HAND_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE
+from hold_index import HoldIndex
+
+# Hold-to-hold reachability graph for a board: which pairs of circles the two
+# hands can hold at once, and which pairs of squares the two feet can.
+#
+# An edge only exists when the pair is part of at least one reachable pose,
+# i.e. some pair of holds for the other two limbs lets the body hang between
+# all four (see pose_is_reachable). Finding that takes pose checks over every
+# nearby hold pair, so the graph is cached on disk keyed by a hash of the holds
+# and the climber limits and only rebuilt when either changes.
+#
+# Cache file layout (little-endian):
+#   magic b'RGH2'
+#   for hands, then feet:
+#     uint32 hold count n
+#     uint32[n + 1] offsets into the neighbour list
+#     uint32[offsets[n]] neighbour hold indices
+
+CACHE_DIR = ".reachability_cache"
+MAGIC = b'RGH2'
+
+# The physics keeps each limb within max_distance / 2 of its body point and
+# the two body points exactly BODY_DISTANCE apart.
+HAND_REACH = HAND_BODY_MAX_DISTANCE / 2
+FOOT_REACH = FEET_BODY_MAX_DISTANCE / 2
+# Furthest a hand hold can be from a foot hold in the same pose
+HAND_FOOT_REACH = HAND_REACH + BODY_DISTANCE + FOOT_REACH
+LENS_SAMPLES = 24  # Points sampled around each reach circle
+
+
+def _lens_boundary(center_a, center_b, radius):
+    """Sample the boundary of the region within radius of both centers.
+
+    Returns an empty list when the two discs don't overlap.
+    """
+    if math.dist(center_a, center_b) > 2 * radius:
+        return []
+    points = []
+    for center, other in ((center_a, center_b), (center_b, center_a)):
+        for i in range(LENS_SAMPLES):
+            angle = 2 * math.pi * i / LENS_SAMPLES
+            point = (center[0] + radius * math.cos(angle),
+                     center[1] + radius * math.sin(angle))
+            if math.dist(point, other) <= radius + 1e-9:
+                points.append(point)
+    if not points:
+        # Tangent discs meet in a single point
+        points.append(((center_a[0] + center_b[0]) / 2,
+                       (center_a[1] + center_b[1]) / 2))
+    return points
+
+
+def _regions_meet(upper_region, lower_region, hands, feet):
+    """Check two sampled reach regions can hold body points BODY_DISTANCE apart."""
+    # Overlapping regions can get arbitrarily close
+    too_close = (any(math.dist(p, feet[0]) <= FOOT_REACH and math.dist(p, feet[1]) <= FOOT_REACH
+                     for p in upper_region) or
+                 any(math.dist(p, hands[0]) <= HAND_REACH and math.dist(p, hands[1]) <= HAND_REACH
+                     for p in lower_region))
+    too_far = False
+    for upper in upper_region:
+        for lower in lower_region:
+            dist = math.dist(upper, lower)
+            if dist <= BODY_DISTANCE:
+                too_close = True
+            if dist >= BODY_DISTANCE:
+                too_far = True
+            if too_close and too_far:
+                return True
+    return False
+
+
+def pose_is_reachable(hands, feet):
+    """Check whether the body can hang between two hand holds and two foot holds.
+
+    Some upper body point has to be in range of both hands, some lower body
+    point in range of both feet, and the two have to sit BODY_DISTANCE apart.
+    Both reach regions are convex, so every distance between the closest and
+    furthest pair of points is achievable; the pose works when BODY_DISTANCE
+    falls in that range. The check is done on sampled boundary points.
+    """
+    upper_region = _lens_boundary(hands[0], hands[1], HAND_REACH)
+    if not upper_region:
+        return False
+    lower_region = _lens_boundary(feet[0], feet[1], FOOT_REACH)
+    if not lower_region:
+        return False
+    return _regions_meet(upper_region, lower_region, hands, feet)
+
+
+def board_hash(board_state):
+    """Hash of everything the graph depends on: the holds and the climber limits."""
+    key = {
+        'format': MAGIC.decode(),
+        'circles': [[float(x), float(y)] for x, y in board_state['circles']],
+        'squares': [[float(x), float(y)] for x, y in board_state['squares']],
+        'climber': [BODY_DISTANCE, HAND_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE],
+        'samples': LENS_SAMPLES,
+    }
+    encoded = json.dumps(key, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _index(positions):
+    index = HoldIndex()
+    for i, pos in enumerate(positions):
+        index.add(i, pos)
+    return index
+
+
+def _pairs_within(positions, index, span):
+    """For each hold, the sorted holds within span of it (itself included)."""
+    return [sorted(index.within(pos, span)) for pos in positions]
+
+
+def _filter_pairs(near, own, own_reach, other, other_index, other_near, other_reach, own_is_hands):
+    """Keep only the pairs in near that some pair of the other limb type completes."""
+    other_regions = {}  # Sampled reach region per other-limb pair, built on demand
+    kept = [set() for _ in near]
+    for i, candidates in enumerate(near):
+        for j in candidates:
+            if j < i:
+                if i in kept[j]:
+                    kept[i].add(j)
+                continue
+            pair = (own[i], own[j])
+            region = _lens_boundary(pair[0], pair[1], own_reach)
+            if not region:
+                continue
+            # Only holds in range of both of this pair can complete the pose
+            others = [k for k in other_index.within(own[i], HAND_FOOT_REACH)
+                      if math.dist(other[k], own[j]) <= HAND_FOOT_REACH]
+            in_range = set(others)
+            found = False
+            for k in others:
+                for m in other_near[k]:
+                    if m < k or m not in in_range:
+                        continue
+                    if (k, m) not in other_regions:
+                        other_regions[k, m] = _lens_boundary(other[k], other[m], other_reach)
+                    other_region = other_regions[k, m]
+                    if not other_region:
+                        continue
+                    if own_is_hands:
+                        found = _regions_meet(region, other_region, pair, (other[k], other[m]))
+                    else:
+                        found = _regions_meet(other_region, region, (other[k], other[m]), pair)
+                    if found:
+                        break
+                if found:
+                    break
+            if found:
+                kept[i].add(j)
+    return [sorted(hold_neighbours) for hold_neighbours in kept]
+
+
+def _to_csr(neighbour_lists):
+    offsets = array('I', [0])
+    neighbours = array('I')
+    for hold_neighbours in neighbour_lists:
+        neighbours.extend(hold_neighbours)
+        offsets.append(len(neighbours))
+    return offsets, neighbours
+
+
+def _write_arrays(f, *arrays):
+    for values in arrays:
+        if sys.byteorder != 'little':
+            values = array('I', values)
+            values.byteswap()
+        values.tofile(f)
+
+
+def _read_array(f, count):
+    values = array('I')
+    values.fromfile(f, count)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def cache_file_is_valid(path, hand_count, foot_count):
+    """Check a cache file's magic, hold counts and section lengths.
+
+    Only the headers and the last offset of each section are read, so this
+    stays cheap for large graphs.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return False
+            position = len(MAGIC)
+            for expected_count in (hand_count, foot_count):
+                (count,) = struct.unpack('<I', f.read(4))
+                if count != expected_count:
+                    return False
+                # The last offset is the length of the neighbour list
+                f.seek(position + 4 + count * 4)
+                (edges,) = struct.unpack('<I', f.read(4))
+                position += 4 + (count + 1) * 4 + edges * 4
+                f.seek(position)
+            return position == size
+    except (OSError, struct.error):
+        return False
+
+
+class ReachabilityGraph:
+    """Per-limb-type neighbour lists, optionally backed by a cache file.
+
+    A graph opened from the cache doesn't read the file until the first
+    neighbour lookup.
+    """
+
+    def __init__(self, hand_adjacency=None, foot_adjacency=None, path=None):
+        self.path = path
+        self._hands = hand_adjacency
+        self._feet = foot_adjacency
+
+    @classmethod
+    def build(cls, board_state):
+        circles = [tuple(pos) for pos in board_state['circles']]
+        squares = [tuple(pos) for pos in board_state['squares']]
+        circle_index = _index(circles)
+        square_index = _index(squares)
+        hands_near = _pairs_within(circles, circle_index, 2 * HAND_REACH)
+        feet_near = _pairs_within(squares, square_index, 2 * FOOT_REACH)
+
+        hands = _filter_pairs(hands_near, circles, HAND_REACH,
+                              squares, square_index, feet_near, FOOT_REACH, True)
+        feet = _filter_pairs(feet_near, squares, FOOT_REACH,
+                             circles, circle_index, hands, HAND_REACH, False)
+        return cls(_to_csr(hands), _to_csr(feet))
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a reachability cache file" % self.path)
+            adjacency = []
+            for _ in range(2):
+                (count,) = struct.unpack('<I', f.read(4))
+                offsets = _read_array(f, count + 1)
+                neighbours = _read_array(f, offsets[-1])
+                adjacency.append((offsets, neighbours))
+        self._hands, self._feet = adjacency
+
+    def save(self, path):
+        hands, feet = self.hands, self.feet
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            for offsets, neighbours in (hands, feet):
+                f.write(struct.pack('<I', len(offsets) - 1))
+                _write_arrays(f, offsets, neighbours)
+        os.replace(tmp_path, path)
+        self.path = path
+
+    @property
+    def hands(self):
+        if self._hands is None:
+            self._load()
+        return self._hands
+
+    @property
+    def feet(self):
+        if self._feet is None:
+            self._load()
+        return self._feet
+
+    def hand_neighbours(self, hold):
+        """Circles the other hand can hold while one hand is on this circle."""
+        offsets, neighbours = self.hands
+        return neighbours[offsets[hold]:offsets[hold + 1]]
+
+    def foot_neighbours(self, hold):
+        """Squares the other foot can stand on while one foot is on this square."""
+        offsets, neighbours = self.feet
+        return neighbours[offsets[hold]:offsets[hold + 1]]
+
+
+def load_reachability_graph(board_state, cache_dir=CACHE_DIR):
+    """Return the board's graph from the cache, building and caching it if needed.
+
+    A cache file that's truncated or doesn't match the board is rebuilt.
+    """
+    path = os.path.join(cache_dir, board_hash(board_state) + ".rgh")
+    if cache_file_is_valid(path, len(board_state['circles']), len(board_state['squares'])):
+        return ReachabilityGraph(path=path)
+    graph = ReachabilityGraph.build(board_state)
+    os.makedirs(cache_dir, exist_ok=True)
+    graph.save(path)
+    return graph
@@ -0,0 +1,167 @@
+import heapq
+import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from board_file import wall_height
+from hold_index import HoldIndex
+from reachability import (HAND_FOOT_REACH, ReachabilityGraph, load_reachability_graph,
+                          pose_is_reachable)
+
+# Finds a sequence of hand and foot placements that gets the climber from the
+# bottom row of a board to the top, without anyone dragging limbs around.
+#
+# A pose is (hand_a, hand_b, foot_a, foot_b) as indices into the board's
+# circles (hands) and squares (feet). Left and right are interchangeable, so
+# each pair is stored sorted and mirrored poses share one search state.
+# Whether a pose is reachable is decided by reachability.pose_is_reachable.
+
+DEFAULT_BEAM_WIDTH = 2000
+DEFAULT_MAX_STATES = 200000
+
+
+def _pair(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+class RouteSolver:
+    """Best-first beam search over climber poses on one board."""
+
+    def __init__(self, board_state, beam_width=DEFAULT_BEAM_WIDTH, max_states=DEFAULT_MAX_STATES,
+                 graph=None, cache_dir=None):
+        self.circles = [tuple(pos) for pos in board_state['circles']]
+        self.squares = [tuple(pos) for pos in board_state['squares']]
+        self.num_rows = board_state['num_rows']
+        self.row_height = wall_height(board_state) // self.num_rows
+        self.beam_width = beam_width
+        self.max_states = max_states
+        self.states_explored = 0
+
+        self.hand_index = HoldIndex.from_board_state(board_state, ('circles',))
+        # Which hold pairs can be part of a reachable pose. Built in memory
+        # unless a cache_dir is given to keep it on disk between runs.
+        if graph is None:
+            if cache_dir is None:
+                graph = ReachabilityGraph.build(board_state)
+            else:
+                graph = load_reachability_graph(board_state, cache_dir)
+        self.graph = graph
+        self.is_reachable = lru_cache(maxsize=None)(self._is_reachable)
+
+    def _is_reachable(self, pose):
+        hand_a, hand_b, foot_a, foot_b = pose
+        return pose_is_reachable((self.circles[hand_a], self.circles[hand_b]),
+                                 (self.squares[foot_a], self.squares[foot_b]))
+
+    def row_of(self, pos):
+        return int(pos[1] // self.row_height)
+
+    def hand_holds_near(self, hand):
+        """Circles the other hand could share an upper body position with."""
+        return self.graph.hand_neighbours(hand)
+
+    def foot_holds_near(self, foot):
+        return self.graph.foot_neighbours(foot)
+
+    def start_poses(self):
+        """Every reachable pose with both feet on the bottom row."""
+        bottom_feet = [i for i, pos in enumerate(self.squares)
+                       if self.row_of(pos) >= self.num_rows - 1]
+        poses = set()
+        for foot_a in bottom_feet:
+            for foot_b in bottom_feet:
+                if foot_b < foot_a:
+                    continue
+                hands = [i for _, i in self.hand_index.within(self.squares[foot_a], HAND_FOOT_REACH)]
+                for hand_a in hands:
+                    for hand_b in self.hand_holds_near(hand_a):
+                        pose = _pair(hand_a, hand_b) + (foot_a, foot_b)
+                        if pose not in poses and self.is_reachable(pose):
+                            poses.add(pose)
+        return poses
+
+    def is_goal(self, pose):
+        return self.row_of(self.circles[pose[0]]) == 0 or self.row_of(self.circles[pose[1]]) == 0
+
+    def neighbours(self, pose):
+        """Poses one hand or foot move away."""
+        hand_a, hand_b, foot_a, foot_b = pose
+        feet = (foot_a, foot_b)
+        for staying, moving in ((hand_a, hand_b), (hand_b, hand_a)):
+            for hold in self.hand_holds_near(staying):
+                if hold != moving:
+                    yield _pair(staying, hold) + feet
+        hands = (hand_a, hand_b)
+        for staying, moving in ((foot_a, foot_b), (foot_b, foot_a)):
+            for hold in self.foot_holds_near(staying):
+                if hold != moving:
+                    yield hands + _pair(staying, hold)
+
+    def _priority(self, pose, moves):
+        # Highest hand first (smallest y), then fewest moves
+        return (min(self.circles[pose[0]][1], self.circles[pose[1]][1]), moves)
+
+    def solve(self):
+        """Return the list of poses from a start pose to the top, or None."""
+        best_moves = {}  # Transposition table: pose -> fewest moves to reach it
+        parents = {}
+        frontier = []
+        for pose in self.start_poses():
+            best_moves[pose] = 0
+            parents[pose] = None
+            heapq.heappush(frontier, (self._priority(pose, 0), pose))
+
+        self.states_explored = 0
+        while frontier and self.states_explored < self.max_states:
+            (_, moves), pose = heapq.heappop(frontier)
+            if moves > best_moves[pose]:
+                continue  # Stale entry, reached more cheaply since
+            self.states_explored += 1
+            if self.is_goal(pose):
+                return self._path_to(pose, parents)
+
+            for child in self.neighbours(pose):
+                if best_moves.get(child, math.inf) <= moves + 1:
+                    continue
+                if not self.is_reachable(child):
+                    continue
+                best_moves[child] = moves + 1
+                parents[child] = pose
+                heapq.heappush(frontier, (self._priority(child, moves + 1), child))
+
+            if len(frontier) > 2 * self.beam_width:
+                frontier = heapq.nsmallest(self.beam_width, frontier)
+                heapq.heapify(frontier)
+        return None
+
+    def _path_to(self, pose, parents):
+        path = []
+        while pose is not None:
+            path.append(pose)
+            pose = parents[pose]
+        path.reverse()
+        return path
+
+    def pose_positions(self, pose):
+        """Hold positions for a pose, as (hand, hand, foot, foot)."""
+        return (self.circles[pose[0]], self.circles[pose[1]],
+                self.squares[pose[2]], self.squares[pose[3]])
+
+
+def solve_board(board_state, beam_width=DEFAULT_BEAM_WIDTH, cache_dir=None):
+    """Solve one board and return the route as hold positions, or None."""
+    solver = RouteSolver(board_state, beam_width, cache_dir=cache_dir)
+    path = solver.solve()
+    if path is None:
+        return None
+    return [solver.pose_positions(pose) for pose in path]
+
+
+def solve_boards(board_states, beam_width=DEFAULT_BEAM_WIDTH, processes=None, cache_dir=None):
+    """Solve many boards, fanning out over a process pool unless processes is 1."""
+    board_states = list(board_states)
+    if processes == 1:
+        return [solve_board(state, beam_width, cache_dir) for state in board_states]
+    count = len(board_states)
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(solve_board, board_states,
+                             [beam_width] * count, [cache_dir] * count))
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import struct
+import sys
+from board_config import MAX_FPS, PHYSICS_SUBSTEPS
+from simulation import Simulation, MAX_FRAME_TIME
+import board_file
+
+# Runs many independent climbing sessions in one process. Every session is a
+# headless Simulation, the same physics main.py runs; one asyncio loop ticks
+# them all at a fixed rate and streams each client only what changed.
+#
+#   python session_server.py --unix /tmp/climbing.sock
+#   python session_server.py --port 7777 --board board_state.json
+#
+# The protocol is a stream of fixed-size little-endian messages, each
+# starting with a one-byte type.
+#
+# Client to server:
+#   b'I' uint8 flags (PRESSED, HAS_POS), float32 x, y   mouse state, kept until the next one
+#   b'R' float32 x, y                                   right click
+#   b'Z'                                                reset the climber
+#
+# Server to client:
+#   b'W' uint32 session id, float64 dt                  once, on connecting
+#   b'D' uint32 tick, uint16 mask, then one float32 per set bit 0-11 and,
+#        if bit 12 is set, a uint8 of gravity flags     after a tick that changed something
+#
+# A delta's coordinates are, in mask bit order, x and y of the upper body,
+# lower body, left arm, right arm, left leg and right leg, in wall pixels.
+# Gravity flags are one bit per limb in that order, then the lower body.
+# The first delta after connecting or resetting has every bit set. Ticks
+# where nothing moved send nothing, so an idle kiosk costs no traffic.
+
+TICK_DT = 1 / ((MAX_FPS or 60) * PHYSICS_SUBSTEPS)  # Same tick length as the game
+MAX_WRITE_BUFFER = 1 << 16  # Bytes queued for a client before it's dropped as too slow
+
+INPUT = b'I'
+RIGHT_CLICK = b'R'
+RESET = b'Z'
+WELCOME = b'W'
+DELTA = b'D'
+
+PRESSED = 1
+HAS_POS = 2
+
+_INPUT = struct.Struct('<Bff')
+_POINT = struct.Struct('<ff')
+_WELCOME = struct.Struct('<Id')
+_DELTA = struct.Struct('<IH')
+_COORD = struct.Struct('<f')
+_FLAGS = struct.Struct('<B')
+_CLIENT_PAYLOADS = {INPUT: _INPUT.size, RIGHT_CLICK: _POINT.size, RESET: 0}
+
+COORD_COUNT = 12
+FLAGS_BIT = 1 << COORD_COUNT
+ALL_CHANGED = FLAGS_BIT | ((1 << COORD_COUNT) - 1)
+
+
+def climber_state(sim):
+    """A Simulation's climber as (12 coordinates, gravity flags), in delta order."""
+    coords = []
+    for point in (sim.upper_body_pos, sim.lower_body_pos) + tuple(limb.pos for limb in sim.all_limbs):
+        coords.append(point[0])
+        coords.append(point[1])
+    flags = 0
+    for bit, limb in enumerate(sim.all_limbs):
+        if limb.gravity_on:
+            flags |= 1 << bit
+    if sim.lower_body_gravity_on:
+        flags |= 1 << len(sim.all_limbs)
+    return coords, flags
+
+
+def encode_delta(tick, coords, flags, sent_coords, sent_flags, mask=0):
+    """Encode the differences from the last sent state, or return None if there are none.
+
+    sent_coords is updated in place. mask forces bits to be included.
+    """
+    values = []
+    for i in range(COORD_COUNT):
+        if mask & (1 << i) or coords[i] != sent_coords[i]:
+            mask |= 1 << i
+            values.append(coords[i])
+            sent_coords[i] = coords[i]
+    if flags != sent_flags:
+        mask |= FLAGS_BIT
+    if not mask:
+        return None
+    data = _DELTA.pack(tick, mask) + b''.join(_COORD.pack(value) for value in values)
+    if mask & FLAGS_BIT:
+        data += _FLAGS.pack(flags)
+    return data
+
+
+class Session:
+    """One client's climber and its latest input."""
+
+    def __init__(self, session_id, board_state, writer, dt=TICK_DT):
+        self.id = session_id
+        self.sim = Simulation(board_state, dt=dt)
+        self.writer = writer
+        self.mouse_pos = None
+        self.mouse_pressed = False
+        self.pressed_since_tick = False  # A press that may have been released again already
+        self.right_clicks = []
+        self.sent_coords = [0.0] * COORD_COUNT
+        self.sent_flags = 0
+        self.force_mask = ALL_CHANGED  # Bits to send next delta whether or not they changed
+
+    def handle(self, kind, payload):
+        if kind == INPUT:
+            flags, x, y = _INPUT.unpack(payload)
+            self.mouse_pos = (x, y) if flags & HAS_POS else None
+            self.mouse_pressed = bool(flags & PRESSED)
+            self.pressed_since_tick |= self.mouse_pressed
+        elif kind == RIGHT_CLICK:
+            self.right_clicks.append(_POINT.unpack(payload))
+        elif kind == RESET:
+            self.sim.reset()
+            self.force_mask = ALL_CHANGED
+
+    @property
+    def idle(self):
+        """Nothing would move this tick, so it can be skipped, as the game sleeps when idle.
+
+        A release the simulation hasn't ticked yet isn't idle: until it does,
+        the limb stays grabbed for the next press.
+        """
+        return (not self.mouse_pressed and not self.pressed_since_tick and not self.right_clicks
+                and not self.sim.button_held and not self.sim.gravity_active())
+
+    def tick(self):
+        right_clicks, self.right_clicks = self.right_clicks, []
+        pressed = self.mouse_pressed or self.pressed_since_tick
+        self.pressed_since_tick = False
+        self.sim.tick(self.mouse_pos, pressed, right_clicks)
+
+    def delta(self, tick):
+        coords, flags = climber_state(self.sim)
+        data = encode_delta(tick, coords, flags, self.sent_coords, self.sent_flags, self.force_mask)
+        self.sent_flags = flags
+        self.force_mask = 0
+        return data
+
+
+class SessionServer:
+    """Ticks every connected session on one fixed-rate loop.
+
+    Start listening with start(), then run the loop with run() (or call
+    tick() directly to step it by hand).
+    """
+
+    def __init__(self, board_state=None, dt=TICK_DT):
+        self.board_state = board_state
+        self.dt = dt
+        self.sessions = {}
+        self.tick_count = 0
+        self.bytes_sent = 0
+        self._next_id = 1
+        self._server = None
+        self._running = False
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """Listen on a Unix socket at path, or on TCP host:port. Returns the address."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def _serve(self, reader, writer):
+        session = Session(self._next_id, self.board_state, writer, self.dt)
+        self._next_id += 1
+        self.sessions[session.id] = session
+        writer.write(WELCOME + _WELCOME.pack(session.id, self.dt))
+        try:
+            while True:
+                kind = await reader.readexactly(1)
+                size = _CLIENT_PAYLOADS.get(kind)
+                if size is None:
+                    break  # Not speaking the protocol
+                session.handle(kind, await reader.readexactly(size) if size else b'')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop(session)
+
+    def _drop(self, session):
+        if self.sessions.pop(session.id, None) is not None:
+            session.writer.close()
+
+    def tick(self):
+        """Advance every session one tick and send each client its delta."""
+        self.tick_count += 1
+        for session in list(self.sessions.values()):
+            if not session.idle:
+                session.tick()
+            elif not session.force_mask:
+                continue  # Nothing moved, nothing to send
+            data = session.delta(self.tick_count)
+            if data is None:
+                continue
+            # A client that can't keep up would otherwise hold everyone's
+            # memory; it can reconnect and start from a full state
+            if session.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                self._drop(session)
+                continue
+            session.writer.write(DELTA + data)
+            self.bytes_sent += 1 + len(data)
+
+    async def run(self):
+        """Tick every dt seconds until stop() is called."""
+        loop = asyncio.get_running_loop()
+        self._running = True
+        next_tick = loop.time()
+        while self._running:
+            self.tick()
+            next_tick += self.dt
+            delay = next_tick - loop.time()
+            if delay < -MAX_FRAME_TIME:
+                next_tick = loop.time()  # Too far behind to catch up; skip ahead
+            await asyncio.sleep(max(0.0, delay))
+
+    def stop(self):
+        self._running = False
+
+    async def close(self):
+        self.stop()
+        for session in list(self.sessions.values()):
+            self._drop(session)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+class SessionClient:
+    """Stand-in for a kiosk: sends input and keeps a mirror of its climber from the deltas."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.session_id = None
+        self.dt = None
+        self.tick = 0
+        self.coords = [0.0] * COORD_COUNT
+        self.flags = 0
+        self.bytes_received = 0
+
+    @classmethod
+    async def connect(cls, path=None, host='127.0.0.1', port=0):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        kind = await reader.readexactly(1)
+        if kind != WELCOME:
+            raise ValueError("expected a welcome message, got %r" % kind)
+        client.session_id, client.dt = _WELCOME.unpack(await reader.readexactly(_WELCOME.size))
+        client.bytes_received += 1 + _WELCOME.size
+        return client
+
+    def send_input(self, mouse_pos, mouse_pressed):
+        flags = PRESSED if mouse_pressed else 0
+        x = y = 0.0
+        if mouse_pos is not None:
+            flags |= HAS_POS
+            x, y = mouse_pos
+        self.writer.write(INPUT + _INPUT.pack(flags, x, y))
+
+    def right_click(self, pos):
+        self.writer.write(RIGHT_CLICK + _POINT.pack(*pos))
+
+    def reset(self):
+        self.writer.write(RESET)
+
+    async def receive(self):
+        """Read and apply one delta. Returns its tick."""
+        reader = self.reader
+        kind = await reader.readexactly(1)
+        if kind != DELTA:
+            raise ValueError("expected a delta, got %r" % kind)
+        self.tick, mask = _DELTA.unpack(await reader.readexactly(_DELTA.size))
+        size = _DELTA.size
+        for i in range(COORD_COUNT):
+            if mask & (1 << i):
+                (self.coords[i],) = _COORD.unpack(await reader.readexactly(_COORD.size))
+                size += _COORD.size
+        if mask & FLAGS_BIT:
+            (self.flags,) = _FLAGS.unpack(await reader.readexactly(_FLAGS.size))
+            size += _FLAGS.size
+        self.bytes_received += 1 + size
+        return self.tick
+
+    def point(self, i):
+        """(x, y) of point i: upper body, lower body, then the limbs."""
+        return (self.coords[2 * i], self.coords[2 * i + 1])
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _demo_client(path, host, port, ticks):
+    """Drag the left arm up for a while and report the traffic."""
+    client = await SessionClient.connect(path, host, port)
+    await client.receive()
+    x, y = client.point(2)
+    for i in range(1, ticks + 1):
+        client.send_input((x, y - i), True)
+        await client.receive()  # Every step moves the arm, so every tick sends a delta
+    client.send_input((x, y - ticks), False)
+    print("session %d: %d bytes for %d ticks of dragging, upper body at (%.1f, %.1f)" %
+          ((client.session_id, client.bytes_received, ticks) + client.point(0)))
+    await client.close()
+
+
+async def _serve_forever(server, path, host, port):
+    address = await server.start(path, host, port)
+    print("Serving climbing sessions on %s" % (address,))
+    await server.run()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve climbing sessions to local clients.")
+    parser.add_argument("--unix", help="listen on (or connect to) a Unix socket at this path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--board", help="board file every session climbs (default: empty wall)")
+    parser.add_argument("--client", type=int, metavar="TICKS",
+                        help="instead of serving, run a stand-in client for this many ticks")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.client:
+        asyncio.run(_demo_client(args.unix, args.host, args.port, args.client))
+        sys.exit(0)
+    board_state = board_file.load_board_state(args.board) if args.board else None
+    try:
+        asyncio.run(_serve_forever(SessionServer(board_state), args.unix, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
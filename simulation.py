@@ -0,0 +1,415 @@
+import itertools
+import math
+import struct
+from ragdoll import calculate_distance, ConstraintSolver, MASSLESS, PINNED
+from climber_config import (HEAD_RADIUS, UPPER_BODY_RADIUS, LOWER_BODY_RADIUS, BODY_DISTANCE,
+                            HAND_RADIUS, HAND_BODY_MAX_DISTANCE, FEET_SIZE, FEET_BODY_MAX_DISTANCE)
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from board_file import wall_height
+
+# Headless climber simulation. Nothing in here touches pygame, so it can be
+# imported by tests and batch tools without a display.
+
+# Physics runs in fixed time steps of dt seconds, so the same inputs give the
+# same climb whatever the frame rate. Headless runs can pass a large dt for
+# throughput; the game uses a small one for stability.
+DEFAULT_DT = 1 / 60
+GRAVITY_SPEED = 300  # How fast a falling limb or lower body drops, in pixels per second
+MAX_FRAME_TIME = 0.25  # Longest frame advance() will catch up on, in seconds
+SETTLE_TOLERANCE = 0.5  # How close to its rest height a falling part counts as landed
+DEFAULT_NUM_ROWS = 8
+
+# Snapshot layout (little-endian, SNAPSHOT.size bytes):
+#   uint32 tick count, float64 accumulator
+#   12 float64: x, y of the upper body, lower body, left arm, right arm,
+#     left leg and right leg
+#   uint8 gravity flags: one bit per limb in that order, then the lower body
+#   uint8 flags: WAS_PRESSED, BUTTON_HELD, then the grabbed limb + 1 (0 for none) in bits 2-4
+#   5 uint8 constraint solver sweep order, uint8 solver leading flags (a bit per constraint)
+# That's everything a tick reads, so restoring a snapshot and replaying the
+# same input gives exactly the same climb as the original.
+SNAPSHOT = struct.Struct('<Id12dBB5BB')
+SNAPSHOT_WAS_PRESSED = 1
+SNAPSHOT_BUTTON_HELD = 2
+SNAPSHOT_GRABBED_SHIFT = 2
+
+
+class Limb:
+    """Physics-only limb. Drawing lives in main.py."""
+
+    __slots__ = ('pos', 'radius', 'max_distance', 'shape', 'gravity_on')
+
+    def __init__(self, start_pos, radius, max_distance, shape="circle"):
+        self.pos = list(start_pos)  # Updated in place from here on
+        self.radius = radius
+        self.max_distance = max_distance
+        self.shape = shape
+        self.gravity_on = False
+
+    def toggle_gravity(self):
+        self.gravity_on = not self.gravity_on
+
+    def apply_gravity(self, body_pos, step):
+        """Drop the limb by up to step pixels towards its hanging position."""
+        if self.gravity_on:
+            # Move the limb downward naturally
+            desired_y = body_pos[1] + (self.max_distance / 2)
+            if self.pos[1] < desired_y:
+                self.pos[1] += step
+                if self.pos[1] > desired_y:
+                    self.pos[1] = desired_y
+
+    def can_grab(self, mouse_pos, other_limbs):
+        """Whether pressing the button at mouse_pos would pick up this limb."""
+        return self.is_near(mouse_pos) and not self.overlaps_with_other_limbs(mouse_pos, other_limbs)
+
+    def drag(self, mouse_pos, other_limbs):
+        """Move the grabbed limb to the mouse, unless that would overlap another limb.
+
+        Returns whether it moved. The mouse doesn't have to be over the limb,
+        so a fast flick can't leave it behind.
+        """
+        if self.overlaps_with_other_limbs(mouse_pos, other_limbs):
+            return False
+        pos = self.pos
+        pos[0] = mouse_pos[0]
+        pos[1] = mouse_pos[1]
+        return True
+
+    def is_near(self, mouse_pos):
+        return calculate_distance(self.pos, mouse_pos) < self.radius
+
+    def overlaps_with_other_limbs(self, mouse_pos, other_limbs):
+        for limb in other_limbs:
+            if calculate_distance(mouse_pos, limb.pos) < self.radius + limb.radius:
+                return True
+        return False
+
+
+class Simulation:
+    """Owns the climber state and advances it one tick at a time.
+
+    A tick applies right-click gravity toggles, moves limbs under the mouse
+    to it, applies gravity, then solves the limb reach and body length
+    constraints together with a ragdoll.ConstraintSolver. The limb under
+    the mouse when the button goes down is grabbed until it's released, and
+    only that limb follows the mouse. It's pinned for the solve, so the body
+    follows it; other limbs are massless and follow the body.
+
+    All positions are two-element lists that are created by reset() and then
+    only ever updated in place, so a tick allocates no new containers and
+    references to them (e.g. sim.upper_body_pos) stay live.
+    """
+
+    __slots__ = ('num_rows', 'wall_height', 'row_height', 'circles', 'squares', 'dt', 'gravity_step', 'tick_count',
+                 'accumulator', '_pending_right_clicks', '_was_pressed', 'input_log',
+                 'grabbed', '_button_held', '_last_mouse_pos',
+                 'upper_body_pos', 'lower_body_pos', 'lower_body_gravity_on', '_head_pos',
+                 'left_arm', 'right_arm', 'left_leg', 'right_leg', 'all_limbs', '_drag_order',
+                 'solver', 'snapshots', 'tracer')
+
+    def __init__(self, board_state=None, dt=DEFAULT_DT):
+        if board_state:
+            self.num_rows = board_state['num_rows']
+            self.circles = board_state['circles']
+            self.squares = board_state['squares']
+        else:
+            self.num_rows = DEFAULT_NUM_ROWS
+            self.circles = []
+            self.squares = []
+        self.wall_height = wall_height(board_state)
+        self.row_height = self.wall_height // self.num_rows
+        self.dt = dt
+        self.gravity_step = GRAVITY_SPEED * dt
+        self.tick_count = 0
+        self.accumulator = 0.0
+        self._pending_right_clicks = []
+        self._was_pressed = False  # Button state at the last advance()
+        self.input_log = None  # Set to an input_log.InputLog to record every tick's input
+        self.snapshots = None  # Set to a snapshot_ring.SnapshotRing to snapshot every tick
+        self.tracer = None  # Set to a profiling.Tracer to time each tick's gravity and constraint steps
+        self.reset()
+
+    def reset(self):
+        """Put the climber back in its starting pose."""
+        # Middle of the bottom screen's worth of wall
+        start_y = self.wall_height - SCREEN_HEIGHT // 2
+        self.upper_body_pos = [SCREEN_WIDTH // 2, start_y - BODY_DISTANCE // 2]
+        self.lower_body_pos = [SCREEN_WIDTH // 2, start_y + BODY_DISTANCE // 2]
+        self.lower_body_gravity_on = False
+
+        self.left_arm = Limb([self.upper_body_pos[0] - 50, self.upper_body_pos[1] - 50],
+                             HAND_RADIUS, HAND_BODY_MAX_DISTANCE, "circle")
+        self.right_arm = Limb([self.upper_body_pos[0] + 50, self.upper_body_pos[1] - 50],
+                              HAND_RADIUS, HAND_BODY_MAX_DISTANCE, "circle")
+        self.left_leg = Limb([self.lower_body_pos[0] - 50, self.lower_body_pos[1] + 50],
+                             FEET_SIZE // 2, FEET_BODY_MAX_DISTANCE, "square")
+        self.right_leg = Limb([self.lower_body_pos[0] + 50, self.lower_body_pos[1] + 50],
+                              FEET_SIZE // 2, FEET_BODY_MAX_DISTANCE, "square")
+        self.all_limbs = [self.left_arm, self.right_arm,
+                          self.left_leg, self.right_leg]
+        self.grabbed = None  # Index of the limb held by the mouse
+        self._button_held = False  # Button state at the last tick
+        self._last_mouse_pos = None  # Where the last tick had the mouse
+        self._head_pos = [0, 0]
+        # Each limb with its solver point and the limbs it mustn't overlap
+        self._drag_order = tuple(
+            (limb, 2 + i, tuple(other for other in self.all_limbs if other is not limb))
+            for i, limb in enumerate(self.all_limbs))
+
+        # Points 0 and 1 are the upper and lower body, then one per limb
+        self.solver = ConstraintSolver(
+            [self.upper_body_pos, self.lower_body_pos] + [limb.pos for limb in self.all_limbs],
+            [1.0, 1.0] + [MASSLESS] * len(self.all_limbs))
+        for i, limb in enumerate(self.all_limbs):
+            body = 0 if limb.shape == "circle" else 1
+            self.solver.add_distance_constraint(2 + i, body, 0, limb.max_distance / 2)
+        self.solver.add_distance_constraint(0, 1, BODY_DISTANCE, BODY_DISTANCE)
+
+    @property
+    def time(self):
+        """Simulated seconds so far."""
+        return self.tick_count * self.dt
+
+    @property
+    def button_held(self):
+        """Whether the last tick had the left button down."""
+        return self._button_held
+
+    @property
+    def head_pos(self):
+        """Where the head sits on the upper body. The list is reused between calls."""
+        head_pos = self._head_pos
+        head_pos[0] = self.upper_body_pos[0]
+        head_pos[1] = self.upper_body_pos[1] - UPPER_BODY_RADIUS - HEAD_RADIUS
+        return head_pos
+
+    def body_pos_for(self, limb):
+        """Arms hang off the upper body, legs off the lower body."""
+        if limb.shape == "circle":
+            return self.upper_body_pos
+        return self.lower_body_pos
+
+    def gravity_active(self):
+        """True while anything with gravity on is still above where it comes to rest."""
+        for limb in self.all_limbs:
+            rest_y = self.body_pos_for(limb)[1] + limb.max_distance / 2
+            if limb.gravity_on and limb.pos[1] < rest_y - SETTLE_TOLERANCE:
+                return True
+        rest_y = self.upper_body_pos[1] + BODY_DISTANCE
+        return self.lower_body_gravity_on and self.lower_body_pos[1] < rest_y - SETTLE_TOLERANCE
+
+    def right_click(self, mouse_pos):
+        """Toggle gravity on whatever is under the cursor."""
+        for limb in self.all_limbs:
+            if limb.is_near(mouse_pos):
+                limb.toggle_gravity()
+        if calculate_distance(mouse_pos, self.lower_body_pos) < LOWER_BODY_RADIUS:
+            self.lower_body_gravity_on = not self.lower_body_gravity_on
+
+    def _pick_limb(self, mouse_pos):
+        for i, (limb, _, other_limbs) in enumerate(self._drag_order):
+            if limb.can_grab(mouse_pos, other_limbs):
+                return i
+        return None
+
+    def _apply_gravity(self):
+        # Apply gravity to each limb
+        for limb in self.all_limbs:
+            limb.apply_gravity(self.body_pos_for(limb), self.gravity_step)
+
+        # Apply gravity to the lower body if toggled
+        if self.lower_body_gravity_on:
+            desired_y = self.upper_body_pos[1] + BODY_DISTANCE
+            if self.lower_body_pos[1] < desired_y:
+                self.lower_body_pos[1] += self.gravity_step
+                if self.lower_body_pos[1] > desired_y:
+                    self.lower_body_pos[1] = desired_y
+
+    def tick(self, mouse_pos=None, mouse_pressed=False, right_clicks=()):
+        """Advance the simulation by a single tick of dt seconds."""
+        if self.input_log is not None:
+            self.input_log.record(mouse_pos, mouse_pressed, right_clicks)
+        for click_pos in right_clicks:
+            self.right_click(click_pos)
+
+        inverse_masses = self.solver.inverse_masses
+        inverse_masses[2] = inverse_masses[3] = inverse_masses[4] = inverse_masses[5] = MASSLESS
+        if mouse_pressed and mouse_pos is not None:
+            # Pick the limb once when the button goes down, then only move that one
+            if not self._button_held:
+                self._button_held = True
+                self.grabbed = self._pick_limb(mouse_pos)
+            if self.grabbed is not None:
+                limb, point, other_limbs = self._drag_order[self.grabbed]
+                if limb.drag(mouse_pos, other_limbs):
+                    inverse_masses[point] = PINNED
+            self._last_mouse_pos = mouse_pos
+        else:
+            self._button_held = False
+            self.grabbed = None
+
+        tracer = self.tracer
+        if tracer is None:
+            self._apply_gravity()
+            # Pull limbs within reach of the body and keep the body its fixed length
+            self.solver.solve()
+        else:
+            with tracer.scope("gravity"):
+                self._apply_gravity()
+            with tracer.scope("constraint"):
+                self.solver.solve()
+
+        self.tick_count += 1
+        if self.snapshots is not None:
+            self.snapshots.push(self)
+
+    def snapshot_into(self, buffer, offset=0):
+        """Pack the game state into buffer at offset, in the SNAPSHOT layout."""
+        upper, lower = self.upper_body_pos, self.lower_body_pos
+        left_arm, right_arm, left_leg, right_leg = self.all_limbs
+        gravity = (left_arm.gravity_on | right_arm.gravity_on << 1 | left_leg.gravity_on << 2 |
+                   right_leg.gravity_on << 3 | self.lower_body_gravity_on << 4)
+        order = self.solver.order
+        leading = self.solver.leading
+        left_arm, right_arm = left_arm.pos, right_arm.pos
+        left_leg, right_leg = left_leg.pos, right_leg.pos
+        SNAPSHOT.pack_into(buffer, offset, self.tick_count, self.accumulator,
+                           upper[0], upper[1], lower[0], lower[1],
+                           left_arm[0], left_arm[1], right_arm[0], right_arm[1],
+                           left_leg[0], left_leg[1], right_leg[0], right_leg[1],
+                           gravity, self._snapshot_flags(),
+                           order[0], order[1], order[2], order[3], order[4],
+                           leading[0] | leading[1] << 1 | leading[2] << 2 |
+                           leading[3] << 3 | leading[4] << 4)
+
+    def _snapshot_flags(self):
+        flags = SNAPSHOT_WAS_PRESSED if self._was_pressed else 0
+        if self._button_held:
+            flags |= SNAPSHOT_BUTTON_HELD
+        if self.grabbed is not None:
+            flags |= (self.grabbed + 1) << SNAPSHOT_GRABBED_SHIFT
+        return flags
+
+    def snapshot(self):
+        """The game state as a SNAPSHOT.size byte record."""
+        buffer = bytearray(SNAPSHOT.size)
+        self.snapshot_into(buffer)
+        return bytes(buffer)
+
+    def restore(self, data, offset=0):
+        """Return to a snapshot taken on a simulation of the same board.
+
+        Positions are updated in place, so references to them stay live.
+        Right clicks queued by advance() for the next tick are dropped.
+        """
+        values = SNAPSHOT.unpack_from(data, offset)
+        self.tick_count, self.accumulator = values[0], values[1]
+        points = (self.upper_body_pos, self.lower_body_pos) + tuple(limb.pos for limb in self.all_limbs)
+        for i, point in enumerate(points):
+            point[0] = values[2 + 2 * i]
+            point[1] = values[3 + 2 * i]
+        gravity = values[14]
+        for bit, limb in enumerate(self.all_limbs):
+            limb.gravity_on = bool(gravity & (1 << bit))
+        self.lower_body_gravity_on = bool(gravity & (1 << 4))
+        flags = values[15]
+        self._was_pressed = bool(flags & SNAPSHOT_WAS_PRESSED)
+        self._button_held = bool(flags & SNAPSHOT_BUTTON_HELD)
+        grabbed = flags >> SNAPSHOT_GRABBED_SHIFT
+        self.grabbed = grabbed - 1 if grabbed else None
+        self._pending_right_clicks = []
+        self._last_mouse_pos = None
+        solver = self.solver
+        solver.order[:] = values[16:21]
+        leading = values[21]
+        solver.leading[:] = [bool(leading & (1 << bit)) for bit in range(len(solver.leading))]
+
+    def step(self, n=1, inputs=None):
+        """Advance the simulation by n ticks.
+
+        inputs is an optional iterable yielding one tuple of tick() arguments
+        per tick, e.g. (mouse_pos, mouse_pressed) or
+        (mouse_pos, mouse_pressed, right_clicks). When it runs out early the
+        remaining ticks run with no input.
+        """
+        if inputs is None:
+            for _ in range(n):
+                self.tick()
+            return
+        inputs = itertools.chain(inputs, itertools.repeat(()))
+        for tick_input in itertools.islice(inputs, n):
+            self.tick(*tick_input)
+
+    def _mouse_path(self, ticks, mouse_pos, motion, pressed_now, interpolate):
+        """The mouse position for each of the next ticks, following motion."""
+        if not motion or mouse_pos is None or not ticks:
+            return [mouse_pos] * ticks
+        path = [tuple(pos) for pos in motion]
+        if path[-1] != tuple(mouse_pos):
+            path.append(tuple(mouse_pos))
+        positions = []
+        if pressed_now:
+            # The grab happens where the button went down
+            positions.append(path[0])
+            start = path[0]
+            path = path[1:] or path
+        else:
+            start = self._last_mouse_pos if self._last_mouse_pos is not None else path[0]
+        remaining = ticks - len(positions)
+        points = [start] + path
+        for i in range(1, remaining + 1):
+            fraction = i / remaining
+            if i == remaining:
+                positions.append(path[-1])
+            elif interpolate:
+                t = fraction * (len(points) - 1)
+                j = int(t)
+                f = t - j
+                a, b = points[j], points[j + 1]
+                positions.append((a[0] + (b[0] - a[0]) * f, a[1] + (b[1] - a[1]) * f))
+            else:
+                # The latest position the mouse had reached by this tick
+                positions.append(path[math.ceil(fraction * len(path)) - 1])
+        return positions
+
+    def advance(self, elapsed, mouse_pos=None, mouse_pressed=False, right_clicks=(), motion=(),
+                interpolate=False):
+        """Run as many whole dt ticks as fit in elapsed seconds of real time.
+
+        Leftover time carries over to the next call. New input (a right
+        click, or the left button going down) always gets at least one tick,
+        borrowing up to one dt from the next call, so a click made on a short
+        frame, such as the first one after waking from idle, isn't delayed.
+        Releasing the button gets one too, even while in debt.
+
+        motion is every mouse position seen since the last call while the
+        button was down, oldest first and starting where it went down if it
+        went down since. The ticks are spread along it, so the grab happens
+        where the button was pressed and a drag follows the mouse's path
+        within the frame; with interpolate, ticks between motion events get
+        points between them. Returns the number of ticks run.
+        """
+        self._pending_right_clicks.extend(right_clicks)
+        self.accumulator += min(elapsed, MAX_FRAME_TIME)
+        pressed_now = mouse_pressed and not self._was_pressed
+        new_input = bool(self._pending_right_clicks) or pressed_now
+        self._was_pressed = mouse_pressed
+        # Not already in debt from a previous forced tick
+        force_tick = new_input and 0 <= self.accumulator < self.dt
+        # A release has to reach a tick even then, or the grab outlives it.
+        # It can only follow a press, so the debt stays bounded.
+        if not mouse_pressed and self._button_held and self.accumulator < self.dt:
+            force_tick = True
+
+        ticks = 0
+        accumulator = self.accumulator
+        while accumulator >= self.dt or (force_tick and not ticks):
+            accumulator -= self.dt
+            ticks += 1
+
+        for tick_pos in self._mouse_path(ticks, mouse_pos, motion, pressed_now, interpolate):
+            right_clicks, self._pending_right_clicks = self._pending_right_clicks, []
+            self.tick(tick_pos, mouse_pressed, right_clicks)
+            self.accumulator -= self.dt
+        return ticks
@@ -0,0 +1,58 @@
+from simulation import SNAPSHOT
+
+# The last few seconds of a climb, one Simulation snapshot per tick, in a
+# single preallocated buffer. Taking a snapshot packs straight into the
+# buffer, so recording every tick allocates nothing.
+
+
+class SnapshotRing:
+    """Fixed-capacity ring of snapshots; the oldest is overwritten when full.
+
+    Attach to Simulation.snapshots to record after every tick.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * SNAPSHOT.size)
+        self._next = 0  # Slot the next snapshot goes in
+        self._count = 0
+
+    @classmethod
+    def for_seconds(cls, seconds, dt):
+        return cls(max(1, int(round(seconds / dt))))
+
+    def __len__(self):
+        return self._count
+
+    def push(self, sim):
+        sim.snapshot_into(self.buffer, self._next * SNAPSHOT.size)
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _offset(self, ticks_back):
+        if not 0 <= ticks_back < self._count:
+            raise IndexError("no snapshot %d ticks back" % ticks_back)
+        return (self._next - 1 - ticks_back) % self.capacity * SNAPSHOT.size
+
+    def get(self, ticks_back=0):
+        """The snapshot ticks_back ticks before the newest, as bytes."""
+        offset = self._offset(ticks_back)
+        return bytes(self.buffer[offset:offset + SNAPSHOT.size])
+
+    def rewind(self, sim, ticks):
+        """Restore sim to up to ticks ticks before the newest snapshot, forgetting the ones after.
+
+        Returns how many ticks it actually went back, which is fewer when the
+        ring doesn't reach that far.
+        """
+        ticks = min(ticks, self._count - 1)
+        if ticks < 0:
+            return 0
+        sim.restore(self.buffer, self._offset(ticks))
+        self._next = (self._next - ticks) % self.capacity
+        self._count -= ticks
+        return ticks
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
@@ -0,0 +1,68 @@
+import os
+import pygame
+import pytest
+from asset_cache import AssetCache, cache_key, read_cached_image
+
+SIZE = (60, 90)
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+    yield
+    pygame.quit()
+
+
+@pytest.fixture
+def source(tmp_path):
+    image = pygame.Surface((30, 40))
+    for x in range(30):
+        for y in range(40):
+            image.set_at((x, y), (x * 8, y * 6, (x + y) * 3))
+    path = str(tmp_path / "source.png")
+    pygame.image.save(image, path)
+    return path
+
+
+def _pixels(surface):
+    return pygame.image.tobytes(surface, "RGB")
+
+
+def test_cached_image_matches_a_fresh_load(tmp_path, source):
+    expected = pygame.transform.scale(pygame.image.load(source), SIZE)
+    cache_dir = str(tmp_path / "cache")
+
+    first = AssetCache(cache_dir)
+    image = first.image(source, SIZE)
+    assert (first.hits, first.misses) == (0, 1)
+    assert image.get_size() == SIZE
+    assert image.get_bitsize() == pygame.display.get_surface().get_bitsize()
+    assert first.image(source, SIZE) is image  # Kept in memory after the first load
+
+    second = AssetCache(cache_dir)
+    assert _pixels(second.image(source, SIZE)) == _pixels(expected)
+    assert (second.hits, second.misses) == (1, 0)
+
+
+def test_cache_misses_on_new_size_or_changed_source(tmp_path, source):
+    assert cache_key(source, SIZE) != cache_key(source, (61, 90))
+    key = cache_key(source, SIZE)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache_key(source, SIZE) != key
+
+
+def test_damaged_cache_file_is_rebuilt(tmp_path, source):
+    cache_dir = str(tmp_path / "cache")
+    AssetCache(cache_dir).image(source, SIZE)
+    (cache_file,) = os.listdir(cache_dir)
+    path = os.path.join(cache_dir, cache_file)
+    with open(path, 'r+b') as f:
+        f.truncate(100)
+    assert read_cached_image(path) is None
+
+    cache = AssetCache(cache_dir)
+    cache.image(source, SIZE)
+    assert cache.misses == 1
+    assert read_cached_image(path) is not None
@@ -0,0 +1,55 @@
+import random
+import numpy as np
+from simulation import Simulation
+from batch_simulation import BatchSimulation
+
+
+def test_batch_matches_single_climber_simulation():
+    rng = random.Random(1)
+    count = 20
+    sims = [Simulation() for _ in range(count)]
+    batch = BatchSimulation(count)
+
+    for _ in range(300):
+        mouse = np.empty((count, 2))
+        for i, sim in enumerate(sims):
+            if rng.random() < 0.7:
+                # Aim near a limb so drags actually happen
+                limb = rng.choice(sim.all_limbs)
+                mouse[i] = (limb.pos[0] + rng.uniform(-5, 5), limb.pos[1] + rng.uniform(-5, 5))
+            else:
+                mouse[i] = (rng.uniform(150, 450), rng.uniform(200, 700))
+        pressed = np.array([rng.random() < 0.8 for _ in range(count)])
+        clicked = np.array([rng.random() < 0.05 for _ in range(count)])
+
+        for i, sim in enumerate(sims):
+            sim.tick(tuple(mouse[i]), bool(pressed[i]), [tuple(mouse[i])] if clicked[i] else [])
+        batch.right_click(mouse, clicked)
+        batch.tick(mouse, pressed)
+        assert list(batch.solver_iterations) == [sim.solver.iterations for sim in sims]
+
+    for i, sim in enumerate(sims):
+        np.testing.assert_allclose(batch.bodies[i], [sim.upper_body_pos, sim.lower_body_pos],
+                                   atol=1e-9)
+        np.testing.assert_allclose(batch.limbs[i], [limb.pos for limb in sim.all_limbs], atol=1e-9)
+        assert list(batch.limb_gravity_on[i]) == [limb.gravity_on for limb in sim.all_limbs]
+        assert batch.lower_body_gravity_on[i] == sim.lower_body_gravity_on
+
+
+def test_batch_branches_from_a_snapshot():
+    sim = Simulation()
+    for i in range(40):
+        pos = sim.right_arm.pos
+        sim.tick((pos[0] + 2, pos[1] - 3), True, [sim.left_leg.pos] if i == 5 else [])
+    batch = BatchSimulation(3)
+    batch.load_snapshot(sim.snapshot())
+
+    for _ in range(60):
+        pos = sim.left_arm.pos
+        mouse = (pos[0] - 2, pos[1] - 1)
+        sim.tick(mouse, True)
+        batch.tick(mouse, True)
+    for i in range(3):
+        np.testing.assert_allclose(batch.bodies[i], [sim.upper_body_pos, sim.lower_body_pos], atol=1e-9)
+        np.testing.assert_allclose(batch.limbs[i], [limb.pos for limb in sim.all_limbs], atol=1e-9)
+        assert list(batch.limb_gravity_on[i]) == [limb.gravity_on for limb in sim.all_limbs]
@@ -0,0 +1,28 @@
+import benchmark
+
+
+def test_compare_flags_only_drops_beyond_tolerance():
+    baseline = {"a": {"ops_per_sec": 1000.0}, "b": {"ops_per_sec": 1000.0}}
+    results = {
+        "a": {"ops_per_sec": 800.0},   # 20% slower, within tolerance
+        "b": {"ops_per_sec": 700.0},   # 30% slower
+        "c": {"ops_per_sec": 1.0},     # Not in the baseline
+    }
+    assert benchmark.compare(results, baseline, tolerance=0.25) == [("b", 1000.0, 700.0)]
+
+
+def test_benchmarks_run_headless(tmp_path):
+    names = ["sim.tick_drag", "frame.draw", "load.board_100"]
+    results = benchmark.run_benchmarks(names, rounds=2, round_time=0.001)
+    assert sorted(results) == sorted(names)
+    for result in results.values():
+        assert result["ops_per_sec"] > 0
+        assert result["p50_us"] <= result["p95_us"] <= result["p99_us"]
+
+    path = str(tmp_path / "baseline.json")
+    benchmark.save_baseline(path, results)
+    assert benchmark.compare(results, benchmark.load_baseline(path)) == []
+
+
+def test_an_empty_selection_runs_nothing():
+    assert benchmark.run_benchmarks([], rounds=1, round_time=0.001) == {}
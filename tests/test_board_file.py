@@ -0,0 +1,51 @@
+import json
+import os
+import pytest
+from board_file import BoardFile, convert, load_board_state, write_board_file
+
+BOARD_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "board_state.json")
+
+
+def test_json_round_trips_through_binary(tmp_path):
+    binary = str(tmp_path / "board.board")
+    back = str(tmp_path / "back.json")
+    convert(BOARD_FILE, binary)
+    convert(binary, back)
+    with open(BOARD_FILE) as f, open(back) as g:
+        assert json.load(f) == json.load(g)
+
+
+def test_binary_board_reads_like_a_board_state(tmp_path):
+    state = {'num_rows': 12, 'circles': [[1, 2], [3, 4]], 'squares': [[5.5, 6.25]], 'setter': 'anna'}
+    path = str(tmp_path / "board.board")
+    write_board_file(path, state)
+
+    with load_board_state(path) as board:
+        assert board['num_rows'] == 12
+        assert len(board['circles']) == 2
+        assert board['circles'][1] == (3, 4)
+        assert list(board['squares']) == [(5.5, 6.25)]
+        assert board['setter'] == 'anna'
+        assert board.as_array('circles').tolist() == [[1, 2], [3, 4]]
+        assert board.to_board_state() == state
+
+
+def test_truncated_or_foreign_file_is_rejected(tmp_path):
+    path = str(tmp_path / "board.board")
+    write_board_file(path, {'num_rows': 8, 'circles': [[1, 2]] * 10, 'squares': []})
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    with open(path, 'wb') as f:
+        f.write(data[:-8])
+    with pytest.raises(ValueError):
+        BoardFile(path)
+
+    with open(path, 'wb') as f:
+        f.write(b'JUNK' + data[4:])
+    with pytest.raises(ValueError):
+        BoardFile(path)
+
+
+def test_missing_board_loads_as_none(tmp_path):
+    assert load_board_state(str(tmp_path / "nope.board")) is None
@@ -0,0 +1,133 @@
+import random
+import pygame
+import pytest
+import board_maker
+
+
+@pytest.fixture(autouse=True)
+def display():
+    # Other tests may have shut pygame down since board_maker opened its window
+    if not pygame.display.get_init():
+        pygame.init()
+        board_maker.screen = pygame.display.set_mode((board_maker.SCREEN_WIDTH, board_maker.SCREEN_HEIGHT))
+        board_maker._fonts.clear()
+        board_maker._text_surfaces.clear()
+
+
+def _random_holds(rng, count):
+    return [{'pos': [rng.randrange(board_maker.SCREEN_WIDTH), rng.randrange(board_maker.SCREEN_HEIGHT)]}
+            for _ in range(count)]
+
+
+def _pixels(surface):
+    return pygame.image.tostring(surface, 'RGB')
+
+
+def test_patched_layer_matches_a_full_redraw():
+    rng = random.Random(2)
+    circles = _random_holds(rng, 150)
+    squares = _random_holds(rng, 150)
+    hold_index = board_maker.build_hold_index(circles, squares)
+    layer = board_maker.build_board_layer(circles, squares, 6)
+
+    for _ in range(20):
+        key = rng.choice(list(hold_index.positions))
+        shape = (circles if key[0] == 'circles' else squares)[key[1]]
+        # Pick the hold up, move it, and drop it again
+        old_rect = board_maker.hold_rect(key[0], shape['pos'])
+        board_maker.redraw_layer_area(layer, old_rect, circles, squares, hold_index, 6, skip=key)
+        shape['pos'] = [rng.randrange(board_maker.SCREEN_WIDTH), rng.randrange(board_maker.SCREEN_HEIGHT)]
+        hold_index.move(key, shape['pos'])
+        area = old_rect.union(board_maker.hold_rect(key[0], shape['pos']))
+        board_maker.redraw_layer_area(layer, area, circles, squares, hold_index, 6)
+
+    assert _pixels(layer) == _pixels(board_maker.build_board_layer(circles, squares, 6))
+
+
+def test_button_font_and_text_are_cached(monkeypatch):
+    calls = []
+    real_sys_font = pygame.font.SysFont
+    monkeypatch.setattr(pygame.font, 'SysFont', lambda *args: calls.append(args) or real_sys_font(*args))
+    monkeypatch.setattr(board_maker, '_fonts', {})
+    monkeypatch.setattr(board_maker, '_text_surfaces', {})
+    surface = pygame.Surface((board_maker.SCREEN_WIDTH, board_maker.SCREEN_HEIGHT))
+    for _ in range(5):
+        board_maker.draw_button(surface, "Save", board_maker.BUTTON_POS,
+                                (board_maker.BUTTON_WIDTH, board_maker.BUTTON_HEIGHT))
+    assert len(calls) == 1
+    assert len(board_maker._text_surfaces) == 1
+
+
+def _run_editor(monkeypatch, tmp_path, events):
+    """Run the editor over the default board until it has handled events; return its holds."""
+    monkeypatch.setattr(board_maker, 'STATE_FILE', str(tmp_path / "board.json"))
+    monkeypatch.setattr(board_maker, 'AUTOSAVE_FILE', str(tmp_path / "autosave.json"))
+    monkeypatch.setattr(board_maker.pygame, 'quit', lambda: None)
+    captured = {}
+    real_build = board_maker.build_hold_index
+
+    def build_hold_index(circles, squares):
+        captured['holds'] = (circles, squares)
+        return real_build(circles, squares)
+    monkeypatch.setattr(board_maker, 'build_hold_index', build_hold_index)
+
+    pygame.event.clear()
+    for event in events + [pygame.event.Event(pygame.QUIT)]:
+        pygame.event.post(event)
+    with pytest.raises(SystemExit):
+        board_maker.main()
+    return captured['holds']
+
+
+def _drag(start, *positions):
+    events = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start, button=1)]
+    for pos in positions:
+        events.append(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(1, 0, 0)))
+    events.append(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=positions[-1], button=1))
+    return events
+
+
+def _key(key, mod=pygame.KMOD_CTRL):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode='', scancode=0)
+
+
+def _assert_screen_shows(circles, squares):
+    expected = pygame.Surface((board_maker.SCREEN_WIDTH, board_maker.SCREEN_HEIGHT))
+    board_maker.draw_board(expected, circles, squares, board_maker.NUM_ROWS)
+    assert _pixels(board_maker.screen) == _pixels(expected)
+
+
+def test_editor_screen_matches_the_board_after_a_drag(monkeypatch, tmp_path):
+    # The default board has a circle at (100, 150); drag it in a few steps
+    circles, squares = _run_editor(monkeypatch, tmp_path,
+                                   _drag((100, 150), (120, 170), (160, 260), (200, 300)))
+    assert circles[1]['pos'] == [200, 300]
+    _assert_screen_shows(circles, squares)
+
+    # Nothing was saved explicitly, so the move went to the autosave on exit
+    assert not (tmp_path / "board.json").exists()
+    autosave = board_maker.board_file.load_board_state(str(tmp_path / "autosave.json"))
+    assert autosave['circles'][1] == [200, 300]
+    assert autosave['squares'] == [square['pos'] for square in squares]
+
+
+def test_undo_and_redo_moves(monkeypatch, tmp_path):
+    events = _drag((100, 150), (200, 300)) + _drag((350, 200), (400, 500))
+    events += [_key(pygame.K_z), _key(pygame.K_z), _key(pygame.K_y)]
+    circles, squares = _run_editor(monkeypatch, tmp_path, events)
+    assert circles[1]['pos'] == [200, 300]  # Undone, then redone
+    assert squares[1]['pos'] == [350, 200]  # Undone
+    _assert_screen_shows(circles, squares)
+
+
+def test_saving_keeps_the_board_s_other_keys(monkeypatch, tmp_path):
+    board = {'num_rows': 8, 'wall_height': 2700, 'author': "setter",
+             'circles': [[100, 150], [300, 400]], 'squares': [[350, 200]]}
+    board_maker.board_file.save_board_state(str(tmp_path / "board.json"), board)
+    save = (board_maker.BUTTON_POS[0] + 1, board_maker.BUTTON_POS[1] + 1)
+    events = _drag((100, 150), (200, 300)) + [
+        pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=save, button=1)]
+    _run_editor(monkeypatch, tmp_path, events)
+
+    saved = board_maker.board_file.load_board_state(str(tmp_path / "board.json"))
+    assert saved == dict(board, circles=[[200, 300], [300, 400]])
@@ -0,0 +1,53 @@
+import json
+import threading
+import board_file
+from board_saver import BoardSaver
+
+
+def _board():
+    return {'num_rows': 4, 'circles': [[i, i] for i in range(50)], 'squares': [[i, -i] for i in range(50)]}
+
+
+def test_saves_apply_updates_in_order(tmp_path):
+    saver = BoardSaver(_board())
+    first, second = str(tmp_path / "first.json"), str(tmp_path / "second.board")
+    saver.update({('circles', 3): (300, 30)})
+    saver.save(first)
+    saver.update({('squares', 0): [7.5, 8.5], ('circles', 3): [301, 31]})
+    saver.save(second)
+    assert saver.flush(timeout=10)
+    saver.close()
+
+    with open(first) as f:
+        saved = json.load(f)
+    assert saved['circles'][3] == [300, 30] and saved['squares'][0] == [0, 0]
+    with board_file.BoardFile(second) as saved:
+        assert saved['circles'][3] == (301, 31) and saved['squares'][0] == (7.5, 8.5)
+    assert saver.saves == 2 and saver.error is None
+    # Written under a temporary name and renamed, so nothing else is left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["first.json", "second.board"]
+
+
+def test_save_does_not_wait_for_the_write(tmp_path, monkeypatch):
+    release = threading.Event()
+    real_save = board_file.save_board_state
+
+    def slow_save(path, state):
+        release.wait(10)
+        real_save(path, state)
+    monkeypatch.setattr(board_file, 'save_board_state', slow_save)
+
+    saver = BoardSaver(_board())
+    saver.save(str(tmp_path / "board.json"))
+    assert saver.pending()  # save() returned while the write is still held up
+    release.set()
+    saver.close()
+    assert not saver.pending() and saver.saves == 1
+
+
+def test_write_errors_are_reported_not_raised(tmp_path):
+    saver = BoardSaver(_board())
+    saver.save(str(tmp_path / "missing" / "board.json"))
+    saver.flush(timeout=10)
+    saver.close()
+    assert isinstance(saver.error, OSError)
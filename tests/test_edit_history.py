@@ -0,0 +1,27 @@
+from edit_history import EditHistory
+
+
+def test_undo_redo_walks_the_edits():
+    history = EditHistory()
+    history.record(('circles', 0), [1, 1], [2, 2])
+    history.record(('squares', 4), [5, 5], [6, 6])
+    history.record(('circles', 1), [3, 3], [3, 3])  # Not a move
+
+    assert len(history) == 2
+    assert history.undo() == (('squares', 4), (5, 5))
+    assert history.undo() == (('circles', 0), (1, 1))
+    assert history.undo() is None
+    assert history.redo() == (('circles', 0), (2, 2))
+
+    # A new edit drops whatever could still be redone
+    history.record(('circles', 0), [2, 2], [9, 9])
+    assert history.redo() is None
+    assert history.undo() == (('circles', 0), (2, 2))
+
+
+def test_history_is_bounded():
+    history = EditHistory(limit=3)
+    for i in range(10):
+        history.record(('circles', 0), [i, 0], [i + 1, 0])
+    assert [history.undo() for _ in range(4)] == [
+        (('circles', 0), (9, 0)), (('circles', 0), (8, 0)), (('circles', 0), (7, 0)), None]
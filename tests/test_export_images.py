@@ -0,0 +1,103 @@
+import json
+import os
+import pygame
+import pytest
+import export_images
+import main as game
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from input_log import InputLog
+from simulation import Simulation
+
+BOARD_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "board_state.json")
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    yield
+    pygame.quit()
+
+
+def _same_pixels(a, b):
+    return pygame.image.tobytes(a, "RGB") == pygame.image.tobytes(b, "RGB")
+
+
+def _record_climb(tmp_path, board_state):
+    """Drag the left arm up and across, then let go and drop it."""
+    sim = Simulation(board_state)
+    sim.input_log = InputLog(sim.dt)
+    x, y = sim.left_arm.pos
+    sim.tick(None, False, [(x, y)])  # Gravity on for the arm
+    for i in range(40):
+        sim.tick((x + i, y - 2 * i), True)
+    for _ in range(20):
+        sim.tick((x + 40, y - 80), False)
+    path = str(tmp_path / "climb.log")
+    sim.input_log.save(path)
+    return path, sim
+
+
+def test_thumbnails_for_every_board_and_skip_up_to_date(tmp_path):
+    boards = tmp_path / "boards"
+    boards.mkdir()
+    with open(BOARD_FILE) as f:
+        board = json.load(f)
+    (boards / "a.json").write_text(json.dumps(board))
+    (boards / "b.json").write_text(json.dumps(dict(board, circles=[])))
+    (boards / "broken.json").write_text("{")
+    out = tmp_path / "thumbs"
+
+    results = []
+    written = export_images.export_thumbnails(str(boards), str(out), (60, 90), processes=1,
+                                              background_path=None,
+                                              report=lambda *result: results.append(result))
+    assert written == 2
+    assert sorted(os.listdir(out)) == ["a.png", "b.png"]
+    assert [name for name, error, _ in results if error] == ["broken.json"]
+    thumb = pygame.image.load(str(out / "a.png"))
+    assert thumb.get_size() == (60, 90)
+    expected = pygame.transform.smoothscale(export_images.render_board(board), (60, 90))
+    assert _same_pixels(thumb, expected)
+
+    assert export_images.export_thumbnails(str(boards), str(out), (60, 90), processes=1,
+                                           background_path=None) == 0
+    assert export_images.export_thumbnails(str(boards), str(out), (60, 90), processes=1,
+                                           force=True, background_path=None) == 2
+
+
+def test_replay_frames_match_the_game_in_a_process_pool(tmp_path):
+    with open(BOARD_FILE) as f:
+        board_state = json.load(f)
+    log_path, recorded = _record_climb(tmp_path, board_state)
+    out = tmp_path / "frames"
+
+    written = export_images.export_replay(log_path, str(out), BOARD_FILE, processes=2,
+                                          ticks_per_frame=3, background_path=None)
+    # The starting pose, then a frame per 3 ticks and one for the last 1
+    assert written == 1 + 61 // 3 + 1
+    assert sorted(os.listdir(out)) == [export_images.frame_name(i) for i in range(written)]
+
+    # The last frame is the climb's final pose drawn as the game draws it
+    expected = game.build_board_layer(recorded, None, top=0)
+    game.draw_climber(expected, recorded)
+    last = pygame.image.load(str(out / export_images.frame_name(written - 1)))
+    assert _same_pixels(last, expected)
+
+
+def test_replay_camera_holds_still_while_dragging_then_follows():
+    wall_height = SCREEN_HEIGHT * 3
+    board_state = {'num_rows': 30, 'wall_height': wall_height, 'circles': [], 'squares': []}
+    sim = Simulation(board_state)
+    log = InputLog(sim.dt)
+    x, y = sim.left_arm.pos
+    for i in range(100):
+        log.record((x, y - 5 * i), True, [])
+    for _ in range(100):
+        log.record((x, y - 500), False, [])
+    frames = export_images.replay_frames(log, board_state, ticks_per_frame=2)
+
+    assert len(frames) == 101
+    tops = [top for _, top in frames]
+    assert set(tops[:51]) == {wall_height - SCREEN_HEIGHT}
+    assert tops[-1] < tops[50]
@@ -0,0 +1,79 @@
+import json
+import time
+import pygame
+from frame_scheduler import FrameScheduler, StartupTimer, PHASES, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = [7, 1, 10, 3, 5, 2, 9, 4, 8, 6]
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile(values, 99) == 10
+    assert percentile(values, 10) == 1
+    assert percentile(values, 0) == 1
+    assert percentile([4.5], 99) == 4.5
+    assert percentile([], 50) == 0.0
+
+
+def test_summary_and_dump_cover_every_phase(tmp_path):
+    scheduler = FrameScheduler(max_fps=0, history=3)
+    for _ in range(5):
+        for name in PHASES:
+            with scheduler.phase(name):
+                pass
+        scheduler.end_frame()
+
+    summary = scheduler.summary()
+    assert set(summary) == set(PHASES) | {"frame"}
+    for stats in summary.values():
+        assert set(stats) == {"p50", "p95", "p99", "max"}
+        assert 0 <= stats["p50"] <= stats["p95"] <= stats["p99"] <= stats["max"]
+
+    path = tmp_path / "frames.json"
+    scheduler.dump(str(path))
+    dumped = json.loads(path.read_text())
+    assert dumped["frames"] == 5
+    assert dumped["max_fps"] == 0
+    assert dumped["summary_ms"] == summary
+    # Only the last history frames are kept
+    assert all(len(values) == 3 for values in dumped["timings"].values())
+    for i, frame in enumerate(dumped["timings"]["frame"]):
+        assert frame == sum(dumped["timings"][name][i] for name in PHASES)
+
+
+def test_frame_time_leaves_out_time_asleep(monkeypatch):
+    def wait():
+        time.sleep(0.2)
+        return pygame.event.Event(pygame.USEREVENT)
+    monkeypatch.setattr(pygame.event, 'wait', wait)
+    monkeypatch.setattr(pygame.event, 'get', lambda: [])
+
+    scheduler = FrameScheduler(max_fps=0)
+    scheduler.end_frame()
+    events = scheduler.events(idle=True)
+    assert [event.type for event in events] == [pygame.USEREVENT]
+    with scheduler.phase("physics"):
+        time.sleep(0.01)
+    scheduler.end_frame()
+    assert 0.005 < scheduler.frame_time < 0.1  # Clock.tick counts whole milliseconds
+
+    # Without idling nothing is taken off
+    scheduler.events(idle=False)
+    time.sleep(0.05)
+    scheduler.end_frame()
+    assert scheduler.frame_time >= 0.045
+
+
+def test_startup_timer_splits_time_between_marks():
+    start = time.perf_counter()
+    timer = StartupTimer(start - 0.5)
+    timer.mark("imports")
+    time.sleep(0.01)
+    timer.mark("display")
+    (first, imports), (second, display) = timer.steps
+    assert (first, second) == ("imports", "display")
+    assert imports >= 0.5
+    assert display >= 0.01
+    assert timer.total == imports + display
+    lines = timer.report().splitlines()
+    assert lines[0].startswith("imports") and lines[-1].startswith("first frame")
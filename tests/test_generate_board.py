@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import board_file
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from climber_config import HAND_BODY_MAX_DISTANCE, FEET_BODY_MAX_DISTANCE
+from generate_board import generate_board, EDGE_MARGIN, MIN_SEPARATION
+from simulation import Simulation
+
+
+def _distances(points):
+    offsets = points[:, None, :] - points[None, :, :]
+    return np.sqrt((offsets * offsets).sum(axis=2))
+
+
+def _reaches_the_top(holds, reach, wall_height):
+    """Whether holds within reach of each other lead from the bottom screen to the top."""
+    within = _distances(holds) <= reach
+    seen = holds[:, 1] >= wall_height - reach
+    frontier = seen.copy()
+    while frontier.any():
+        frontier = within[frontier].any(axis=0) & ~seen
+        seen |= frontier
+    return bool((holds[seen, 1] <= reach).any())
+
+
+def test_holds_keep_their_distance_and_stay_on_the_wall():
+    board = generate_board(2000, wall_height=SCREEN_HEIGHT * 4, min_separation=25, seed=1)
+    holds = np.array(board['circles'] + board['squares'])
+    assert len(holds) == 2000
+    assert board['wall_height'] == SCREEN_HEIGHT * 4
+    assert board['num_rows'] == 32
+    distances = _distances(holds)
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() >= 25
+    assert holds[:, 0].min() >= EDGE_MARGIN and holds[:, 0].max() <= SCREEN_WIDTH - EDGE_MARGIN
+    assert holds[:, 1].min() >= EDGE_MARGIN and holds[:, 1].max() <= SCREEN_HEIGHT * 4 - EDGE_MARGIN
+
+
+def test_each_kind_of_hold_reaches_the_top_of_a_sparse_wall():
+    wall_height = SCREEN_HEIGHT * 10
+    board = generate_board(300, wall_height=wall_height, seed=2)
+    assert _reaches_the_top(np.array(board['circles']), HAND_BODY_MAX_DISTANCE, wall_height)
+    assert _reaches_the_top(np.array(board['squares']), FEET_BODY_MAX_DISTANCE, wall_height)
+
+    scattered = generate_board(300, wall_height=wall_height, reach=False, seed=2)
+    assert not _reaches_the_top(np.array(scattered['circles']), HAND_BODY_MAX_DISTANCE, wall_height)
+
+
+def _min_distance(holds):
+    """Closest two holds, comparing each with the next few up the wall."""
+    holds = holds[np.argsort(holds[:, 1])]
+    closest = np.inf
+    for k in range(1, 40):
+        offsets = holds[k:] - holds[:-k]
+        closest = min(closest, np.sqrt((offsets * offsets).sum(axis=1)).min())
+    return closest
+
+
+@pytest.mark.parametrize("holds, seed", [(5000, 3), (20000, 3), (20000, 6)] +
+                         [(1000, seed) for seed in range(8)])
+def test_spines_find_room_around_each_other(holds, seed):
+    board = generate_board(holds, seed=seed)
+    circles, squares = np.array(board['circles']), np.array(board['squares'])
+    assert len(circles) + len(squares) == holds
+    assert _min_distance(np.concatenate([circles, squares])) >= MIN_SEPARATION
+    if holds <= 1000:
+        wall_height = board['wall_height']
+        assert _reaches_the_top(circles, HAND_BODY_MAX_DISTANCE, wall_height)
+        assert _reaches_the_top(squares, FEET_BODY_MAX_DISTANCE, wall_height)
+
+
+def test_seeded_boards_repeat_and_load_into_the_game(tmp_path):
+    board = generate_board(500, seed=3)
+    assert generate_board(500, seed=3) == board
+    assert 'wall_height' not in generate_board(100, seed=3)  # One screen, like a hand-made board
+
+    path = str(tmp_path / "generated.json")
+    board_file.save_board_state(path, board)
+    sim = Simulation(board_file.load_board_state(path))
+    assert sim.wall_height == board['wall_height']
+    assert len(sim.circles) + len(sim.squares) == 500
+
+
+def test_too_many_holds_for_the_wall():
+    with pytest.raises(ValueError):
+        generate_board(5000, wall_height=SCREEN_HEIGHT, seed=4)
@@ -0,0 +1,66 @@
+import csv
+import json
+import os
+import random
+from grade_boards import grade_directory, COLUMNS
+
+BOARD_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "board_state.json")
+
+
+def _board_dir(tmp_path, count=6):
+    with open(BOARD_FILE) as f:
+        board = json.load(f)
+    directory = tmp_path / "boards"
+    directory.mkdir()
+    for i in range(count):
+        rng = random.Random(i)
+        shifted = dict(board, circles=[[x + rng.randint(-10, 10), y] for x, y in board['circles']])
+        (directory / ("board_%02d.json" % i)).write_text(json.dumps(shifted))
+    (directory / "empty.json").write_text(json.dumps({'num_rows': 8, 'circles': [], 'squares': []}))
+    (directory / "zz_broken.json").write_text("{")
+    (directory / "notes.txt").write_text("not a board")
+    return str(directory)
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_grades_every_board_in_name_order(tmp_path):
+    directory = _board_dir(tmp_path)
+    output = str(tmp_path / "grades.csv")
+    assert grade_directory(directory, output, processes=2) == 8
+
+    rows = _read_csv(output)
+    assert [row["board"] for row in rows] == sorted(name for name in os.listdir(directory)
+                                                    if name.endswith(".json"))
+    by_name = {row["board"]: row for row in rows}
+    assert by_name["board_00.json"]["climbable"] == "True"
+    assert int(by_name["board_00.json"]["moves"]) > 0
+    assert float(by_name["board_00.json"]["longest_reach"]) > 0
+    assert by_name["empty.json"]["climbable"] == "False"
+    assert by_name["zz_broken.json"]["error"].startswith("JSONDecodeError")
+    assert list(rows[0]) == list(COLUMNS)
+
+
+def test_resumes_after_the_last_complete_row(tmp_path):
+    directory = _board_dir(tmp_path)
+    output = str(tmp_path / "grades.jsonl")
+    grade_directory(directory, output, processes=1)
+    with open(output) as f:
+        complete = f.read().splitlines()
+
+    # Interrupted three rows from the end, partway through writing a row
+    with open(output, 'w') as f:
+        f.write("\n".join(complete[:5]) + "\n" + complete[5][:10])
+    assert grade_directory(directory, output, processes=2) == 3
+    with open(output) as f:
+        resumed = f.read().splitlines()
+    assert [json.loads(line)["board"] for line in resumed] == [json.loads(line)["board"] for line in complete]
+
+    # Nothing left to do, unless asked to start over
+    assert grade_directory(directory, output, processes=1) == 0
+    assert grade_directory(directory, output, processes=1, resume=False) == 8
+    with open(output) as f:
+        assert len(f.read().splitlines()) == 8
@@ -0,0 +1,64 @@
+import math
+import random
+from hold_index import HoldIndex, RowIndex
+
+
+def _random_index(rng, count):
+    positions = [(rng.uniform(0, 600), rng.uniform(0, 900)) for _ in range(count)]
+    index = HoldIndex.from_board_state({'circles': positions}, ('circles',))
+    return index, positions
+
+
+def test_within_and_nearest_match_brute_force():
+    rng = random.Random(0)
+    index, positions = _random_index(rng, 500)
+    # Drag some holds around, including off the board
+    for _ in range(100):
+        i = rng.randrange(len(positions))
+        positions[i] = (rng.uniform(-50, 650), rng.uniform(-50, 950))
+        index.move(('circles', i), positions[i])
+
+    for _ in range(300):
+        query = (rng.uniform(-100, 700), rng.uniform(-100, 1000))
+        radius = rng.uniform(0, 80)
+        dists = [math.dist(pos, query) for pos in positions]
+
+        expected = sorted(i for i, dist in enumerate(dists) if dist <= radius)
+        assert sorted(i for _, i in index.within(query, radius)) == expected
+
+        _, nearest = index.nearest(query)
+        assert math.isclose(dists[nearest], min(dists))
+
+        bounded = index.nearest(query, radius)
+        assert (bounded is None) == (min(dists) > radius)
+
+
+def test_remove_and_empty_index():
+    index = HoldIndex()
+    assert index.nearest((0, 0)) is None
+    index.add('a', (10, 10))
+    index.remove('a')
+    assert len(index) == 0
+    assert index.within((10, 10), 5) == []
+
+
+def test_row_index_between_and_within_match_brute_force():
+    rng = random.Random(1)
+    positions = [(rng.uniform(0, 600), rng.uniform(0, 9000)) for _ in range(2000)]
+    index = RowIndex.from_board_state({'circles': positions}, 100, ('circles',))
+    for _ in range(200):
+        i = rng.randrange(len(positions))
+        positions[i] = (rng.uniform(0, 600), rng.uniform(-50, 9050))
+        index.move(('circles', i), positions[i])
+    assert len(index) == len(positions)
+
+    for _ in range(200):
+        top = rng.uniform(-100, 9000)
+        bottom = top + rng.uniform(0, 1000)
+        expected = sorted(i for i, pos in enumerate(positions) if top <= pos[1] <= bottom)
+        assert sorted(i for _, i in index.between(top, bottom)) == expected
+
+        query = (rng.uniform(0, 600), rng.uniform(0, 9000))
+        radius = rng.uniform(0, 150)
+        expected = sorted(i for i, pos in enumerate(positions) if math.dist(pos, query) <= radius)
+        assert sorted(i for _, i in index.within(query, radius)) == expected
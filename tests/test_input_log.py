@@ -0,0 +1,37 @@
+import random
+from simulation import Simulation
+from input_log import InputLog, replay
+
+
+def _play_session(sim, rng, ticks):
+    for _ in range(ticks):
+        limb = rng.choice(sim.all_limbs)
+        mouse_pos = (int(limb.pos[0]) + rng.randint(-4, 4), int(limb.pos[1]) + rng.randint(-4, 4))
+        right_clicks = [mouse_pos] if rng.random() < 0.02 else []
+        sim.advance(rng.uniform(0, 0.05), mouse_pos, rng.random() < 0.7, right_clicks)
+
+
+def _state(sim):
+    return (sim.upper_body_pos, sim.lower_body_pos, sim.lower_body_gravity_on,
+            [(limb.pos, limb.gravity_on) for limb in sim.all_limbs])
+
+
+def test_replay_reproduces_recorded_session(tmp_path):
+    sim = Simulation(dt=1 / 120)
+    sim.input_log = InputLog(sim.dt)
+    _play_session(sim, random.Random(3), 500)
+
+    path = str(tmp_path / "session.clin")
+    sim.input_log.save(path)
+    replayed = replay(InputLog.load(path))
+
+    assert replayed.tick_count == sim.tick_count
+    assert _state(replayed) == _state(sim)
+
+
+def test_unchanged_mouse_position_is_not_stored_again():
+    log = InputLog(1 / 60)
+    for _ in range(100):
+        log.record((10, 20), False, [])
+    assert len(log.data) < 100 * 3
+    assert list(log)[-1] == ((10.0, 20.0), False, [])
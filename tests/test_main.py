@@ -0,0 +1,88 @@
+import random
+import pygame
+import pytest
+import main as game
+from board_config import SCREEN_WIDTH, SCREEN_HEIGHT
+from camera import Camera
+from simulation import Simulation
+
+WALL_HEIGHT = SCREEN_HEIGHT * 5
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    yield
+    pygame.quit()
+
+
+def _tall_board(rng, holds=400):
+    return {
+        'num_rows': 40,
+        'wall_height': WALL_HEIGHT,
+        'circles': [[rng.randrange(SCREEN_WIDTH), rng.randrange(WALL_HEIGHT)] for _ in range(holds)],
+        'squares': [[rng.randrange(SCREEN_WIDTH), rng.randrange(WALL_HEIGHT)] for _ in range(holds)],
+    }
+
+
+def test_scrolled_layer_matches_a_full_redraw():
+    rng = random.Random(0)
+    sim = Simulation(_tall_board(rng))
+    row_index = game.build_row_index(sim)
+    background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    for _ in range(30):
+        background.fill((rng.randrange(256), 0, 0), (0, rng.randrange(SCREEN_HEIGHT), SCREEN_WIDTH, 20))
+
+    for background_image in (None, background):
+        top = WALL_HEIGHT - SCREEN_HEIGHT
+        layer = game.build_board_layer(sim, background_image, row_index, top)
+        for offset in (-7, -250, 13, -900, -1, 400, -2000):
+            top += offset
+            game.scroll_board_layer(layer, sim, row_index, background_image, top, offset)
+            expected = game.build_board_layer(sim, background_image, row_index, top)
+            assert pygame.image.tobytes(layer, "RGB") == pygame.image.tobytes(expected, "RGB")
+
+
+def test_board_layer_only_visits_visible_rows():
+    sim = Simulation(_tall_board(random.Random(1)))
+    row_index = game.build_row_index(sim)
+    visited = []
+    between = row_index.between
+    row_index.between = lambda top, bottom: visited.extend(between(top, bottom)) or visited
+    game.build_board_layer(sim, None, row_index, 0)
+    assert visited
+    assert all(row_index.pos(key)[1] <= SCREEN_HEIGHT + game.HOLD_DRAW_RADIUS for key in visited)
+
+
+def test_camera_follows_within_the_wall():
+    camera = Camera(WALL_HEIGHT, margin=300, speed=1000)
+    assert camera.y == WALL_HEIGHT - SCREEN_HEIGHT
+
+    # Inside the margins nothing moves
+    camera.follow((0, camera.y + SCREEN_HEIGHT / 2))
+    assert not camera.moving
+
+    # Climbing near the top of the screen scrolls up, at most speed * time a frame
+    camera.follow((0, camera.y + 100))
+    assert camera.target_y == camera.y - 200
+    assert camera.update(0.1) == -100
+    assert camera.update(0.1) == -100
+    assert not camera.moving
+    assert camera.to_screen(camera.to_wall((5, 100))) == (5, 100)
+
+    # Never past either end of the wall
+    camera.follow((0, -1000))
+    camera.jump()
+    assert camera.y == 0
+    camera.follow((0, WALL_HEIGHT * 2))
+    camera.jump()
+    assert camera.y == WALL_HEIGHT - SCREEN_HEIGHT
+
+
+def test_climber_starts_at_the_bottom_of_a_tall_wall():
+    sim = Simulation(_tall_board(random.Random(2)))
+    assert sim.row_height == WALL_HEIGHT // 40
+    assert WALL_HEIGHT - SCREEN_HEIGHT < sim.upper_body_pos[1] < WALL_HEIGHT
+    short = Simulation()
+    assert sim.upper_body_pos[1] - short.upper_body_pos[1] == WALL_HEIGHT - SCREEN_HEIGHT
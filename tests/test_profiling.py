@@ -0,0 +1,95 @@
+import json
+import pstats
+import pygame
+from frame_scheduler import FrameScheduler
+from profiling import Tracer, Profiling, scope, TRACE_ENV, TRACE_KEY, PROFILE_KEY
+from simulation import Simulation
+
+
+def key(k):
+    return pygame.event.Event(pygame.KEYDOWN, key=k, mod=0)
+
+
+def test_trace_is_chrome_trace_event_json(tmp_path):
+    tracer = Tracer()
+    with tracer.scope("outer"):
+        with tracer.scope("inner"):
+            pass
+    path = tmp_path / "trace.json"
+    tracer.dump(str(path))
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["inner", "outer"]
+    inner, outer = events
+    for event in events:
+        assert event["ph"] == "X"
+        assert event["ts"] >= 0 and event["dur"] >= 0
+    # Complete events nest by time on the same thread
+    assert inner["tid"] == outer["tid"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_tracer_drops_oldest_events_beyond_its_limit():
+    tracer = Tracer(max_events=10)
+    for i in range(25):
+        tracer.add(str(i), i, i + 1)
+    assert len(tracer.events) <= 10
+    assert tracer.events[-1][0] == "24"
+    assert tracer.dropped + len(tracer.events) == 25
+
+
+def test_scope_without_tracer_does_nothing():
+    with scope(None, "anything"):
+        pass
+
+
+def test_sim_and_scheduler_record_named_phases():
+    scheduler = FrameScheduler(max_fps=0)
+    sim = Simulation()
+    profiling = Profiling([scheduler, sim])
+    profiling.start_trace()
+    with scheduler.phase("physics"):
+        sim.tick()
+    scheduler.end_frame()
+
+    names = [event[0] for event in profiling.tracer.events]
+    assert names == ["gravity", "constraint", "physics", "frame"]
+
+
+def test_hotkeys_toggle_trace_and_profile_frames(tmp_path, monkeypatch):
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    trace_file = tmp_path / "trace.json"
+    profile_file = tmp_path / "frames.prof"
+    scheduler = FrameScheduler(max_fps=0)
+    profiling = Profiling([scheduler], str(trace_file), str(profile_file), profile_frames=3)
+    assert profiling.tracer is None
+
+    assert profiling.handle_event(key(TRACE_KEY))
+    assert scheduler.tracer is profiling.tracer is not None
+    with scheduler.phase("input"):
+        pass
+    assert profiling.handle_event(key(TRACE_KEY))
+    assert scheduler.tracer is None
+    assert json.loads(trace_file.read_text())["traceEvents"][0]["name"] == "input"
+
+    assert profiling.handle_event(key(PROFILE_KEY))
+    for _ in range(2):
+        profiling.end_frame()
+    assert not profile_file.exists()
+    profiling.end_frame()
+    assert pstats.Stats(str(profile_file)).total_calls > 0
+
+    assert not profiling.handle_event(key(pygame.K_a))
+
+
+def test_env_var_traces_from_launch_and_writes_on_close(tmp_path, monkeypatch):
+    path = tmp_path / "launch.json"
+    monkeypatch.setenv(TRACE_ENV, str(path))
+    scheduler = FrameScheduler(max_fps=0)
+    profiling = Profiling([scheduler])
+    assert scheduler.tracer is not None
+    with scheduler.phase("flip"):
+        pass
+    profiling.close()
+    assert json.loads(path.read_text())["traceEvents"][0]["name"] == "flip"
@@ -0,0 +1,85 @@
+import math
+import random
+from climber_config import BODY_DISTANCE
+from ragdoll import ConstraintSolver, MASSLESS, PINNED, SOLVER_TOLERANCE
+from simulation import Simulation
+
+
+def _worst_violation(sim):
+    worst = abs(math.dist(sim.upper_body_pos, sim.lower_body_pos) - BODY_DISTANCE)
+    for limb in sim.all_limbs:
+        worst = max(worst, math.dist(limb.pos, sim.body_pos_for(limb)) - limb.max_distance / 2)
+    return worst
+
+
+def test_one_tick_settles_a_scrambled_climber():
+    for seed in range(20):
+        rng = random.Random(seed)
+        sim = Simulation()
+        for point in [sim.upper_body_pos, sim.lower_body_pos] + [limb.pos for limb in sim.all_limbs]:
+            point[0] += rng.uniform(-80, 80)
+            point[1] += rng.uniform(-80, 80)
+        held = sim.all_limbs[seed % 4]
+        held_pos = list(held.pos)
+
+        sim.tick(tuple(held_pos), True)
+
+        assert held.pos == held_pos  # Dragged limbs are pinned
+        assert _worst_violation(sim) < SOLVER_TOLERANCE
+        assert sim.solver.iterations <= sim.solver.max_iterations
+
+
+def test_chain_with_both_ends_pinned_converges():
+    # A rope of ten links, more joints than the climber has
+    points = [[i * 5.0, 0.0] for i in range(11)]
+    points[-1] = [80.0, 0.0]
+    solver = ConstraintSolver(points, [PINNED] + [1.0] * 9 + [PINNED], max_iterations=500)
+    for i in range(10):
+        solver.add_distance_constraint(i, i + 1, 10, 10)
+    solver.solve()
+    assert solver.iterations < 500
+    for i in range(10):
+        assert abs(math.dist(points[i], points[i + 1]) - 10) < SOLVER_TOLERANCE
+    assert points[0] == [0.0, 0.0] and points[-1] == [80.0, 0.0]
+
+
+def test_impossible_constraints_stop_at_the_iteration_budget():
+    points = [[0.0, 0.0], [50.0, 0.0]]
+    solver = ConstraintSolver(points, [PINNED, PINNED], max_iterations=7)
+    solver.add_distance_constraint(0, 1, 0, 10)
+    assert solver.solve() == 1  # Neither end can move, so nothing is left to re-check
+
+    solver = ConstraintSolver([[0.0, 0.0], [50.0, 0.0], [25.0, 1.0]], [PINNED, PINNED, 1.0],
+                              max_iterations=7)
+    solver.add_distance_constraint(0, 2, 0, 10)
+    solver.add_distance_constraint(1, 2, 0, 10)
+    assert solver.solve() == 7
+
+
+def test_massless_points_take_the_whole_correction():
+    points = [[0.0, 0.0], [30.0, 0.0]]
+    solver = ConstraintSolver(points, [1.0, MASSLESS])
+    solver.add_distance_constraint(0, 1, 0, 10)
+    solver.solve()
+    assert points == [[0.0, 0.0], [10.0, 0.0]]
+
+
+def test_warm_start_sweeps_disturbing_constraints_first():
+    sweeps = {}
+    for warm_start in (True, False):
+        # A massless hand on a two-point body that something keeps stretching
+        hand, upper, lower = [0.0, -5.0], [0.0, 0.0], [0.0, 20.0]
+        solver = ConstraintSolver([hand, upper, lower], [MASSLESS, 1.0, 1.0], warm_start=warm_start)
+        solver.add_distance_constraint(0, 1, 0, 10)
+        solver.add_distance_constraint(1, 2, 20, 20)
+        sweeps[warm_start] = []
+        for _ in range(5):
+            lower[1] += 4
+            sweeps[warm_start].append(solver.solve())
+            assert abs(math.dist(upper, lower) - 20) < SOLVER_TOLERANCE
+            assert math.dist(hand, upper) <= 10 + SOLVER_TOLERANCE
+
+    assert sweeps[False] == [2] * 5
+    # The body constraint moved the upper body under the hand's constraint,
+    # so from the second solve on it's swept first and one sweep does.
+    assert sweeps[True] == [2, 1, 1, 1, 1]
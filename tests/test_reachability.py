@@ -0,0 +1,45 @@
+import json
+import os
+from reachability import ReachabilityGraph, load_reachability_graph
+
+BOARD_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "board_state.json")
+
+
+def _load_board():
+    with open(BOARD_FILE) as f:
+        return json.load(f)
+
+
+def _edges(graph, count, lookup):
+    return [list(lookup(i)) for i in range(count)]
+
+
+def test_cached_graph_matches_fresh_build(tmp_path):
+    board = _load_board()
+    built = ReachabilityGraph.build(board)
+    load_reachability_graph(board, str(tmp_path))
+    cached = load_reachability_graph(board, str(tmp_path))
+    assert cached._hands is None  # Not read until first use
+    assert _edges(cached, 10, cached.hand_neighbours) == _edges(built, 10, built.hand_neighbours)
+    assert _edges(cached, 10, cached.foot_neighbours) == _edges(built, 10, built.foot_neighbours)
+
+
+def test_truncated_cache_file_is_rebuilt(tmp_path):
+    board = _load_board()
+    path = load_reachability_graph(board, str(tmp_path)).path
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    graph = load_reachability_graph(board, str(tmp_path))
+    assert list(graph.hand_neighbours(0)) == list(ReachabilityGraph.build(board).hand_neighbours(0))
+    assert os.path.getsize(path) == len(data)
+
+
+def test_pairs_without_a_completing_pose_are_dropped():
+    # Two hand holds next to each other, but no foot holds anywhere near
+    board = {'num_rows': 8, 'circles': [[100, 100], [120, 100]], 'squares': [[500, 850]]}
+    graph = ReachabilityGraph.build(board)
+    assert list(graph.hand_neighbours(0)) == []
+    assert list(graph.foot_neighbours(0)) == []
@@ -0,0 +1,46 @@
+import json
+import os
+from collections import Counter
+from route_solver import RouteSolver, solve_board, solve_boards
+
+BOARD_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "board_state.json")
+
+
+def _load_board():
+    with open(BOARD_FILE) as f:
+        return json.load(f)
+
+
+def _moved_limbs(before, after):
+    hands = Counter(before[:2]) - Counter(after[:2])
+    feet = Counter(before[2:]) - Counter(after[2:])
+    return sum(hands.values()) + sum(feet.values())
+
+
+def test_climbable_board_moves_one_limb_at_a_time():
+    route = solve_board(_load_board())
+    assert route is not None
+    for before, after in zip(route, route[1:]):
+        assert _moved_limbs(before, after) == 1
+
+
+def test_route_starts_on_bottom_row_and_ends_on_top_row():
+    board = _load_board()
+    solver = RouteSolver(board)
+    path = solver.solve()
+    assert solver.row_of(solver.squares[path[0][2]]) == board['num_rows'] - 1
+    assert solver.is_goal(path[-1])
+
+
+def test_gap_too_wide_is_not_climbable():
+    board = {
+        'num_rows': 8,
+        'circles': [[280, 700], [320, 700], [300, 40]],
+        'squares': [[280, 850], [320, 850]],
+    }
+    assert solve_board(board) is None
+
+
+def test_process_pool_matches_serial():
+    boards = [_load_board(), {'num_rows': 8, 'circles': [], 'squares': []}]
+    assert solve_boards(boards, processes=2) == solve_boards(boards, processes=1)
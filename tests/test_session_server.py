@@ -0,0 +1,162 @@
+import asyncio
+import struct
+from session_server import SessionServer, SessionClient, climber_state, TICK_DT, COORD_COUNT
+from simulation import Simulation
+
+FULL_DELTA = 1 + 4 + 2 + COORD_COUNT * 4 + 1  # Type, tick, mask, every coordinate, flags
+WELCOME = 1 + 4 + 8
+
+
+def _f32(value):
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+
+def _mirrors(client, sim):
+    coords, flags = climber_state(sim)
+    return client.coords == [_f32(value) for value in coords] and client.flags == flags
+
+
+async def _delivered(server, count=None):
+    """Let the server read what the clients sent (and accept new connections)."""
+    for _ in range(200):
+        await asyncio.sleep(0)
+    while count is not None and len(server.sessions) < count:
+        await asyncio.sleep(0.001)
+
+
+def test_clients_mirror_their_own_sessions(tmp_path):
+    async def run():
+        server = SessionServer()
+        path = str(tmp_path / "sessions.sock")
+        await server.start(path)
+        clients = [await SessionClient.connect(path) for _ in range(2)]
+        await _delivered(server, 2)
+        assert len({client.session_id for client in clients}) == 2
+        assert all(client.dt == TICK_DT for client in clients)
+
+        # Local simulations fed the same inputs as each session
+        expected = [Simulation(dt=TICK_DT) for _ in clients]
+        server.tick()
+        for client, sim in zip(clients, expected):
+            await client.receive()
+            assert _mirrors(client, sim)
+
+        # Only the first client drags the left arm
+        dragger, bystander = clients
+        sim = expected[0]
+        start = tuple(sim.left_arm.pos)
+        for i in range(1, 30):
+            pos = (start[0] + i, start[1] - 3 * i)
+            dragger.send_input(pos, True)
+            await _delivered(server)
+            server.tick()
+            sim.tick(pos, True)
+            assert await dragger.receive() == server.tick_count
+            assert _mirrors(dragger, sim)
+
+        # Right click drops the arm under gravity, and the flags travel too
+        dragger.send_input(None, False)
+        dragger.right_click(tuple(sim.left_arm.pos))
+        await _delivered(server)
+        server.tick()
+        sim.tick(None, False, [tuple(sim.left_arm.pos)])
+        await dragger.receive()
+        assert dragger.flags & 1
+        assert _mirrors(dragger, sim)
+
+        # Deltas are smaller than full states, and the idle client got
+        # nothing after its first full state
+        assert dragger.bytes_received < WELCOME + server.tick_count * FULL_DELTA
+        assert bystander.bytes_received == WELCOME + FULL_DELTA
+        assert server.bytes_sent == sum(client.bytes_received for client in clients) - 2 * WELCOME
+
+        for client in clients:
+            await client.close()
+        await _delivered(server)
+        assert not server.sessions
+        await server.close()
+
+    asyncio.run(run())
+
+
+def test_run_loop_serves_tcp_clients_in_real_time():
+    async def run():
+        server = SessionServer()
+        host, port = (await server.start(port=0))[:2]
+        loop = asyncio.create_task(server.run())
+        client = await SessionClient.connect(host=host, port=port)
+        await client.receive()
+        upper_y = client.point(0)[1]
+
+        # Drag the left arm straight up; the body follows it
+        x, y = client.point(2)
+        for i in range(1, 40):
+            client.send_input((x, y - 5 * i), True)
+            await client.receive()
+        assert client.point(0)[1] < upper_y - 100
+
+        # Reset sends the whole starting pose again
+        client.send_input(None, False)
+        client.reset()
+        while client.point(0)[1] != upper_y:
+            await client.receive()
+        assert _mirrors(client, Simulation(dt=TICK_DT))
+
+        server.stop()
+        await loop
+        await client.close()
+        await server.close()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_release_reaches_the_simulation_before_the_session_idles(tmp_path):
+    async def run():
+        server = SessionServer()
+        path = str(tmp_path / "sessions.sock")
+        await server.start(path)
+        client = await SessionClient.connect(path)
+        await _delivered(server, 1)
+        server.tick()
+        await client.receive()
+        arm = client.point(2)
+
+        client.send_input(arm, True)
+        await _delivered(server)
+        server.tick()
+        client.send_input(arm, False)
+        await _delivered(server)
+        for _ in range(5):
+            server.tick()
+        session = next(iter(server.sessions.values()))
+        assert session.sim.grabbed is None
+        assert session.idle
+
+        # A press on empty wall grabs nothing, so the arm stays put
+        empty = (arm[0] + 200, arm[1] - 300)
+        client.send_input(empty, True)
+        await _delivered(server)
+        server.tick()
+        assert session.sim.grabbed is None
+        assert tuple(session.sim.left_arm.pos) == arm
+
+        await client.close()
+        await server.close()
+
+    asyncio.run(run())
+
+
+def test_unknown_messages_drop_the_client(tmp_path):
+    async def run():
+        server = SessionServer()
+        path = str(tmp_path / "sessions.sock")
+        await server.start(path)
+        client = await SessionClient.connect(path)
+        await _delivered(server, 1)
+        client.writer.write(b'?')
+        await _delivered(server)
+        assert not server.sessions
+        await client.close()
+        await server.close()
+
+    asyncio.run(run())
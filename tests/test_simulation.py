@@ -0,0 +1,170 @@
+import random
+from simulation import Simulation, SNAPSHOT
+from input_log import InputLog
+
+
+def _drop_left_leg(fps, seconds=2.0):
+    sim = Simulation(dt=1 / 120)
+    sim.right_click(sim.left_leg.pos)
+    for _ in range(int(seconds * fps)):
+        sim.advance(1 / fps)
+    return sim
+
+
+def test_same_ticks_give_same_state_at_any_frame_rate():
+    slow = _drop_left_leg(30)
+    fast = _drop_left_leg(1000)
+    assert slow.tick_count == fast.tick_count
+    assert slow.left_leg.pos == fast.left_leg.pos
+
+
+def test_new_input_ticks_even_on_a_zero_length_frame():
+    sim = Simulation()
+    assert sim.advance(0.0, sim.left_arm.pos, True) == 1
+    # Holding the button isn't new input
+    assert sim.advance(0.0, sim.left_arm.pos, True) == 0
+
+
+def test_quick_click_releases_the_grab_on_a_short_frame():
+    sim = Simulation(dt=1 / 120)
+    arm = tuple(sim.left_arm.pos)
+    assert sim.advance(0.001, arm, True) == 1
+    assert sim.grabbed == 0
+    # The forced press tick left the accumulator in debt, but the release still ticks
+    assert sim.advance(0.001, arm, False) == 1
+    assert sim.grabbed is None
+    # So a later press on empty wall doesn't pull the old limb over
+    sim.advance(1 / 120, (100, 800), True)
+    assert sim.grabbed is None
+    assert tuple(sim.left_arm.pos) != (100, 800)
+
+
+def test_reset_forgets_the_held_button():
+    sim = Simulation()
+    sim.tick(tuple(sim.left_arm.pos), True)
+    assert sim.grabbed == 0
+    sim.reset()
+    assert sim.grabbed is None and not sim.button_held
+    # Still holding the button, but a press after the reset grabs afresh
+    right_arm = tuple(sim.right_arm.pos)
+    sim.tick(right_arm, True)
+    assert sim.grabbed == 1
+
+
+def test_right_click_on_zero_length_frame_is_applied():
+    sim = Simulation()
+    sim.advance(0.0, right_clicks=[tuple(sim.left_leg.pos)])
+    assert sim.left_leg.gravity_on
+
+
+def test_gravity_stops_counting_once_settled():
+    sim = Simulation()
+    assert not sim.gravity_active()
+    sim.right_click(sim.left_leg.pos)
+    assert sim.gravity_active()
+    sim.step(1000)
+    assert sim.left_leg.gravity_on
+    assert not sim.gravity_active()
+
+
+def test_tick_updates_climber_state_in_place():
+    sim = Simulation()
+    points = [sim.upper_body_pos, sim.lower_body_pos, sim.head_pos] + [limb.pos for limb in sim.all_limbs]
+    start = [list(point) for point in points]
+    for i in range(50):
+        pos = sim.left_arm.pos
+        sim.tick((pos[0] + 3, pos[1] - 2 * (i % 2)), True, [sim.right_leg.pos] if i == 10 else [])
+
+    assert sim.head_pos is points[2]
+    current = [sim.upper_body_pos, sim.lower_body_pos, sim.head_pos] + [limb.pos for limb in sim.all_limbs]
+    assert all(now is before for now, before in zip(current, points))
+    assert [list(point) for point in points] != start
+    assert not hasattr(sim, '__dict__') and not hasattr(sim.left_arm, '__dict__')
+
+
+def _climber(sim):
+    return ([list(sim.upper_body_pos), list(sim.lower_body_pos)] +
+            [list(limb.pos) for limb in sim.all_limbs] +
+            [[limb.gravity_on for limb in sim.all_limbs], sim.lower_body_gravity_on,
+             list(sim.solver.order), list(sim.solver.leading), sim.tick_count])
+
+
+def _wiggle(sim, ticks, seed):
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        limb = rng.choice(sim.all_limbs)
+        pos = (limb.pos[0] + rng.uniform(-8, 8), limb.pos[1] + rng.uniform(-8, 8))
+        sim.tick(pos, rng.random() < 0.8, [pos] if rng.random() < 0.03 else [])
+
+
+def test_restoring_a_snapshot_replays_exactly():
+    sim = Simulation()
+    _wiggle(sim, 100, 1)
+    snapshot = sim.snapshot()
+    assert len(snapshot) == SNAPSHOT.size
+    midway = _climber(sim)
+    _wiggle(sim, 100, 2)
+    finished = _climber(sim)
+
+    # Back in the same simulation, with its position lists kept
+    upper = sim.upper_body_pos
+    sim.restore(snapshot)
+    assert sim.upper_body_pos is upper
+    assert _climber(sim) == midway
+    _wiggle(sim, 100, 2)
+    assert _climber(sim) == finished
+
+    # And branched into a fresh one
+    branch = Simulation()
+    branch.restore(snapshot)
+    _wiggle(branch, 100, 2)
+    assert _climber(branch) == finished
+
+
+def test_grabbed_limb_follows_fast_flicks():
+    sim = Simulation()
+    start = tuple(sim.left_arm.pos)
+    sim.tick(start, True)
+    assert sim.grabbed == 0
+    # Far further in one tick than the limb's radius
+    flick = (start[0] - 60, start[1] - 80)
+    sim.tick(flick, True)
+    assert tuple(sim.left_arm.pos) == flick
+    sim.tick((flick[0] + 5, flick[1]), True)
+    assert sim.left_arm.pos[0] == flick[0] + 5
+
+    # Letting go drops the grab; pressing away from every limb grabs nothing,
+    # even when the mouse then moves over one
+    sim.tick(None, False)
+    assert sim.grabbed is None
+    sim.tick((10, 10), True)
+    assert sim.grabbed is None
+    right_arm = tuple(sim.right_arm.pos)
+    sim.tick(right_arm, True)
+    sim.tick((right_arm[0] + 30, right_arm[1]), True)
+    assert tuple(sim.right_arm.pos) == right_arm
+
+
+def test_advance_grabs_where_the_button_went_down():
+    sim = Simulation(dt=1 / 120)
+    arm = tuple(sim.right_arm.pos)
+    # By the end of the frame the mouse is well away from the arm
+    path = [arm, (arm[0] + 20, arm[1] - 20), (arm[0] + 40, arm[1] - 40)]
+    sim.input_log = InputLog(sim.dt)
+    assert sim.advance(3 / 120, path[-1], True, motion=path) == 3
+    assert [pos for pos, _, _ in sim.input_log] == path
+    assert sim.grabbed == 1
+    assert tuple(sim.right_arm.pos) == path[-1]
+
+
+def test_advance_interpolates_between_motion_events():
+    sim = Simulation(dt=1 / 120)
+    arm = tuple(sim.right_arm.pos)
+    sim.advance(1 / 120, arm, True, motion=[arm])
+    end = (arm[0] + 30, arm[1] - 30)
+    further = (end[0] + 30, end[1] - 30)
+    sim.input_log = InputLog(sim.dt)
+    sim.advance(3 / 120, end, True, motion=[end])
+    sim.advance(3 / 120, further, True, motion=[further], interpolate=True)
+    assert [pos for pos, _, _ in sim.input_log] == [
+        end, end, end, (end[0] + 10, end[1] - 10), (end[0] + 20, end[1] - 20), further]
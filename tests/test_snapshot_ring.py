@@ -0,0 +1,48 @@
+from simulation import Simulation
+from snapshot_ring import SnapshotRing
+
+
+def _drag_up(sim, ticks):
+    for _ in range(ticks):
+        pos = sim.left_arm.pos
+        sim.tick((pos[0], pos[1] - 4), True)
+
+
+def test_rewind_goes_back_tick_by_tick():
+    sim = Simulation()
+    sim.snapshots = SnapshotRing(50)
+    sim.snapshots.push(sim)
+    heights = [sim.upper_body_pos[1]]
+    for _ in range(30):
+        _drag_up(sim, 1)
+        heights.append(sim.upper_body_pos[1])
+    assert len(sim.snapshots) == 31
+
+    assert sim.snapshots.rewind(sim, 10) == 10
+    assert sim.tick_count == 20
+    assert sim.upper_body_pos[1] == heights[20]
+    assert sim.snapshots.get() == sim.snapshot()
+
+    # Rewinding past the start stops at the oldest snapshot
+    assert sim.snapshots.rewind(sim, 100) == 20
+    assert sim.tick_count == 0
+    assert sim.upper_body_pos[1] == heights[0]
+    assert sim.snapshots.rewind(sim, 1) == 0
+
+
+def test_full_ring_keeps_only_the_newest():
+    sim = Simulation()
+    sim.snapshots = SnapshotRing.for_seconds(0.1, sim.dt)
+    capacity = sim.snapshots.capacity
+    _drag_up(sim, capacity * 3 + 5)
+    assert len(sim.snapshots) == capacity
+
+    # Resuming from a rewind records onwards from there
+    newest = sim.tick_count
+    assert sim.snapshots.rewind(sim, capacity) == capacity - 1
+    assert sim.tick_count == newest - capacity + 1
+    _drag_up(sim, 2)
+    assert len(sim.snapshots) == 3
+    branch = Simulation()
+    branch.restore(sim.snapshots.get(2))
+    assert branch.tick_count == newest - capacity + 1